@@ -1,3 +1,12 @@
+-- =========================
+-- Esquema base de BusLink (instalación nueva)
+--   Crea la base desde cero con las tablas originales. Todo lo posterior
+--   (Viaje_Resumen, Viaje_Ocupacion, Viaje_Asiento, Venta_Resumen_Dia,
+--   procedimientos, triggers e índices) vive solo en migrations/: una
+--   instalación nueva es este archivo y después, desde src/:
+--   flask --app app migrate
+-- =========================
+
 -- =========================
 -- Base y modo estricto
 -- =========================
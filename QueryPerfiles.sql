@@ -31,6 +31,12 @@ GRANT SELECT ON central_autobuses.Tarifa           TO r_empleado_app;
 GRANT SELECT ON central_autobuses.Viaje            TO r_empleado_app;
 GRANT SELECT ON central_autobuses.Viaje_Escala     TO r_empleado_app;
 GRANT SELECT ON central_autobuses.Pasajero         TO r_empleado_app;
+GRANT SELECT ON central_autobuses.Viaje_Resumen    TO r_empleado_app;
+GRANT SELECT ON central_autobuses.Viaje_Ocupacion  TO r_empleado_app;
+GRANT SELECT ON central_autobuses.Viaje_Asiento    TO r_empleado_app;
+GRANT SELECT, INSERT, UPDATE, DELETE ON central_autobuses.Asiento_Retencion TO r_empleado_app;
+GRANT SELECT, INSERT, UPDATE, DELETE ON central_autobuses.Venta_Idempotencia TO r_empleado_app;
+GRANT SELECT ON central_autobuses.Venta_Detalle_Pendiente TO r_empleado_app;
 GRANT SELECT ON central_autobuses.vw_asientos_disponibilidad TO r_empleado_app;
 GRANT SELECT ON central_autobuses.vw_itinerario_viaje        TO r_empleado_app;
 
@@ -39,6 +45,8 @@ GRANT SELECT ON central_autobuses.vw_itinerario_viaje        TO r_empleado_app;
 GRANT EXECUTE ON PROCEDURE central_autobuses.sp_registrar_venta    TO r_empleado_app;
 GRANT EXECUTE ON PROCEDURE central_autobuses.sp_cancelar_boleto    TO r_empleado_app;
 GRANT EXECUTE ON PROCEDURE central_autobuses.sp_registrar_pasajero TO r_empleado_app;
+GRANT EXECUTE ON PROCEDURE central_autobuses.sp_venta_detalle_procesar    TO r_empleado_app;
+GRANT EXECUTE ON PROCEDURE central_autobuses.sp_venta_detalle_reconciliar TO r_empleado_app;
 
 GRANT r_empleado_app TO 'buslink_empleado'@'localhost';
 SET DEFAULT ROLE r_empleado_app TO 'buslink_empleado'@'localhost';
@@ -21,6 +21,8 @@ END//
 
 -- =========================================
 -- 2) Registrar venta
+--    Nota: migrations/0006_sp_registrar_venta.sql la reemplaza por la
+--    versión de una sola llamada (pasajero + boleto + venta + COMMIT).
 -- =========================================
 DROP PROCEDURE IF EXISTS sp_registrar_venta;
 CREATE DEFINER = `buslink_admin`@`localhost`
@@ -108,20 +110,23 @@ END//
 
 DELIMITER ;
 
+-- Nota: migrations/0005_venta_resumen_dia.sql la redefine para leer Venta_Resumen_Dia.
 DELIMITER //
+DROP FUNCTION IF EXISTS fn_total_ventas_dia_empleado//
 CREATE FUNCTION fn_total_ventas_dia_empleado(
     p_id_empleado INT,
     p_fecha DATE
 )
 RETURNS DECIMAL(10,2)
-DETERMINISTIC
+READS SQL DATA
 BEGIN
     DECLARE v_total DECIMAL(10,2);
 
     SELECT COALESCE(SUM(monto),0) INTO v_total
     FROM   Venta
     WHERE  id_empleado = p_id_empleado
-      AND  DATE(fecha_venta) = p_fecha;
+      AND  fecha_venta >= p_fecha
+      AND  fecha_venta <  p_fecha + INTERVAL 1 DAY;
 
     RETURN v_total;
 END//
@@ -0,0 +1,22 @@
+-- =========================================
+-- Índices para los predicados más usados
+--   (las consultas usan rangos sargables: col >= X AND col < X + INTERVAL 1 DAY)
+-- =========================================
+
+-- KPIs del día (home) y reporte ventas_hoy
+CREATE INDEX idx_venta_fecha ON Venta (fecha_venta);
+
+-- Ventas por empleado y día (ventas_hoy, fn_total_ventas_dia_empleado)
+CREATE INDEX idx_venta_empleado_fecha ON Venta (id_empleado, fecha_venta);
+
+-- Viajes del día / próximos (home, nueva_venta, viajes_proximos, admin)
+CREATE INDEX idx_viaje_salida_estado ON Viaje (fecha_salida, estado);
+
+-- Viajes por chofer (panel del chofer)
+CREATE INDEX idx_viaje_chofer_salida ON Viaje (id_chofer, fecha_salida);
+
+-- Asientos ocupados por viaje (API de asientos, reconciliación de ocupación)
+CREATE INDEX idx_boleto_viaje_estado ON Boleto (id_viaje, estado);
+
+-- Origen/destino por orden de parada (sp_refrescar_viaje_resumen)
+CREATE INDEX idx_ve_viaje_orden ON Viaje_Escala (id_viaje, orden_parada);
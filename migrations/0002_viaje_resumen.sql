@@ -0,0 +1,127 @@
+-- =========================
+-- Resumen de viaje (origen/destino desnormalizados)
+--   Evita los JOIN a Viaje_Escala con subconsultas MIN/MAX(orden_parada).
+--   Lo mantienen los triggers de Viaje_Escala; la carga inicial va al
+--   final. Para repararlo: flask --app app backfill-viajes
+-- =========================
+CREATE TABLE IF NOT EXISTS Viaje_Resumen (
+  id_viaje            INT NOT NULL PRIMARY KEY,
+  id_terminal_origen  INT NOT NULL,
+  id_ciudad_origen    INT NOT NULL,
+  id_terminal_destino INT NOT NULL,
+  id_ciudad_destino   INT NOT NULL,
+  num_escalas         INT NOT NULL DEFAULT 0,
+  actualizado_en      DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+  KEY idx_vr_ciudades (id_ciudad_origen, id_ciudad_destino),
+  CONSTRAINT fk_vr_viaje   FOREIGN KEY (id_viaje) REFERENCES Viaje(id_viaje) ON DELETE CASCADE ON UPDATE CASCADE,
+  CONSTRAINT fk_vr_t_orig  FOREIGN KEY (id_terminal_origen)  REFERENCES Terminal(id_terminal) ON DELETE RESTRICT ON UPDATE CASCADE,
+  CONSTRAINT fk_vr_t_dest  FOREIGN KEY (id_terminal_destino) REFERENCES Terminal(id_terminal) ON DELETE RESTRICT ON UPDATE CASCADE
+) ENGINE=InnoDB;
+
+DELIMITER //
+DROP PROCEDURE IF EXISTS sp_refrescar_viaje_resumen//
+CREATE PROCEDURE sp_refrescar_viaje_resumen (IN p_id_viaje INT)
+BEGIN
+  DECLARE v_min INT;
+  DECLARE v_max INT;
+  DECLARE v_num INT;
+
+  SELECT MIN(orden_parada), MAX(orden_parada), COUNT(*)
+  INTO   v_min, v_max, v_num
+  FROM Viaje_Escala
+  WHERE id_viaje = p_id_viaje;
+
+  IF v_num = 0 THEN
+    DELETE FROM Viaje_Resumen WHERE id_viaje = p_id_viaje;
+  ELSE
+    INSERT INTO Viaje_Resumen (
+      id_viaje, id_terminal_origen, id_ciudad_origen,
+      id_terminal_destino, id_ciudad_destino, num_escalas
+    )
+    SELECT p_id_viaje, o.id_terminal, tor.id_ciudad, d.id_terminal, tde.id_ciudad, v_num
+    FROM Viaje_Escala o
+    JOIN Terminal tor ON tor.id_terminal = o.id_terminal
+    JOIN Viaje_Escala d ON d.id_viaje = o.id_viaje AND d.orden_parada = v_max
+    JOIN Terminal tde ON tde.id_terminal = d.id_terminal
+    WHERE o.id_viaje = p_id_viaje
+      AND o.orden_parada = v_min
+    LIMIT 1
+    ON DUPLICATE KEY UPDATE
+      id_terminal_origen  = VALUES(id_terminal_origen),
+      id_ciudad_origen    = VALUES(id_ciudad_origen),
+      id_terminal_destino = VALUES(id_terminal_destino),
+      id_ciudad_destino   = VALUES(id_ciudad_destino),
+      num_escalas         = VALUES(num_escalas);
+  END IF;
+END//
+
+DROP TRIGGER IF EXISTS tr_ve_resumen_ins//
+CREATE TRIGGER tr_ve_resumen_ins
+AFTER INSERT ON Viaje_Escala
+FOR EACH ROW
+BEGIN
+  CALL sp_refrescar_viaje_resumen(NEW.id_viaje);
+END//
+
+DROP TRIGGER IF EXISTS tr_ve_resumen_upd//
+CREATE TRIGGER tr_ve_resumen_upd
+AFTER UPDATE ON Viaje_Escala
+FOR EACH ROW
+BEGIN
+  CALL sp_refrescar_viaje_resumen(NEW.id_viaje);
+  IF OLD.id_viaje <> NEW.id_viaje THEN
+    CALL sp_refrescar_viaje_resumen(OLD.id_viaje);
+  END IF;
+END//
+
+DROP TRIGGER IF EXISTS tr_ve_resumen_del//
+CREATE TRIGGER tr_ve_resumen_del
+AFTER DELETE ON Viaje_Escala
+FOR EACH ROW
+BEGIN
+  CALL sp_refrescar_viaje_resumen(OLD.id_viaje);
+END//
+
+-- Terminal cambia de ciudad: propagar al resumen
+DROP TRIGGER IF EXISTS tr_terminal_resumen_upd//
+CREATE TRIGGER tr_terminal_resumen_upd
+AFTER UPDATE ON Terminal
+FOR EACH ROW
+BEGIN
+  IF OLD.id_ciudad <> NEW.id_ciudad THEN
+    UPDATE Viaje_Resumen SET id_ciudad_origen = NEW.id_ciudad
+    WHERE id_terminal_origen = NEW.id_terminal;
+    UPDATE Viaje_Resumen SET id_ciudad_destino = NEW.id_ciudad
+    WHERE id_terminal_destino = NEW.id_terminal;
+  END IF;
+END//
+DELIMITER ;
+
+-- Carga inicial (misma consulta que ModelViaje.backfill_resumen)
+INSERT INTO Viaje_Resumen (
+  id_viaje, id_terminal_origen, id_ciudad_origen,
+  id_terminal_destino, id_ciudad_destino, num_escalas
+)
+SELECT
+  m.id_viaje,
+  o.id_terminal, tor.id_ciudad,
+  d.id_terminal, tde.id_ciudad,
+  m.num_escalas
+FROM (
+  SELECT id_viaje,
+         MIN(orden_parada) AS orden_min,
+         MAX(orden_parada) AS orden_max,
+         COUNT(*)          AS num_escalas
+  FROM Viaje_Escala
+  GROUP BY id_viaje
+) m
+JOIN Viaje_Escala o ON o.id_viaje = m.id_viaje AND o.orden_parada = m.orden_min
+JOIN Terminal tor   ON tor.id_terminal = o.id_terminal
+JOIN Viaje_Escala d ON d.id_viaje = m.id_viaje AND d.orden_parada = m.orden_max
+JOIN Terminal tde   ON tde.id_terminal = d.id_terminal
+ON DUPLICATE KEY UPDATE
+  id_terminal_origen  = VALUES(id_terminal_origen),
+  id_ciudad_origen    = VALUES(id_ciudad_origen),
+  id_terminal_destino = VALUES(id_terminal_destino),
+  id_ciudad_destino   = VALUES(id_ciudad_destino),
+  num_escalas         = VALUES(num_escalas);
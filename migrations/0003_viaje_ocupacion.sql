@@ -0,0 +1,123 @@
+-- =========================
+-- Ocupación por viaje (contadores incrementales)
+--   Reemplaza el GROUP BY de vw_asientos_disponibilidad. Lo mantienen
+--   los triggers de Boleto/Viaje/Autobus; la carga inicial va al final.
+--   Para reconstruirlo desde Boleto: flask --app app reconciliar-ocupacion
+-- =========================
+CREATE TABLE IF NOT EXISTS Viaje_Ocupacion (
+  id_viaje             INT NOT NULL PRIMARY KEY,
+  capacidad            INT NOT NULL,
+  asientos_ocupados    INT NOT NULL DEFAULT 0,
+  asientos_disponibles INT AS (capacidad - asientos_ocupados) STORED,
+  CONSTRAINT fk_vo_viaje FOREIGN KEY (id_viaje) REFERENCES Viaje(id_viaje) ON DELETE CASCADE ON UPDATE CASCADE
+) ENGINE=InnoDB;
+
+DELIMITER //
+-- Suma `p_delta` asientos ocupados a un viaje (crea la fila si no existe)
+DROP PROCEDURE IF EXISTS sp_ocupacion_ajustar//
+CREATE PROCEDURE sp_ocupacion_ajustar (IN p_id_viaje INT, IN p_delta INT)
+BEGIN
+  INSERT INTO Viaje_Ocupacion (id_viaje, capacidad, asientos_ocupados)
+  SELECT v.id_viaje, a.capacidad, GREATEST(p_delta, 0)
+  FROM Viaje v
+  JOIN Autobus a ON a.id_autobus = v.id_autobus
+  WHERE v.id_viaje = p_id_viaje
+  ON DUPLICATE KEY UPDATE
+    asientos_ocupados = GREATEST(asientos_ocupados + p_delta, 0);
+END//
+
+DROP TRIGGER IF EXISTS tr_boleto_ocupacion_ins//
+CREATE TRIGGER tr_boleto_ocupacion_ins
+AFTER INSERT ON Boleto
+FOR EACH ROW
+BEGIN
+  IF NEW.estado IN ('Reservado','Pagado','Abordado') THEN
+    CALL sp_ocupacion_ajustar(NEW.id_viaje, 1);
+  END IF;
+END//
+
+DROP TRIGGER IF EXISTS tr_boleto_ocupacion_upd//
+CREATE TRIGGER tr_boleto_ocupacion_upd
+AFTER UPDATE ON Boleto
+FOR EACH ROW
+BEGIN
+  DECLARE v_old TINYINT DEFAULT OLD.estado IN ('Reservado','Pagado','Abordado');
+  DECLARE v_new TINYINT DEFAULT NEW.estado IN ('Reservado','Pagado','Abordado');
+
+  IF OLD.id_viaje = NEW.id_viaje THEN
+    IF v_old <> v_new THEN
+      CALL sp_ocupacion_ajustar(NEW.id_viaje, v_new - v_old);
+    END IF;
+  ELSE
+    IF v_old THEN
+      CALL sp_ocupacion_ajustar(OLD.id_viaje, -1);
+    END IF;
+    IF v_new THEN
+      CALL sp_ocupacion_ajustar(NEW.id_viaje, 1);
+    END IF;
+  END IF;
+END//
+
+DROP TRIGGER IF EXISTS tr_boleto_ocupacion_del//
+CREATE TRIGGER tr_boleto_ocupacion_del
+AFTER DELETE ON Boleto
+FOR EACH ROW
+BEGIN
+  IF OLD.estado IN ('Reservado','Pagado','Abordado') THEN
+    CALL sp_ocupacion_ajustar(OLD.id_viaje, -1);
+  END IF;
+END//
+
+DROP TRIGGER IF EXISTS tr_viaje_ocupacion_ins//
+CREATE TRIGGER tr_viaje_ocupacion_ins
+AFTER INSERT ON Viaje
+FOR EACH ROW
+BEGIN
+  CALL sp_ocupacion_ajustar(NEW.id_viaje, 0);
+END//
+
+DROP TRIGGER IF EXISTS tr_viaje_ocupacion_upd//
+CREATE TRIGGER tr_viaje_ocupacion_upd
+AFTER UPDATE ON Viaje
+FOR EACH ROW
+BEGIN
+  IF OLD.id_autobus <> NEW.id_autobus THEN
+    UPDATE Viaje_Ocupacion vo
+    JOIN Autobus a ON a.id_autobus = NEW.id_autobus
+    SET vo.capacidad = a.capacidad
+    WHERE vo.id_viaje = NEW.id_viaje;
+  END IF;
+END//
+
+DROP TRIGGER IF EXISTS tr_autobus_ocupacion_upd//
+CREATE TRIGGER tr_autobus_ocupacion_upd
+AFTER UPDATE ON Autobus
+FOR EACH ROW
+BEGIN
+  IF OLD.capacidad <> NEW.capacidad THEN
+    UPDATE Viaje_Ocupacion vo
+    JOIN Viaje v ON v.id_viaje = vo.id_viaje
+    SET vo.capacidad = NEW.capacidad
+    WHERE v.id_autobus = NEW.id_autobus;
+  END IF;
+END//
+DELIMITER ;
+
+-- Carga inicial desde Boleto (misma consulta que ModelViaje.reconciliar_ocupacion);
+-- sin ella el primer trigger crearía la fila solo con su delta
+INSERT INTO Viaje_Ocupacion (id_viaje, capacidad, asientos_ocupados)
+SELECT v.id_viaje, a.capacidad, COUNT(b.id_boleto)
+FROM Viaje v
+JOIN Autobus a ON a.id_autobus = v.id_autobus
+LEFT JOIN Boleto b
+       ON b.id_viaje = v.id_viaje
+      AND b.estado IN ('Reservado','Pagado','Abordado')
+GROUP BY v.id_viaje, a.capacidad
+ON DUPLICATE KEY UPDATE
+  capacidad         = VALUES(capacidad),
+  asientos_ocupados = VALUES(asientos_ocupados);
+
+-- La vista conserva sus columnas pero ahora es una lectura O(1) por viaje
+CREATE OR REPLACE VIEW vw_asientos_disponibilidad AS
+SELECT id_viaje, capacidad, asientos_ocupados, asientos_disponibles
+FROM Viaje_Ocupacion;
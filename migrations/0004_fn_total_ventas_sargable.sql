@@ -0,0 +1,24 @@
+-- =========================================
+-- fn_total_ventas_dia_empleado con rango sargable
+--   (usa idx_venta_empleado_fecha en lugar de DATE(fecha_venta) = p_fecha)
+-- =========================================
+DELIMITER //
+DROP FUNCTION IF EXISTS fn_total_ventas_dia_empleado//
+CREATE FUNCTION fn_total_ventas_dia_empleado(
+    p_id_empleado INT,
+    p_fecha DATE
+)
+RETURNS DECIMAL(10,2)
+READS SQL DATA
+BEGIN
+    DECLARE v_total DECIMAL(10,2);
+
+    SELECT COALESCE(SUM(monto),0) INTO v_total
+    FROM   Venta
+    WHERE  id_empleado = p_id_empleado
+      AND  fecha_venta >= p_fecha
+      AND  fecha_venta <  p_fecha + INTERVAL 1 DAY;
+
+    RETURN v_total;
+END//
+DELIMITER ;
@@ -0,0 +1,88 @@
+-- =========================================
+-- Resumen diario de ventas por (fecha, empleado, método de pago)
+--   Lo mantienen los triggers de Venta; home, ventas_hoy y
+--   fn_total_ventas_dia_empleado leen de aquí en lugar de re-agregar Venta.
+--   id_empleado = 0 agrupa las ventas sin empleado (NULL en Venta).
+-- =========================================
+CREATE TABLE IF NOT EXISTS Venta_Resumen_Dia (
+  fecha        DATE NOT NULL,
+  id_empleado  INT  NOT NULL DEFAULT 0,
+  metodo_pago  ENUM('Efectivo','Tarjeta','Transferencia') NOT NULL,
+  num_ventas   INT  NOT NULL DEFAULT 0,
+  total        DECIMAL(12,2) NOT NULL DEFAULT 0.00,
+  PRIMARY KEY (fecha, id_empleado, metodo_pago),
+  KEY idx_vrd_empleado_fecha (id_empleado, fecha)
+) ENGINE=InnoDB;
+
+DELIMITER //
+DROP PROCEDURE IF EXISTS sp_resumen_venta_ajustar//
+CREATE PROCEDURE sp_resumen_venta_ajustar (
+    IN p_fecha       DATETIME,
+    IN p_id_empleado INT,
+    IN p_metodo_pago VARCHAR(20),
+    IN p_num         INT,
+    IN p_monto       DECIMAL(12,2)
+)
+BEGIN
+  INSERT INTO Venta_Resumen_Dia (fecha, id_empleado, metodo_pago, num_ventas, total)
+  VALUES (DATE(p_fecha), COALESCE(p_id_empleado, 0), p_metodo_pago, p_num, p_monto)
+  ON DUPLICATE KEY UPDATE
+    num_ventas = num_ventas + p_num,
+    total      = total + p_monto;
+END//
+
+DROP TRIGGER IF EXISTS tr_venta_resumen_ins//
+CREATE TRIGGER tr_venta_resumen_ins
+AFTER INSERT ON Venta
+FOR EACH ROW
+BEGIN
+  CALL sp_resumen_venta_ajustar(NEW.fecha_venta, NEW.id_empleado, NEW.metodo_pago, 1, NEW.monto);
+END//
+
+DROP TRIGGER IF EXISTS tr_venta_resumen_upd//
+CREATE TRIGGER tr_venta_resumen_upd
+AFTER UPDATE ON Venta
+FOR EACH ROW
+BEGIN
+  IF NOT (OLD.monto <=> NEW.monto)
+     OR NOT (OLD.metodo_pago <=> NEW.metodo_pago)
+     OR NOT (OLD.id_empleado <=> NEW.id_empleado)
+     OR DATE(OLD.fecha_venta) <> DATE(NEW.fecha_venta) THEN
+    CALL sp_resumen_venta_ajustar(OLD.fecha_venta, OLD.id_empleado, OLD.metodo_pago, -1, -OLD.monto);
+    CALL sp_resumen_venta_ajustar(NEW.fecha_venta, NEW.id_empleado, NEW.metodo_pago, 1, NEW.monto);
+  END IF;
+END//
+
+DROP TRIGGER IF EXISTS tr_venta_resumen_del//
+CREATE TRIGGER tr_venta_resumen_del
+AFTER DELETE ON Venta
+FOR EACH ROW
+BEGIN
+  CALL sp_resumen_venta_ajustar(OLD.fecha_venta, OLD.id_empleado, OLD.metodo_pago, -1, -OLD.monto);
+END//
+
+DROP FUNCTION IF EXISTS fn_total_ventas_dia_empleado//
+CREATE FUNCTION fn_total_ventas_dia_empleado(
+    p_id_empleado INT,
+    p_fecha DATE
+)
+RETURNS DECIMAL(10,2)
+READS SQL DATA
+BEGIN
+    DECLARE v_total DECIMAL(10,2);
+
+    SELECT COALESCE(SUM(total),0) INTO v_total
+    FROM   Venta_Resumen_Dia
+    WHERE  id_empleado = p_id_empleado
+      AND  fecha = p_fecha;
+
+    RETURN v_total;
+END//
+DELIMITER ;
+
+-- Carga inicial desde el histórico
+DELETE FROM Venta_Resumen_Dia;
+INSERT INTO Venta_Resumen_Dia (fecha, id_empleado, metodo_pago, num_ventas, total)
+SELECT DATE(fecha_venta), COALESCE(id_empleado, 0), metodo_pago, COUNT(*), SUM(monto)
+FROM Venta
+GROUP BY DATE(fecha_venta), COALESCE(id_empleado, 0), metodo_pago;
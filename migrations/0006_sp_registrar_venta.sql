@@ -0,0 +1,86 @@
+-- =========================================
+-- sp_registrar_venta: venta completa en una sola llamada
+--   Valida el viaje, hace upsert del pasajero, resuelve el empleado,
+--   inserta Boleto y Venta y hace COMMIT dentro del servidor.
+--   El precio lo calcula la app con el índice de tarifas y llega como
+--   parámetro (antes se insertaba monto 0).
+--   Regresa una fila: id_boleto, id_pasajero, precio_total.
+--   DROP PROCEDURE borra los GRANT de la rutina: si se usan los perfiles
+--   de QueryPerfiles.sql, volver a ejecutar su GRANT EXECUTE.
+-- =========================================
+DELIMITER //
+DROP PROCEDURE IF EXISTS sp_registrar_venta//
+CREATE PROCEDURE sp_registrar_venta (
+    IN p_id_viaje     INT,
+    IN p_num_asiento  INT,
+    IN p_nombre       VARCHAR(120),
+    IN p_correo       VARCHAR(120),   -- puede ser NULL
+    IN p_telefono     VARCHAR(25),    -- puede ser NULL
+    IN p_metodo_pago  VARCHAR(20),    -- 'Efectivo','Tarjeta','Transferencia'
+    IN p_id_usuario   INT,            -- usuario de taquilla (para id_empleado)
+    IN p_id_tarifa    INT,            -- puede ser NULL
+    IN p_precio_total DECIMAL(10,2),
+    IN p_nota         VARCHAR(200)
+)
+SQL SECURITY DEFINER
+BEGIN
+    DECLARE v_estado      VARCHAR(20);
+    DECLARE v_salida      DATETIME;
+    DECLARE v_id_pasajero INT;
+    DECLARE v_id_empleado INT;
+    DECLARE v_id_boleto   INT;
+
+    DECLARE EXIT HANDLER FOR SQLEXCEPTION
+    BEGIN
+        ROLLBACK;
+        RESIGNAL;
+    END;
+
+    START TRANSACTION;
+
+    -- 1) Validar viaje
+    SELECT estado, fecha_salida
+    INTO   v_estado, v_salida
+    FROM   Viaje
+    WHERE  id_viaje = p_id_viaje;
+
+    IF v_estado IS NULL THEN
+        SIGNAL SQLSTATE '45000'
+            SET MESSAGE_TEXT = 'El viaje seleccionado ya no existe.';
+    END IF;
+
+    IF v_estado = 'Cancelado' OR v_salida <= NOW() THEN
+        SIGNAL SQLSTATE '45000'
+            SET MESSAGE_TEXT = 'No es posible registrar la venta: el viaje ya salió o fue cancelado.';
+    END IF;
+
+    -- 2) Pasajero: se reutiliza si el correo ya existe
+    IF p_correo IS NOT NULL AND p_correo <> '' THEN
+        INSERT INTO Pasajero (nombre, correo, telefono)
+        VALUES (p_nombre, p_correo, p_telefono)
+        ON DUPLICATE KEY UPDATE id_pasajero = LAST_INSERT_ID(id_pasajero);
+    ELSE
+        INSERT INTO Pasajero (nombre, correo, telefono)
+        VALUES (p_nombre, NULL, p_telefono);
+    END IF;
+    SET v_id_pasajero = LAST_INSERT_ID();
+
+    -- 3) Empleado que vende
+    SELECT id_empleado INTO v_id_empleado
+    FROM   Usuario
+    WHERE  id_usuario = p_id_usuario;
+
+    -- 4) Boleto (tr_boleto_capacidad valida el asiento; uq_boleto_asiento evita duplicados)
+    INSERT INTO Boleto (id_viaje, id_pasajero, id_tarifa, numero_asiento, estado, precio_total)
+    VALUES (p_id_viaje, v_id_pasajero, p_id_tarifa, p_num_asiento, 'Pagado', p_precio_total);
+    SET v_id_boleto = LAST_INSERT_ID();
+
+    -- 5) Venta (tr_venta_snapshot genera Venta_Detalle)
+    INSERT INTO Venta (id_boleto, id_empleado, id_cliente, metodo_pago, monto, nota)
+    VALUES (v_id_boleto, v_id_empleado, NULL, p_metodo_pago, p_precio_total, p_nota);
+
+    COMMIT;
+
+    SELECT v_id_boleto AS id_boleto, v_id_pasajero AS id_pasajero, p_precio_total AS precio_total;
+END//
+DELIMITER ;
@@ -0,0 +1,274 @@
+-- =========================================
+-- Asientos por viaje (una fila por asiento)
+--   Superficie de bloqueo para la venta "cualquier asiento": se elige con
+--   SELECT ... FOR UPDATE SKIP LOCKED, así varias taquillas venden el mismo
+--   viaje en paralelo sin chocar en uq_boleto_asiento.
+--   id_boleto = boleto que ocupa el lugar en uq_boleto_asiento (se libera
+--   solo al borrar el boleto, igual que la restricción única).
+--   Lo mantienen los triggers de Viaje/Autobus/Boleto; para reconstruirlo:
+--   CALL sp_asientos_sincronizar(NULL, NULL);
+-- =========================================
+CREATE TABLE IF NOT EXISTS Viaje_Asiento (
+  id_viaje       INT NOT NULL,
+  numero_asiento INT NOT NULL,
+  -- Distribución 2+2: en cada fila el 1.º y el 4.º son ventanilla
+  posicion       VARCHAR(10) AS (IF((numero_asiento - 1) % 4 IN (0, 3), 'Ventana', 'Pasillo')) STORED,
+  id_boleto      INT NULL,
+  PRIMARY KEY (id_viaje, numero_asiento),
+  KEY idx_va_libres (id_viaje, id_boleto, numero_asiento),
+  CONSTRAINT fk_va_viaje FOREIGN KEY (id_viaje) REFERENCES Viaje(id_viaje) ON DELETE CASCADE ON UPDATE CASCADE
+) ENGINE=InnoDB;
+
+DELIMITER //
+-- Crea las filas faltantes (1..capacidad), liga los boletos existentes y
+-- borra asientos libres que ya no caben. Filtros NULL = todos.
+DROP PROCEDURE IF EXISTS sp_asientos_sincronizar//
+CREATE PROCEDURE sp_asientos_sincronizar (IN p_id_viaje INT, IN p_id_autobus INT)
+BEGIN
+  DECLARE v_max INT;
+  SELECT COALESCE(MAX(capacidad), 0) INTO v_max FROM Autobus;
+
+  INSERT INTO Viaje_Asiento (id_viaje, numero_asiento)
+  WITH RECURSIVE seq (n) AS (
+    SELECT 1
+    UNION ALL
+    SELECT n + 1 FROM seq WHERE n < v_max
+  )
+  SELECT v.id_viaje, seq.n
+  FROM Viaje v
+  JOIN Autobus a ON a.id_autobus = v.id_autobus
+  JOIN seq ON seq.n <= a.capacidad
+  WHERE (p_id_viaje IS NULL OR v.id_viaje = p_id_viaje)
+    AND (p_id_autobus IS NULL OR v.id_autobus = p_id_autobus)
+  ON DUPLICATE KEY UPDATE numero_asiento = Viaje_Asiento.numero_asiento;
+
+  UPDATE Viaje_Asiento va
+  JOIN Viaje v  ON v.id_viaje = va.id_viaje
+  JOIN Boleto b ON b.id_viaje = va.id_viaje AND b.numero_asiento = va.numero_asiento
+  SET va.id_boleto = b.id_boleto
+  WHERE va.id_boleto IS NULL
+    AND (p_id_viaje IS NULL OR v.id_viaje = p_id_viaje)
+    AND (p_id_autobus IS NULL OR v.id_autobus = p_id_autobus);
+
+  DELETE va
+  FROM Viaje_Asiento va
+  JOIN Viaje v   ON v.id_viaje = va.id_viaje
+  JOIN Autobus a ON a.id_autobus = v.id_autobus
+  WHERE va.numero_asiento > a.capacidad
+    AND va.id_boleto IS NULL
+    AND (p_id_viaje IS NULL OR v.id_viaje = p_id_viaje)
+    AND (p_id_autobus IS NULL OR v.id_autobus = p_id_autobus);
+END//
+
+DROP TRIGGER IF EXISTS tr_viaje_asientos_ins//
+CREATE TRIGGER tr_viaje_asientos_ins
+AFTER INSERT ON Viaje
+FOR EACH ROW
+BEGIN
+  CALL sp_asientos_sincronizar(NEW.id_viaje, NULL);
+END//
+
+DROP TRIGGER IF EXISTS tr_viaje_asientos_upd//
+CREATE TRIGGER tr_viaje_asientos_upd
+AFTER UPDATE ON Viaje
+FOR EACH ROW
+BEGIN
+  IF OLD.id_autobus <> NEW.id_autobus THEN
+    CALL sp_asientos_sincronizar(NEW.id_viaje, NULL);
+  END IF;
+END//
+
+DROP TRIGGER IF EXISTS tr_autobus_asientos_upd//
+CREATE TRIGGER tr_autobus_asientos_upd
+AFTER UPDATE ON Autobus
+FOR EACH ROW
+BEGIN
+  IF OLD.capacidad <> NEW.capacidad THEN
+    CALL sp_asientos_sincronizar(NULL, NEW.id_autobus);
+  END IF;
+END//
+
+DROP TRIGGER IF EXISTS tr_boleto_asiento_ins//
+CREATE TRIGGER tr_boleto_asiento_ins
+AFTER INSERT ON Boleto
+FOR EACH ROW
+BEGIN
+  UPDATE Viaje_Asiento
+  SET id_boleto = NEW.id_boleto
+  WHERE id_viaje = NEW.id_viaje AND numero_asiento = NEW.numero_asiento;
+END//
+
+DROP TRIGGER IF EXISTS tr_boleto_asiento_upd//
+CREATE TRIGGER tr_boleto_asiento_upd
+AFTER UPDATE ON Boleto
+FOR EACH ROW
+BEGIN
+  IF OLD.id_viaje <> NEW.id_viaje OR OLD.numero_asiento <> NEW.numero_asiento THEN
+    UPDATE Viaje_Asiento
+    SET id_boleto = NULL
+    WHERE id_viaje = OLD.id_viaje AND numero_asiento = OLD.numero_asiento
+      AND id_boleto = OLD.id_boleto;
+
+    UPDATE Viaje_Asiento
+    SET id_boleto = NEW.id_boleto
+    WHERE id_viaje = NEW.id_viaje AND numero_asiento = NEW.numero_asiento;
+  END IF;
+END//
+
+DROP TRIGGER IF EXISTS tr_boleto_asiento_del//
+CREATE TRIGGER tr_boleto_asiento_del
+AFTER DELETE ON Boleto
+FOR EACH ROW
+BEGIN
+  UPDATE Viaje_Asiento
+  SET id_boleto = NULL
+  WHERE id_viaje = OLD.id_viaje AND numero_asiento = OLD.numero_asiento
+    AND id_boleto = OLD.id_boleto;
+END//
+DELIMITER ;
+
+-- Carga inicial
+CALL sp_asientos_sincronizar(NULL, NULL);
+
+-- =========================================
+-- sp_registrar_venta: p_num_asiento NULL = "cualquier asiento" (opcionalmente
+-- ventana/pasillo), elegido con FOR UPDATE SKIP LOCKED; con asiento explícito
+-- bloquea su fila antes de insertar. Regresa además numero_asiento.
+-- DROP PROCEDURE borra los GRANT de la rutina: si se usan los perfiles
+-- de QueryPerfiles.sql, volver a ejecutar su GRANT EXECUTE.
+-- =========================================
+DELIMITER //
+DROP PROCEDURE IF EXISTS sp_registrar_venta//
+CREATE PROCEDURE sp_registrar_venta (
+    IN p_id_viaje     INT,
+    IN p_num_asiento  INT,            -- NULL = cualquier asiento libre
+    IN p_posicion     VARCHAR(10),    -- con asiento NULL: 'Ventana', 'Pasillo' o NULL
+    IN p_nombre       VARCHAR(120),
+    IN p_correo       VARCHAR(120),   -- puede ser NULL
+    IN p_telefono     VARCHAR(25),    -- puede ser NULL
+    IN p_metodo_pago  VARCHAR(20),    -- 'Efectivo','Tarjeta','Transferencia'
+    IN p_id_usuario   INT,            -- usuario de taquilla (para id_empleado)
+    IN p_id_tarifa    INT,            -- puede ser NULL
+    IN p_precio_total DECIMAL(10,2),
+    IN p_nota         VARCHAR(200)
+)
+SQL SECURITY DEFINER
+BEGIN
+    DECLARE v_estado      VARCHAR(20);
+    DECLARE v_salida      DATETIME;
+    DECLARE v_id_pasajero INT;
+    DECLARE v_id_empleado INT;
+    DECLARE v_id_boleto   INT;
+    DECLARE v_asiento     INT;
+    DECLARE v_ocupado     INT;
+
+    DECLARE EXIT HANDLER FOR SQLEXCEPTION
+    BEGIN
+        ROLLBACK;
+        RESIGNAL;
+    END;
+
+    START TRANSACTION;
+
+    -- 1) Validar viaje
+    SELECT estado, fecha_salida
+    INTO   v_estado, v_salida
+    FROM   Viaje
+    WHERE  id_viaje = p_id_viaje;
+
+    IF v_estado IS NULL THEN
+        SIGNAL SQLSTATE '45000'
+            SET MESSAGE_TEXT = 'El viaje seleccionado ya no existe.';
+    END IF;
+
+    IF v_estado = 'Cancelado' OR v_salida <= NOW() THEN
+        SIGNAL SQLSTATE '45000'
+            SET MESSAGE_TEXT = 'No es posible registrar la venta: el viaje ya salió o fue cancelado.';
+    END IF;
+
+    -- 1b) Asiento
+    IF p_num_asiento IS NULL THEN
+        -- Cualquier asiento: el primero libre (y no apartado por otro), saltando
+        -- los que otras transacciones ya tienen bloqueados
+        SELECT va.numero_asiento INTO v_asiento
+        FROM Viaje_Asiento va
+        WHERE va.id_viaje = p_id_viaje
+          AND va.id_boleto IS NULL
+          AND (p_posicion IS NULL OR va.posicion = p_posicion)
+          AND NOT EXISTS (
+              SELECT 1 FROM Asiento_Retencion r
+              WHERE r.id_viaje = va.id_viaje
+                AND r.numero_asiento = va.numero_asiento
+                AND r.expira_en > NOW()
+                AND r.id_usuario <> p_id_usuario
+          )
+        ORDER BY va.numero_asiento
+        LIMIT 1
+        FOR UPDATE SKIP LOCKED;
+
+        IF v_asiento IS NULL THEN
+            SIGNAL SQLSTATE '45000'
+                SET MESSAGE_TEXT = 'No quedan asientos libres en el viaje con esa preferencia.';
+        END IF;
+    ELSE
+        SET v_asiento = p_num_asiento;
+
+        -- Apartado por otra taquilla (Asiento_Retencion vigente)
+        IF EXISTS (
+            SELECT 1 FROM Asiento_Retencion
+            WHERE id_viaje = p_id_viaje
+              AND numero_asiento = v_asiento
+              AND expira_en > NOW()
+              AND id_usuario <> p_id_usuario
+        ) THEN
+            SIGNAL SQLSTATE '45000'
+                SET MESSAGE_TEXT = 'El asiento está apartado por otra taquilla. Elija otro.';
+        END IF;
+
+        -- Bloquea la fila del asiento (espera si otra venta lo está tomando)
+        SELECT id_boleto INTO v_ocupado
+        FROM Viaje_Asiento
+        WHERE id_viaje = p_id_viaje AND numero_asiento = v_asiento
+        FOR UPDATE;
+
+        IF v_ocupado IS NOT NULL THEN
+            SIGNAL SQLSTATE '45000'
+                SET MESSAGE_TEXT = 'El asiento seleccionado ya fue vendido. Elija otro.';
+        END IF;
+    END IF;
+
+    -- 2) Pasajero: se reutiliza si el correo ya existe
+    IF p_correo IS NOT NULL AND p_correo <> '' THEN
+        INSERT INTO Pasajero (nombre, correo, telefono)
+        VALUES (p_nombre, p_correo, p_telefono)
+        ON DUPLICATE KEY UPDATE id_pasajero = LAST_INSERT_ID(id_pasajero);
+    ELSE
+        INSERT INTO Pasajero (nombre, correo, telefono)
+        VALUES (p_nombre, NULL, p_telefono);
+    END IF;
+    SET v_id_pasajero = LAST_INSERT_ID();
+
+    -- 3) Empleado que vende
+    SELECT id_empleado INTO v_id_empleado
+    FROM   Usuario
+    WHERE  id_usuario = p_id_usuario;
+
+    -- 4) Boleto (tr_boleto_capacidad valida el asiento; uq_boleto_asiento evita duplicados)
+    INSERT INTO Boleto (id_viaje, id_pasajero, id_tarifa, numero_asiento, estado, precio_total)
+    VALUES (p_id_viaje, v_id_pasajero, p_id_tarifa, v_asiento, 'Pagado', p_precio_total);
+    SET v_id_boleto = LAST_INSERT_ID();
+
+    -- 5) Venta (tr_venta_snapshot genera Venta_Detalle)
+    INSERT INTO Venta (id_boleto, id_empleado, id_cliente, metodo_pago, monto, nota)
+    VALUES (v_id_boleto, v_id_empleado, NULL, p_metodo_pago, p_precio_total, p_nota);
+
+    -- 6) El asiento ya está vendido: se suelta el apartado
+    DELETE FROM Asiento_Retencion
+    WHERE id_viaje = p_id_viaje AND numero_asiento = v_asiento;
+
+    COMMIT;
+
+    SELECT v_id_boleto AS id_boleto, v_id_pasajero AS id_pasajero,
+           v_asiento AS numero_asiento, p_precio_total AS precio_total;
+END//
+DELIMITER ;
@@ -0,0 +1,239 @@
+-- =========================================
+-- Venta_Detalle: teléfono del pasajero y autobús
+--   Con estos datos la confirmación y la reimpresión del boleto salen
+--   completas de la fila del snapshot (ver confirmacion_venta), sin volver
+--   a unir Pasajero/Viaje/Autobus/Viaje_Resumen.
+--   tr_venta_snapshot y sp_venta_detalle_procesar los llenan desde aquí;
+--   las filas anteriores se completan una vez con los datos actuales.
+--   DROP PROCEDURE borra los GRANT de la rutina: si se usan los perfiles
+--   de QueryPerfiles.sql, volver a ejecutar su GRANT EXECUTE.
+-- =========================================
+ALTER TABLE Venta_Detalle
+  ADD COLUMN pasajero_telefono VARCHAR(25) NULL AFTER pasajero_correo,
+  ADD COLUMN autobus_placa     VARCHAR(20) NULL AFTER numero_asiento,
+  ADD COLUMN autobus_numero    VARCHAR(20) NULL AFTER autobus_placa;
+
+UPDATE Venta_Detalle vd
+JOIN Boleto b   ON b.id_boleto   = vd.id_boleto
+JOIN Pasajero p ON p.id_pasajero = b.id_pasajero
+JOIN Viaje v    ON v.id_viaje    = b.id_viaje
+LEFT JOIN Autobus a ON a.id_autobus = v.id_autobus
+SET vd.pasajero_telefono = p.telefono,
+    vd.autobus_placa     = a.numero_placa,
+    vd.autobus_numero    = a.numero_fisico;
+
+DELIMITER //
+DROP TRIGGER IF EXISTS tr_venta_snapshot//
+CREATE TRIGGER tr_venta_snapshot
+AFTER INSERT ON Venta
+FOR EACH ROW
+BEGIN
+  -- Comprador (cliente) si existe
+  DECLARE v_cliente_nombre   VARCHAR(120);
+  DECLARE v_cliente_correo   VARCHAR(120);
+  DECLARE v_cliente_telefono VARCHAR(25);
+
+  -- Pasajero y viaje
+  DECLARE v_pasajero_nombre VARCHAR(120);
+  DECLARE v_pasajero_correo VARCHAR(120);
+  DECLARE v_pasajero_tel    VARCHAR(25);
+  DECLARE v_ruta_nombre     VARCHAR(120);
+  DECLARE v_fecha_salida    DATETIME;
+  DECLARE v_fecha_llegada   DATETIME;
+  DECLARE v_asiento         INT;
+  DECLARE v_autobus_placa   VARCHAR(20);
+  DECLARE v_autobus_numero  VARCHAR(20);
+  DECLARE v_clase_nombre    VARCHAR(60);
+  DECLARE v_precio_base     DECIMAL(10,2);
+  DECLARE v_recargo_fijo    DECIMAL(10,2);
+  DECLARE v_recargo_pct     DECIMAL(5,2);
+  DECLARE v_impuesto        DECIMAL(10,2);
+  DECLARE v_precio_total    DECIMAL(10,2);
+  DECLARE v_origen_ciudad   VARCHAR(100);
+  DECLARE v_origen_terminal VARCHAR(120);
+  DECLARE v_dest_ciudad     VARCHAR(100);
+  DECLARE v_dest_terminal   VARCHAR(120);
+
+  IF @venta_detalle_diferido = 1 THEN
+    -- Modo diferido: sp_venta_detalle_procesar arma el snapshot después
+    INSERT INTO Venta_Detalle_Pendiente (id_venta) VALUES (NEW.id_venta);
+  ELSE
+    -- Datos base (venta, boleto, pasajero, viaje, ruta, clase/tarifa)
+    SELECT 
+        p.nombre, p.correo, p.telefono,
+        r.nombre,
+        v.fecha_salida, v.fecha_llegada,
+        b.numero_asiento, a.numero_placa, a.numero_fisico,
+        cs.nombre,
+        COALESCE(t.precio_base, 0.00),
+        COALESCE(cs.recargo_fijo, 0.00),
+        COALESCE(cs.recargo_pct, 0.00),
+        COALESCE(t.impuesto, 0.00),
+        COALESCE(b.precio_total,
+                 COALESCE(t.precio_base,0.00) + COALESCE(cs.recargo_fijo,0.00)
+                 + (COALESCE(t.precio_base,0.00) * COALESCE(cs.recargo_pct,0.00) / 100.00)
+                 + COALESCE(t.impuesto,0.00))
+    INTO
+        v_pasajero_nombre, v_pasajero_correo, v_pasajero_tel,
+        v_ruta_nombre,
+        v_fecha_salida, v_fecha_llegada,
+        v_asiento, v_autobus_placa, v_autobus_numero,
+        v_clase_nombre,
+        v_precio_base, v_recargo_fijo, v_recargo_pct, v_impuesto, v_precio_total
+    FROM Venta ve
+    JOIN Boleto b     ON b.id_boleto = ve.id_boleto
+    JOIN Pasajero p   ON p.id_pasajero = b.id_pasajero
+    JOIN Viaje v      ON v.id_viaje   = b.id_viaje
+    JOIN Ruta  r      ON r.id_ruta    = v.id_ruta
+    LEFT JOIN Tarifa t      ON t.id_tarifa = b.id_tarifa
+    LEFT JOIN Autobus a     ON a.id_autobus = v.id_autobus
+    LEFT JOIN ClaseServicio cs ON cs.id_clase = a.id_clase
+    WHERE ve.id_venta = NEW.id_venta;
+
+    -- Comprador (si Venta.id_cliente no es NULL)
+    IF NEW.id_cliente IS NOT NULL THEN
+      SELECT c.nombre, c.correo, c.telefono
+      INTO   v_cliente_nombre, v_cliente_correo, v_cliente_telefono
+      FROM Cliente c
+      WHERE c.id_cliente = NEW.id_cliente;
+    ELSE
+      -- Si no hay cliente explícito, asumimos que el comprador = pasajero
+      SET v_cliente_nombre   = v_pasajero_nombre;
+      SET v_cliente_correo   = v_pasajero_correo;
+      SET v_cliente_telefono = NULL;
+    END IF;
+
+    -- Origen y destino (si existen escalas)
+    SELECT c.nombre, t.nombre
+    INTO   v_origen_ciudad, v_origen_terminal
+    FROM Viaje_Escala ve
+    JOIN Terminal t ON t.id_terminal = ve.id_terminal
+    JOIN Ciudad   c ON c.id_ciudad   = t.id_ciudad
+    WHERE ve.id_viaje = (SELECT b2.id_viaje FROM Boleto b2 WHERE b2.id_boleto = NEW.id_boleto)
+    ORDER BY ve.orden_parada ASC
+    LIMIT 1;
+
+    SELECT c.nombre, t.nombre
+    INTO   v_dest_ciudad, v_dest_terminal
+    FROM Viaje_Escala ve
+    JOIN Terminal t ON t.id_terminal = ve.id_terminal
+    JOIN Ciudad   c ON c.id_ciudad   = t.id_ciudad
+    WHERE ve.id_viaje = (SELECT b3.id_viaje FROM Boleto b3 WHERE b3.id_boleto = NEW.id_boleto)
+    ORDER BY ve.orden_parada DESC
+    LIMIT 1;
+
+    -- Inserta snapshot
+    INSERT INTO Venta_Detalle(
+      id_venta, id_boleto,
+      cliente_nombre, cliente_correo, cliente_telefono,
+      pasajero_nombre, pasajero_correo, pasajero_telefono,
+      ruta_nombre, origen_ciudad, origen_terminal, destino_ciudad, destino_terminal,
+      fecha_salida, fecha_llegada, numero_asiento, autobus_placa, autobus_numero,
+      clase_nombre, precio_base, recargo_fijo, recargo_pct, impuesto, precio_total,
+      metodo_pago, moneda
+    ) VALUES (
+      NEW.id_venta, NEW.id_boleto,
+      v_cliente_nombre, v_cliente_correo, v_cliente_telefono,
+      v_pasajero_nombre, v_pasajero_correo, v_pasajero_tel,
+      v_ruta_nombre, v_origen_ciudad, v_origen_terminal, v_dest_ciudad, v_dest_terminal,
+      v_fecha_salida, v_fecha_llegada, v_asiento, v_autobus_placa, v_autobus_numero,
+      v_clase_nombre, v_precio_base, v_recargo_fijo, v_recargo_pct, v_impuesto, v_precio_total,
+      NEW.metodo_pago, 'MXN'
+    );
+  END IF;
+END//
+
+-- Arma por lotes los snapshots pendientes (un INSERT ... SELECT por lote).
+-- Un solo procesador a la vez (GET_LOCK); otra llamada concurrente regresa
+-- procesadas = 0. Regresa una fila (procesadas, sin_snapshot): sin_snapshot
+-- cuenta las ventas del lote que no se pudieron armar y siguen pendientes.
+DROP PROCEDURE IF EXISTS sp_venta_detalle_procesar//
+CREATE PROCEDURE sp_venta_detalle_procesar (IN p_lote INT)
+BEGIN
+  DECLARE v_lote       INT DEFAULT 0;
+  DECLARE v_procesadas INT DEFAULT 0;
+
+  DECLARE EXIT HANDLER FOR SQLEXCEPTION
+  BEGIN
+    ROLLBACK;
+    DROP TEMPORARY TABLE IF EXISTS tmp_vd_lote;
+    DO RELEASE_LOCK('buslink_venta_detalle');
+    RESIGNAL;
+  END;
+
+  IF GET_LOCK('buslink_venta_detalle', 0) = 1 THEN
+    DROP TEMPORARY TABLE IF EXISTS tmp_vd_lote;
+    CREATE TEMPORARY TABLE tmp_vd_lote (id_venta INT NOT NULL PRIMARY KEY) ENGINE=MEMORY;
+
+    START TRANSACTION;
+
+    INSERT INTO tmp_vd_lote (id_venta)
+    SELECT id_venta
+    FROM Venta_Detalle_Pendiente
+    ORDER BY id_venta
+    LIMIT p_lote;
+    SET v_lote = ROW_COUNT();
+
+    -- Mismo snapshot que tr_venta_snapshot; origen/destino desde
+    -- Viaje_Resumen en lugar de ordenar Viaje_Escala por venta
+    INSERT INTO Venta_Detalle(
+      id_venta, id_boleto,
+      cliente_nombre, cliente_correo, cliente_telefono,
+      pasajero_nombre, pasajero_correo, pasajero_telefono,
+      ruta_nombre, origen_ciudad, origen_terminal, destino_ciudad, destino_terminal,
+      fecha_salida, fecha_llegada, numero_asiento, autobus_placa, autobus_numero,
+      clase_nombre, precio_base, recargo_fijo, recargo_pct, impuesto, precio_total,
+      metodo_pago, moneda
+    )
+    SELECT
+      ve.id_venta, ve.id_boleto,
+      IF(ve.id_cliente IS NULL, p.nombre, c.nombre),
+      IF(ve.id_cliente IS NULL, p.correo, c.correo),
+      c.telefono,
+      p.nombre, p.correo, p.telefono,
+      r.nombre, cor.nombre, tor.nombre, cde.nombre, tde.nombre,
+      v.fecha_salida, v.fecha_llegada, b.numero_asiento, a.numero_placa, a.numero_fisico,
+      cs.nombre,
+      COALESCE(t.precio_base, 0.00),
+      COALESCE(cs.recargo_fijo, 0.00),
+      COALESCE(cs.recargo_pct, 0.00),
+      COALESCE(t.impuesto, 0.00),
+      COALESCE(b.precio_total,
+               COALESCE(t.precio_base,0.00) + COALESCE(cs.recargo_fijo,0.00)
+               + (COALESCE(t.precio_base,0.00) * COALESCE(cs.recargo_pct,0.00) / 100.00)
+               + COALESCE(t.impuesto,0.00)),
+      ve.metodo_pago, 'MXN'
+    FROM tmp_vd_lote l
+    JOIN Venta ve     ON ve.id_venta   = l.id_venta
+    JOIN Boleto b     ON b.id_boleto   = ve.id_boleto
+    JOIN Pasajero p   ON p.id_pasajero = b.id_pasajero
+    JOIN Viaje v      ON v.id_viaje    = b.id_viaje
+    JOIN Ruta  r      ON r.id_ruta     = v.id_ruta
+    LEFT JOIN Tarifa t         ON t.id_tarifa   = b.id_tarifa
+    LEFT JOIN Autobus a        ON a.id_autobus  = v.id_autobus
+    LEFT JOIN ClaseServicio cs ON cs.id_clase   = a.id_clase
+    LEFT JOIN Cliente c        ON c.id_cliente  = ve.id_cliente
+    LEFT JOIN Viaje_Resumen vr ON vr.id_viaje   = v.id_viaje
+    LEFT JOIN Terminal tor     ON tor.id_terminal = vr.id_terminal_origen
+    LEFT JOIN Ciudad   cor     ON cor.id_ciudad   = tor.id_ciudad
+    LEFT JOIN Terminal tde     ON tde.id_terminal = vr.id_terminal_destino
+    LEFT JOIN Ciudad   cde     ON cde.id_ciudad   = tde.id_ciudad
+    LEFT JOIN Venta_Detalle vd ON vd.id_venta   = ve.id_venta
+    WHERE vd.id_venta IS NULL;
+
+    -- Solo sale de la cola lo que ya tiene snapshot
+    DELETE vdp
+    FROM Venta_Detalle_Pendiente vdp
+    JOIN tmp_vd_lote l     ON l.id_venta  = vdp.id_venta
+    JOIN Venta_Detalle vd  ON vd.id_venta = vdp.id_venta;
+    SET v_procesadas = ROW_COUNT();
+
+    COMMIT;
+
+    DROP TEMPORARY TABLE IF EXISTS tmp_vd_lote;
+    DO RELEASE_LOCK('buslink_venta_detalle');
+  END IF;
+
+  SELECT v_procesadas AS procesadas, v_lote - v_procesadas AS sin_snapshot;
+END//
+DELIMITER ;
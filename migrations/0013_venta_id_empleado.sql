@@ -0,0 +1,201 @@
+-- =========================================
+-- sp_venta_insertar / sp_registrar_venta: nuevo parámetro p_id_empleado
+--   (después de p_id_usuario). La app ya tiene el id_empleado en la sesión
+--   (User.id_empleado) y lo manda, así que la venta no consulta Usuario;
+--   con NULL se sigue buscando como antes.
+-- DROP PROCEDURE borra los GRANT de la rutina: si se usan los perfiles
+-- de QueryPerfiles.sql, volver a ejecutar su GRANT EXECUTE.
+-- =========================================
+DELIMITER //
+DROP PROCEDURE IF EXISTS sp_venta_insertar//
+CREATE PROCEDURE sp_venta_insertar (
+    IN p_id_viaje     INT,
+    IN p_num_asiento  INT,            -- NULL = cualquier asiento libre
+    IN p_posicion     VARCHAR(10),    -- con asiento NULL: 'Ventana', 'Pasillo' o NULL
+    IN p_nombre       VARCHAR(120),
+    IN p_correo       VARCHAR(120),   -- puede ser NULL
+    IN p_telefono     VARCHAR(25),    -- puede ser NULL
+    IN p_metodo_pago  VARCHAR(20),    -- 'Efectivo','Tarjeta','Transferencia'
+    IN p_id_usuario   INT,            -- usuario de taquilla
+    IN p_id_empleado  INT,            -- empleado que vende (NULL = se busca por p_id_usuario)
+    IN p_id_tarifa    INT,            -- puede ser NULL
+    IN p_precio_total DECIMAL(10,2),
+    IN p_nota         VARCHAR(200),
+    IN p_clave        VARCHAR(64),    -- llave de idempotencia (NULL = sin llave)
+    IN p_horas_clave  INT             -- vigencia de la llave
+)
+SQL SECURITY DEFINER
+proc: BEGIN
+    DECLARE v_estado      VARCHAR(20);
+    DECLARE v_salida      DATETIME;
+    DECLARE v_id_pasajero INT;
+    DECLARE v_id_empleado INT;
+    DECLARE v_id_boleto   INT;
+    DECLARE v_asiento     INT;
+    DECLARE v_ocupado     INT;
+
+    -- 0) Idempotencia: si la llave ya existe, la venta ya se hizo (o la está
+    --    haciendo otra transacción; el INSERT espera su COMMIT) y se regresa
+    --    ese mismo boleto sin escribir nada.
+    IF p_clave IS NOT NULL THEN
+        INSERT IGNORE INTO Venta_Idempotencia (clave, id_usuario, expira_en)
+        VALUES (p_clave, p_id_usuario, NOW() + INTERVAL p_horas_clave HOUR);
+
+        IF ROW_COUNT() = 0 THEN
+            SELECT id_boleto INTO v_id_boleto
+            FROM Venta_Idempotencia
+            WHERE clave = p_clave
+            FOR SHARE;
+
+            SELECT b.id_boleto, b.id_pasajero, b.numero_asiento, b.precio_total, 1 AS repetida
+            FROM Boleto b
+            WHERE b.id_boleto = v_id_boleto;
+            LEAVE proc;
+        END IF;
+    END IF;
+
+    -- 1) Validar viaje
+    SELECT estado, fecha_salida
+    INTO   v_estado, v_salida
+    FROM   Viaje
+    WHERE  id_viaje = p_id_viaje;
+
+    IF v_estado IS NULL THEN
+        SIGNAL SQLSTATE '45000'
+            SET MESSAGE_TEXT = 'El viaje seleccionado ya no existe.';
+    END IF;
+
+    IF v_estado = 'Cancelado' OR v_salida <= NOW() THEN
+        SIGNAL SQLSTATE '45000'
+            SET MESSAGE_TEXT = 'No es posible registrar la venta: el viaje ya salió o fue cancelado.';
+    END IF;
+
+    -- 1b) Asiento
+    IF p_num_asiento IS NULL THEN
+        -- Cualquier asiento: el primero libre (y no apartado por otro), saltando
+        -- los que otras transacciones ya tienen bloqueados
+        SELECT va.numero_asiento INTO v_asiento
+        FROM Viaje_Asiento va
+        WHERE va.id_viaje = p_id_viaje
+          AND va.id_boleto IS NULL
+          AND (p_posicion IS NULL OR va.posicion = p_posicion)
+          AND NOT EXISTS (
+              SELECT 1 FROM Asiento_Retencion r
+              WHERE r.id_viaje = va.id_viaje
+                AND r.numero_asiento = va.numero_asiento
+                AND r.expira_en > NOW()
+                AND r.id_usuario <> p_id_usuario
+          )
+        ORDER BY va.numero_asiento
+        LIMIT 1
+        FOR UPDATE SKIP LOCKED;
+
+        IF v_asiento IS NULL THEN
+            SIGNAL SQLSTATE '45000'
+                SET MESSAGE_TEXT = 'No quedan asientos libres en el viaje con esa preferencia.';
+        END IF;
+    ELSE
+        SET v_asiento = p_num_asiento;
+
+        -- Apartado por otra taquilla (Asiento_Retencion vigente)
+        IF EXISTS (
+            SELECT 1 FROM Asiento_Retencion
+            WHERE id_viaje = p_id_viaje
+              AND numero_asiento = v_asiento
+              AND expira_en > NOW()
+              AND id_usuario <> p_id_usuario
+        ) THEN
+            SIGNAL SQLSTATE '45000'
+                SET MESSAGE_TEXT = 'El asiento está apartado por otra taquilla. Elija otro.';
+        END IF;
+
+        -- Bloquea la fila del asiento (espera si otra venta lo está tomando)
+        SELECT id_boleto INTO v_ocupado
+        FROM Viaje_Asiento
+        WHERE id_viaje = p_id_viaje AND numero_asiento = v_asiento
+        FOR UPDATE;
+
+        IF v_ocupado IS NOT NULL THEN
+            SIGNAL SQLSTATE '45000'
+                SET MESSAGE_TEXT = 'El asiento seleccionado ya fue vendido. Elija otro.';
+        END IF;
+    END IF;
+
+    -- 2) Pasajero: se reutiliza si el correo ya existe
+    IF p_correo IS NOT NULL AND p_correo <> '' THEN
+        INSERT INTO Pasajero (nombre, correo, telefono)
+        VALUES (p_nombre, p_correo, p_telefono)
+        ON DUPLICATE KEY UPDATE id_pasajero = LAST_INSERT_ID(id_pasajero);
+    ELSE
+        INSERT INTO Pasajero (nombre, correo, telefono)
+        VALUES (p_nombre, NULL, p_telefono);
+    END IF;
+    SET v_id_pasajero = LAST_INSERT_ID();
+
+    -- 3) Empleado que vende: la app lo manda desde la sesión; otros
+    --    llamadores pueden pasar NULL y se busca en Usuario
+    SET v_id_empleado = p_id_empleado;
+    IF v_id_empleado IS NULL THEN
+        SELECT id_empleado INTO v_id_empleado
+        FROM   Usuario
+        WHERE  id_usuario = p_id_usuario;
+    END IF;
+
+    -- 4) Boleto (tr_boleto_capacidad valida el asiento; uq_boleto_asiento evita duplicados)
+    INSERT INTO Boleto (id_viaje, id_pasajero, id_tarifa, numero_asiento, estado, precio_total)
+    VALUES (p_id_viaje, v_id_pasajero, p_id_tarifa, v_asiento, 'Pagado', p_precio_total);
+    SET v_id_boleto = LAST_INSERT_ID();
+
+    -- 5) Venta (tr_venta_snapshot genera Venta_Detalle)
+    INSERT INTO Venta (id_boleto, id_empleado, id_cliente, metodo_pago, monto, nota)
+    VALUES (v_id_boleto, v_id_empleado, NULL, p_metodo_pago, p_precio_total, p_nota);
+
+    -- 6) El asiento ya está vendido: se suelta el apartado
+    DELETE FROM Asiento_Retencion
+    WHERE id_viaje = p_id_viaje AND numero_asiento = v_asiento;
+
+    -- 7) Resultado ligado a la llave
+    IF p_clave IS NOT NULL THEN
+        UPDATE Venta_Idempotencia
+        SET id_boleto = v_id_boleto
+        WHERE clave = p_clave;
+    END IF;
+
+    SELECT v_id_boleto AS id_boleto, v_id_pasajero AS id_pasajero,
+           v_asiento AS numero_asiento, p_precio_total AS precio_total, 0 AS repetida;
+END//
+
+DROP PROCEDURE IF EXISTS sp_registrar_venta//
+CREATE PROCEDURE sp_registrar_venta (
+    IN p_id_viaje     INT,
+    IN p_num_asiento  INT,            -- NULL = cualquier asiento libre
+    IN p_posicion     VARCHAR(10),    -- con asiento NULL: 'Ventana', 'Pasillo' o NULL
+    IN p_nombre       VARCHAR(120),
+    IN p_correo       VARCHAR(120),   -- puede ser NULL
+    IN p_telefono     VARCHAR(25),    -- puede ser NULL
+    IN p_metodo_pago  VARCHAR(20),    -- 'Efectivo','Tarjeta','Transferencia'
+    IN p_id_usuario   INT,            -- usuario de taquilla
+    IN p_id_empleado  INT,            -- empleado que vende (NULL = se busca por p_id_usuario)
+    IN p_id_tarifa    INT,            -- puede ser NULL
+    IN p_precio_total DECIMAL(10,2),
+    IN p_nota         VARCHAR(200),
+    IN p_clave        VARCHAR(64),    -- llave de idempotencia (NULL = sin llave)
+    IN p_horas_clave  INT             -- vigencia de la llave
+)
+SQL SECURITY DEFINER
+BEGIN
+    DECLARE EXIT HANDLER FOR SQLEXCEPTION
+    BEGIN
+        ROLLBACK;
+        RESIGNAL;
+    END;
+
+    START TRANSACTION;
+    CALL sp_venta_insertar(p_id_viaje, p_num_asiento, p_posicion,
+                           p_nombre, p_correo, p_telefono,
+                           p_metodo_pago, p_id_usuario, p_id_empleado,
+                           p_id_tarifa, p_precio_total,
+                           p_nota, p_clave, p_horas_clave);
+    COMMIT;
+END//
+DELIMITER ;
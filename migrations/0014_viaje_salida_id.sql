@@ -0,0 +1,6 @@
+-- =========================================
+-- Paginación de viajes próximos por (fecha_salida, id_viaje)
+--   (ModelViaje.proximos): el índice da el orden de la página y el
+--   punto de arranque de la siguiente sin OFFSET ni filesort.
+-- =========================================
+CREATE INDEX idx_viaje_salida_id ON Viaje (fecha_salida, id_viaje);
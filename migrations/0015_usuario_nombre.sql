@@ -0,0 +1,5 @@
+-- =========================================
+-- Directorio de usuarios del panel de admin (ModelUser.listar):
+--   se pagina en orden de nombre_completo.
+-- =========================================
+CREATE INDEX idx_usuario_nombre ON Usuario (nombre_completo);
@@ -0,0 +1,99 @@
+-- =========================================
+-- Boleto cancelado libera su asiento
+--   uq_boleto_asiento pasa a (id_viaje, asiento_activo): asiento_activo es
+--   numero_asiento mientras el boleto ocupa lugar (mismos estados que
+--   Viaje_Ocupacion y SeatInventory) y NULL en otro caso, así que un
+--   boleto cancelado deja de bloquear el asiento para una venta nueva.
+--   Viaje_Asiento.id_boleto sigue al boleto activo: se limpia al cancelar
+--   y se vuelve a ligar si el boleto se reactiva (la reactivación falla
+--   por uq_boleto_asiento si el asiento ya se vendió a otro).
+--   Sin GRANT que reponer: sp_asientos_sincronizar solo la usan triggers.
+-- =========================================
+ALTER TABLE Boleto
+  ADD COLUMN asiento_activo INT
+    AS (IF(estado IN ('Reservado','Pagado','Abordado'), numero_asiento, NULL)) STORED
+    AFTER numero_asiento;
+
+-- Primero el índice nuevo: fk_boleto_viaje necesita uno que empiece con id_viaje
+ALTER TABLE Boleto ADD CONSTRAINT uq_boleto_asiento_activo UNIQUE (id_viaje, asiento_activo);
+ALTER TABLE Boleto DROP INDEX uq_boleto_asiento;
+ALTER TABLE Boleto RENAME INDEX uq_boleto_asiento_activo TO uq_boleto_asiento;
+
+DELIMITER //
+DROP PROCEDURE IF EXISTS sp_asientos_sincronizar//
+CREATE PROCEDURE sp_asientos_sincronizar (IN p_id_viaje INT, IN p_id_autobus INT)
+BEGIN
+  DECLARE v_max INT;
+  SELECT COALESCE(MAX(capacidad), 0) INTO v_max FROM Autobus;
+
+  INSERT INTO Viaje_Asiento (id_viaje, numero_asiento)
+  WITH RECURSIVE seq (n) AS (
+    SELECT 1
+    UNION ALL
+    SELECT n + 1 FROM seq WHERE n < v_max
+  )
+  SELECT v.id_viaje, seq.n
+  FROM Viaje v
+  JOIN Autobus a ON a.id_autobus = v.id_autobus
+  JOIN seq ON seq.n <= a.capacidad
+  WHERE (p_id_viaje IS NULL OR v.id_viaje = p_id_viaje)
+    AND (p_id_autobus IS NULL OR v.id_autobus = p_id_autobus)
+  ON DUPLICATE KEY UPDATE numero_asiento = Viaje_Asiento.numero_asiento;
+
+  UPDATE Viaje_Asiento va
+  JOIN Viaje v  ON v.id_viaje = va.id_viaje
+  JOIN Boleto b ON b.id_viaje = va.id_viaje AND b.asiento_activo = va.numero_asiento
+  SET va.id_boleto = b.id_boleto
+  WHERE va.id_boleto IS NULL
+    AND (p_id_viaje IS NULL OR v.id_viaje = p_id_viaje)
+    AND (p_id_autobus IS NULL OR v.id_autobus = p_id_autobus);
+
+  DELETE va
+  FROM Viaje_Asiento va
+  JOIN Viaje v   ON v.id_viaje = va.id_viaje
+  JOIN Autobus a ON a.id_autobus = v.id_autobus
+  WHERE va.numero_asiento > a.capacidad
+    AND va.id_boleto IS NULL
+    AND (p_id_viaje IS NULL OR v.id_viaje = p_id_viaje)
+    AND (p_id_autobus IS NULL OR v.id_autobus = p_id_autobus);
+END//
+
+DROP TRIGGER IF EXISTS tr_boleto_asiento_ins//
+CREATE TRIGGER tr_boleto_asiento_ins
+AFTER INSERT ON Boleto
+FOR EACH ROW
+BEGIN
+  IF NEW.asiento_activo IS NOT NULL THEN
+    UPDATE Viaje_Asiento
+    SET id_boleto = NEW.id_boleto
+    WHERE id_viaje = NEW.id_viaje AND numero_asiento = NEW.asiento_activo;
+  END IF;
+END//
+
+DROP TRIGGER IF EXISTS tr_boleto_asiento_upd//
+CREATE TRIGGER tr_boleto_asiento_upd
+AFTER UPDATE ON Boleto
+FOR EACH ROW
+BEGIN
+  IF NOT (OLD.id_viaje <=> NEW.id_viaje AND OLD.asiento_activo <=> NEW.asiento_activo) THEN
+    IF OLD.asiento_activo IS NOT NULL THEN
+      UPDATE Viaje_Asiento
+      SET id_boleto = NULL
+      WHERE id_viaje = OLD.id_viaje AND numero_asiento = OLD.asiento_activo
+        AND id_boleto = OLD.id_boleto;
+    END IF;
+
+    IF NEW.asiento_activo IS NOT NULL THEN
+      UPDATE Viaje_Asiento
+      SET id_boleto = NEW.id_boleto
+      WHERE id_viaje = NEW.id_viaje AND numero_asiento = NEW.asiento_activo;
+    END IF;
+  END IF;
+END//
+DELIMITER ;
+
+-- Asientos de boletos ya cancelados
+UPDATE Viaje_Asiento va
+JOIN Boleto b ON b.id_boleto = va.id_boleto
+SET va.id_boleto = NULL
+WHERE b.asiento_activo IS NULL;
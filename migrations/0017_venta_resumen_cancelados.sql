@@ -0,0 +1,86 @@
+-- =========================================
+-- Venta_Resumen_Dia sin las ventas de boletos cancelados
+--   sp_cancelar_boleto solo cambia Boleto.estado (y la nota de la venta),
+--   así que el resumen se ajusta desde Boleto: al pasar a 'Cancelado' sus
+--   ventas salen del resumen y vuelven a entrar si el boleto se reactiva.
+--   Los triggers de Venta ya no cuentan ventas de un boleto cancelado.
+-- =========================================
+DELIMITER //
+-- Suma (p_signo = 1) o resta (-1) al resumen todas las ventas de un boleto
+DROP PROCEDURE IF EXISTS sp_resumen_boleto_ajustar//
+CREATE PROCEDURE sp_resumen_boleto_ajustar (IN p_id_boleto INT, IN p_signo INT)
+BEGIN
+  INSERT INTO Venta_Resumen_Dia (fecha, id_empleado, metodo_pago, num_ventas, total)
+  SELECT d.fecha, d.id_empleado, d.metodo_pago, d.num, d.monto
+  FROM (
+    SELECT DATE(fecha_venta) AS fecha, COALESCE(id_empleado, 0) AS id_empleado,
+           metodo_pago, p_signo * COUNT(*) AS num, p_signo * SUM(monto) AS monto
+    FROM Venta
+    WHERE id_boleto = p_id_boleto
+    GROUP BY DATE(fecha_venta), COALESCE(id_empleado, 0), metodo_pago
+  ) AS d
+  ON DUPLICATE KEY UPDATE
+    num_ventas = Venta_Resumen_Dia.num_ventas + d.num,
+    total      = Venta_Resumen_Dia.total + d.monto;
+END//
+
+DROP TRIGGER IF EXISTS tr_boleto_resumen_upd//
+CREATE TRIGGER tr_boleto_resumen_upd
+AFTER UPDATE ON Boleto
+FOR EACH ROW
+BEGIN
+  IF OLD.estado <> 'Cancelado' AND NEW.estado = 'Cancelado' THEN
+    CALL sp_resumen_boleto_ajustar(NEW.id_boleto, -1);
+  ELSEIF OLD.estado = 'Cancelado' AND NEW.estado <> 'Cancelado' THEN
+    CALL sp_resumen_boleto_ajustar(NEW.id_boleto, 1);
+  END IF;
+END//
+
+DROP TRIGGER IF EXISTS tr_venta_resumen_ins//
+CREATE TRIGGER tr_venta_resumen_ins
+AFTER INSERT ON Venta
+FOR EACH ROW
+BEGIN
+  IF NOT EXISTS (SELECT 1 FROM Boleto WHERE id_boleto = NEW.id_boleto AND estado = 'Cancelado') THEN
+    CALL sp_resumen_venta_ajustar(NEW.fecha_venta, NEW.id_empleado, NEW.metodo_pago, 1, NEW.monto);
+  END IF;
+END//
+
+DROP TRIGGER IF EXISTS tr_venta_resumen_upd//
+CREATE TRIGGER tr_venta_resumen_upd
+AFTER UPDATE ON Venta
+FOR EACH ROW
+BEGIN
+  IF NOT (OLD.monto <=> NEW.monto)
+     OR NOT (OLD.metodo_pago <=> NEW.metodo_pago)
+     OR NOT (OLD.id_empleado <=> NEW.id_empleado)
+     OR DATE(OLD.fecha_venta) <> DATE(NEW.fecha_venta)
+     OR OLD.id_boleto <> NEW.id_boleto THEN
+    IF NOT EXISTS (SELECT 1 FROM Boleto WHERE id_boleto = OLD.id_boleto AND estado = 'Cancelado') THEN
+      CALL sp_resumen_venta_ajustar(OLD.fecha_venta, OLD.id_empleado, OLD.metodo_pago, -1, -OLD.monto);
+    END IF;
+    IF NOT EXISTS (SELECT 1 FROM Boleto WHERE id_boleto = NEW.id_boleto AND estado = 'Cancelado') THEN
+      CALL sp_resumen_venta_ajustar(NEW.fecha_venta, NEW.id_empleado, NEW.metodo_pago, 1, NEW.monto);
+    END IF;
+  END IF;
+END//
+
+DROP TRIGGER IF EXISTS tr_venta_resumen_del//
+CREATE TRIGGER tr_venta_resumen_del
+AFTER DELETE ON Venta
+FOR EACH ROW
+BEGIN
+  IF NOT EXISTS (SELECT 1 FROM Boleto WHERE id_boleto = OLD.id_boleto AND estado = 'Cancelado') THEN
+    CALL sp_resumen_venta_ajustar(OLD.fecha_venta, OLD.id_empleado, OLD.metodo_pago, -1, -OLD.monto);
+  END IF;
+END//
+DELIMITER ;
+
+-- Se reconstruye el resumen sin las ventas ya canceladas
+DELETE FROM Venta_Resumen_Dia;
+INSERT INTO Venta_Resumen_Dia (fecha, id_empleado, metodo_pago, num_ventas, total)
+SELECT DATE(v.fecha_venta), COALESCE(v.id_empleado, 0), v.metodo_pago, COUNT(*), SUM(v.monto)
+FROM Venta v
+JOIN Boleto b ON b.id_boleto = v.id_boleto
+WHERE b.estado <> 'Cancelado'
+GROUP BY DATE(v.fecha_venta), COALESCE(v.id_empleado, 0), v.metodo_pago;
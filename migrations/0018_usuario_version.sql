@@ -0,0 +1,46 @@
+-- =========================================
+-- Versión del principal de sesión (caché de load_user entre workers)
+--   Usuario.version sube con cada UPDATE del usuario y con cada cambio de
+--   un Chofer ligado por id_empleado (el principal lleva id_chofer). Cada
+--   worker guarda el User con su versión y, en cada request, solo lee
+--   esta columna por llave primaria: un usuario desactivado o con otro
+--   rol deja de valer de inmediato en todos los procesos.
+-- =========================================
+ALTER TABLE Usuario ADD COLUMN version INT NOT NULL DEFAULT 0;
+
+DELIMITER //
+DROP TRIGGER IF EXISTS tr_usuario_version//
+CREATE TRIGGER tr_usuario_version
+BEFORE UPDATE ON Usuario
+FOR EACH ROW
+BEGIN
+  SET NEW.version = OLD.version + 1;
+END//
+
+DROP TRIGGER IF EXISTS tr_chofer_usuario_ins//
+CREATE TRIGGER tr_chofer_usuario_ins
+AFTER INSERT ON Chofer
+FOR EACH ROW
+BEGIN
+  UPDATE Usuario SET version = version + 1 WHERE id_empleado = NEW.id_empleado;
+END//
+
+DROP TRIGGER IF EXISTS tr_chofer_usuario_upd//
+CREATE TRIGGER tr_chofer_usuario_upd
+AFTER UPDATE ON Chofer
+FOR EACH ROW
+BEGIN
+  IF NOT (OLD.id_empleado <=> NEW.id_empleado) THEN
+    UPDATE Usuario SET version = version + 1
+    WHERE id_empleado IN (OLD.id_empleado, NEW.id_empleado);
+  END IF;
+END//
+
+DROP TRIGGER IF EXISTS tr_chofer_usuario_del//
+CREATE TRIGGER tr_chofer_usuario_del
+AFTER DELETE ON Chofer
+FOR EACH ROW
+BEGIN
+  UPDATE Usuario SET version = version + 1 WHERE id_empleado = OLD.id_empleado;
+END//
+DELIMITER ;
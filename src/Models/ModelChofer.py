@@ -0,0 +1,125 @@
+import MySQLdb.cursors
+
+
+# Origen (parada 1) y destino (última parada) de la ruta del viaje. Las
+# últimas paradas salen de una sola agregación de Ruta_Terminal en lugar
+# de un MAX(orden_parada) correlacionado por viaje.
+_JOIN_EXTREMOS_RUTA = """
+    JOIN (
+        SELECT id_ruta, MAX(orden_parada) AS ultima_parada
+        FROM Ruta_Terminal
+        GROUP BY id_ruta
+    ) re ON re.id_ruta = v.id_ruta
+    JOIN Ruta_Terminal rt_o
+      ON rt_o.id_ruta = v.id_ruta
+     AND rt_o.orden_parada = 1
+    JOIN Terminal t_origen ON t_origen.id_terminal = rt_o.id_terminal
+    JOIN Ruta_Terminal rt_d
+      ON rt_d.id_ruta = v.id_ruta
+     AND rt_d.orden_parada = re.ultima_parada
+    JOIN Terminal t_destino ON t_destino.id_terminal = rt_d.id_terminal
+"""
+
+
+class ModelChofer:
+    """
+    Consultas del panel del chofer. Son independientes entre sí (cada una
+    abre su propio cursor), para poder correrlas en paralelo con una
+    conexión del pool cada una (ver app.chofer).
+    """
+
+    @classmethod
+    def viajes_activos(cls, db, id_chofer):
+        """Viajes no cancelados del chofer con pasajeros y estado por tiempo."""
+        cursor = db.connection.cursor(MySQLdb.cursors.DictCursor)
+        cursor.execute(f"""
+            SELECT
+                v.id_viaje,
+                DATE_FORMAT(v.fecha_salida, '%%d/%%m/%%Y') AS fecha,
+                DATE_FORMAT(v.fecha_salida, '%%H:%%i')       AS hora,
+                t_origen.nombre  AS origen,
+                t_destino.nombre AS destino,
+                CONCAT_WS(' ', a.numero_placa, a.numero_fisico) AS bus,
+
+                -- Contadores incrementales (Viaje_Ocupacion, mantenido por triggers)
+                COALESCE(vo.asientos_ocupados, 0) AS pasajeros,
+                a.capacidad,
+
+                CASE
+                  WHEN v.estado = 'Cancelado' THEN 'Cancelado'
+                  WHEN NOW() < v.fecha_salida THEN 'Pendiente'
+                  WHEN NOW() BETWEEN v.fecha_salida AND v.fecha_llegada THEN 'En Curso'
+                  ELSE 'Completado'
+                END AS estado_mostrar
+
+            FROM Viaje v
+            {_JOIN_EXTREMOS_RUTA}
+            JOIN Autobus a ON a.id_autobus = v.id_autobus
+            LEFT JOIN Viaje_Ocupacion vo ON vo.id_viaje = v.id_viaje
+
+            WHERE v.id_chofer = %s
+              AND v.estado <> 'Cancelado'
+            ORDER BY v.fecha_salida ASC
+        """, (id_chofer,))
+        rows = cursor.fetchall()
+        cursor.close()
+
+        return [
+            {
+                'id_viaje':  row['id_viaje'],
+                'fecha':     row['fecha'],
+                'hora':      row['hora'],
+                'origen':    row['origen'],
+                'destino':   row['destino'],
+                'bus':       row['bus'],
+                'pasajeros': row['pasajeros'] or 0,
+                'capacidad': row['capacidad'] or 0,
+                'estado':    row['estado_mostrar']
+            }
+            for row in rows
+        ]
+
+    @classmethod
+    def historial(cls, db, id_chofer, limite=10):
+        """Últimos `limite` viajes ya finalizados (por tiempo)."""
+        cursor = db.connection.cursor(MySQLdb.cursors.DictCursor)
+        cursor.execute(f"""
+            SELECT
+                DATE_FORMAT(v.fecha_salida, '%%d/%%m/%%Y') AS fecha,
+                t_origen.nombre  AS origen,
+                t_destino.nombre AS destino
+            FROM Viaje v
+            {_JOIN_EXTREMOS_RUTA}
+            WHERE v.id_chofer = %s
+              AND v.fecha_llegada < NOW()
+              AND v.estado <> 'Cancelado'
+            ORDER BY v.fecha_salida DESC
+            LIMIT %s
+        """, (id_chofer, limite))
+        rows = cursor.fetchall()
+        cursor.close()
+
+        return [
+            {
+                'fecha':   r['fecha'],
+                'origen':  r['origen'],
+                'destino': r['destino']
+            }
+            for r in rows
+        ]
+
+    @classmethod
+    def completados_hoy(cls, db, id_chofer):
+        """Viajes del chofer que llegaron hoy."""
+        cursor = db.connection.cursor()
+        cursor.execute("""
+            SELECT COUNT(*)
+            FROM Viaje
+            WHERE id_chofer = %s
+              AND fecha_llegada >= CURDATE()
+              AND fecha_llegada < NOW()
+              AND estado <> 'Cancelado'
+        """, (id_chofer,))
+        row = cursor.fetchone()
+        cursor.close()
+        return row[0] if row else 0
@@ -0,0 +1,174 @@
+import threading
+import time
+
+import MySQLdb.cursors
+
+
+class ModelRetencion:
+    """
+    Apartado temporal de asientos (tabla Asiento_Retencion).
+
+    Un asiento apartado por un usuario no aparece como libre para los demás
+    hasta que vence (expira_en) o se vende; sp_registrar_venta rechaza la
+    venta de un asiento apartado por otro usuario.
+    """
+
+    # Minutos que dura un apartado y cada cuántos segundos, como máximo,
+    # se purgan en bloque los vencidos (ver purgar_si_toca).
+    minutos = 5
+    intervalo_purga = 60
+
+    _ultima_purga = 0.0
+    _lock = threading.Lock()
+
+    @classmethod
+    def init_config(cls, minutos, intervalo_purga):
+        cls.minutos = minutos
+        cls.intervalo_purga = intervalo_purga
+
+    @classmethod
+    def apartar(cls, db, id_viaje, numero_asiento, id_usuario):
+        """
+        Aparta (o renueva) el asiento para id_usuario.
+
+        Retorna (True, expira_en) si quedó apartado por él, o
+        (False, expira_en) si lo tiene otro usuario.
+        """
+        try:
+            conn = db.connection
+            cursor = conn.cursor(MySQLdb.cursors.DictCursor)
+
+            # Un apartado vencido no bloquea a nadie
+            cursor.execute("""
+                DELETE FROM Asiento_Retencion
+                WHERE id_viaje = %s AND numero_asiento = %s AND expira_en <= NOW()
+            """, (id_viaje, numero_asiento))
+
+            # Inserta; si ya existe solo se renueva cuando es del mismo usuario
+            cursor.execute("""
+                INSERT INTO Asiento_Retencion (id_viaje, numero_asiento, id_usuario, expira_en)
+                VALUES (%s, %s, %s, NOW() + INTERVAL %s MINUTE)
+                ON DUPLICATE KEY UPDATE
+                    expira_en = IF(id_usuario = VALUES(id_usuario), VALUES(expira_en), expira_en)
+            """, (id_viaje, numero_asiento, id_usuario, cls.minutos))
+
+            cursor.execute("""
+                SELECT id_usuario, expira_en
+                FROM Asiento_Retencion
+                WHERE id_viaje = %s AND numero_asiento = %s
+            """, (id_viaje, numero_asiento))
+            row = cursor.fetchone()
+
+            conn.commit()
+            cursor.close()
+            return row['id_usuario'] == id_usuario, row['expira_en']
+
+        except Exception as ex:
+            print("ERROR ModelRetencion.apartar:", ex)
+            db.connection.rollback()
+            raise
+
+    @classmethod
+    def liberar(cls, db, id_viaje, numero_asiento, id_usuario):
+        """Suelta el apartado si es de id_usuario. Retorna True si borró algo."""
+        try:
+            conn = db.connection
+            cursor = conn.cursor()
+            cursor.execute("""
+                DELETE FROM Asiento_Retencion
+                WHERE id_viaje = %s AND numero_asiento = %s AND id_usuario = %s
+            """, (id_viaje, numero_asiento, id_usuario))
+            borrados = cursor.rowcount
+            conn.commit()
+            cursor.close()
+            return borrados > 0
+
+        except Exception as ex:
+            print("ERROR ModelRetencion.liberar:", ex)
+            db.connection.rollback()
+            raise
+
+    @classmethod
+    def apartados(cls, db, id_viaje):
+        """Dict numero_asiento -> id_usuario de los apartados vigentes del viaje."""
+        cursor = db.connection.cursor()
+        cursor.execute("""
+            SELECT numero_asiento, id_usuario
+            FROM Asiento_Retencion
+            WHERE id_viaje = %s AND expira_en > NOW()
+        """, (id_viaje,))
+        rows = cursor.fetchall()
+        cursor.close()
+        return {r[0]: r[1] for r in rows}
+
+    @classmethod
+    def apartados_varios(cls, db, ids_viaje):
+        """apartados() de varios viajes en una consulta: id_viaje -> {numero_asiento: id_usuario}."""
+        resultado = {id_viaje: {} for id_viaje in ids_viaje}
+        if not resultado:
+            return resultado
+        cursor = db.connection.cursor()
+        cursor.execute(f"""
+            SELECT id_viaje, numero_asiento, id_usuario
+            FROM Asiento_Retencion
+            WHERE id_viaje IN ({', '.join(['%s'] * len(resultado))})
+              AND expira_en > NOW()
+        """, list(resultado))
+        for id_viaje, numero_asiento, id_usuario in cursor.fetchall():
+            resultado[id_viaje][numero_asiento] = id_usuario
+        cursor.close()
+        return resultado
+
+    @classmethod
+    def purgar_vencidas(cls, db, lote=1000):
+        """
+        Borra en bloques de `lote` los apartados vencidos. Retorna la lista
+        de (id_viaje, numero_asiento) borrados, para publicarlos como
+        asientos liberados.
+        """
+        try:
+            conn = db.connection
+            cursor = conn.cursor()
+            liberados = []
+            while True:
+                # Se bloquean las filas: un apartar() que reemplaza una
+                # vencida espera al COMMIT y su 'apartado' sale después
+                cursor.execute("""
+                    SELECT id_viaje, numero_asiento
+                    FROM Asiento_Retencion
+                    WHERE expira_en <= NOW()
+                    LIMIT %s
+                    FOR UPDATE SKIP LOCKED
+                """, (lote,))
+                filas = [tuple(r) for r in cursor.fetchall()]
+                if filas:
+                    cursor.execute(f"""
+                        DELETE FROM Asiento_Retencion
+                        WHERE (id_viaje, numero_asiento) IN ({', '.join(['(%s, %s)'] * len(filas))})
+                          AND expira_en <= NOW()
+                    """, [v for fila in filas for v in fila])
+                conn.commit()
+                liberados.extend(filas)
+                if len(filas) < lote:
+                    break
+            cursor.close()
+            return liberados
+
+        except Exception as ex:
+            print("ERROR ModelRetencion.purgar_vencidas:", ex)
+            db.connection.rollback()
+            raise
+
+    @classmethod
+    def purgar_si_toca(cls, db):
+        """
+        Purga a lo más una vez cada `intervalo_purga` segundos por proceso
+        (hilo de fondo y request que aparta asientos). Retorna lo mismo que
+        purgar_vencidas, o [] si aún no toca.
+        """
+        ahora = time.monotonic()
+        with cls._lock:
+            if ahora - cls._ultima_purga < cls.intervalo_purga:
+                return []
+            cls._ultima_purga = ahora
+        return cls.purgar_vencidas(db)
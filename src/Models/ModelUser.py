@@ -1,21 +1,51 @@
+import re
+
+import MySQLdb.cursors
+
 from .entities.User import User
 from werkzeug.security import generate_password_hash
+from Services.TTLCache import TTLCache
+
+# Columnas del principal de sesión: Usuario + id_empleado/id_chofer vinculados
+# (las 8 de User) y al final u.version para la caché
+_SELECT_USUARIO = """
+    SELECT u.id_usuario, u.nombre_completo, u.email, u.password_hash, u.rol, u.activo,
+           u.id_empleado,
+           (SELECT ch.id_chofer FROM Chofer ch
+            WHERE ch.id_empleado = u.id_empleado
+            ORDER BY ch.id_chofer
+            LIMIT 1) AS id_chofer,
+           u.version
+    FROM Usuario u
+"""
+
 
 class ModelUser:
 
+    # Caché de principales de sesión (id_usuario -> (version, User)) para
+    # load_user. Cada acierto se confirma contra Usuario.version (lectura
+    # por llave primaria), así que un cambio hecho en otro worker, o
+    # directo en la base, vale desde el siguiente request. Además se
+    # invalida explícitamente en cada método que modifica un Usuario.
+    user_cache = TTLCache(maxsize=1024, ttl=60)
+
+    @classmethod
+    def init_cache(cls, maxsize, ttl):
+        cls.user_cache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    @classmethod
+    def invalidate_user(cls, id_usuario):
+        cls.user_cache.invalidate(int(id_usuario))
+
     @classmethod
     def login(cls, db, user):
         try:
             cursor = db.connection.cursor()
-            sql = """
-                SELECT id_usuario, nombre_completo, email, password_hash, rol, activo
-                FROM Usuario
-                WHERE email = %s
-            """
+            sql = _SELECT_USUARIO + " WHERE u.email = %s"
             cursor.execute(sql, (user.email,))
             row = cursor.fetchone()
             if row:
-                user_data = User(*row[:5])  # id_usuario, nombre_completo, email, password_hash, rol
+                user_data = User(*row[:8])  # incluye activo, id_empleado e id_chofer
                 if User.check_password(row[3], user.password) and row[5] == 1:
                     return user_data
             return None
@@ -25,28 +55,108 @@ class ModelUser:
 
     @classmethod
     def get_by_id(cls, db, id):
+        try:
+            id = int(id)
+        except (TypeError, ValueError):
+            return None
+
         try:
             cursor = db.connection.cursor()
-            sql = """
-                SELECT id_usuario, nombre_completo, email, password_hash, rol, activo
-                FROM Usuario
-                WHERE id_usuario = %s
-            """
+
+            cached = cls.user_cache.get(id)
+            if cached is not None:
+                version, user = cached
+                cursor.execute("SELECT version FROM Usuario WHERE id_usuario = %s", (id,))
+                row = cursor.fetchone()
+                if row and row[0] == version:
+                    cursor.close()
+                    return user
+                cls.user_cache.invalidate(id)
+
+            sql = _SELECT_USUARIO + " WHERE u.id_usuario = %s"
             cursor.execute(sql, (id,))
             row = cursor.fetchone()
+            cursor.close()
             if row:
-                return User(*row[:5])
+                user = User(*row[:8])  # incluye activo, id_empleado e id_chofer
+                cls.user_cache.set(id, (row[8], user))
+                return user
             return None
         except Exception as ex:
             print("ERROR ModelUser.get_by_id:", ex)
             return None
 
     @classmethod
-    def get_all_users(cls, db):
+    def listar(cls, db, buscar=None, rol=None, activo=None, pagina=1, por_pagina=25):
+        """
+        Página del directorio de usuarios para el panel de admin, ordenada
+        por nombre. `buscar` filtra por nombre o email (contiene), `rol` y
+        `activo` por igualdad.
+
+        Retorna (usuarios, total): solo las columnas de la tabla; los datos
+        de Empleado/Chofer se piden por usuario con get_user_detail.
+        """
+        condiciones = []
+        params = []
+        if buscar:
+            # % y _ del texto se buscan literalmente
+            patron = '%' + re.sub(r'([\\%_])', r'\\\1', buscar) + '%'
+            condiciones.append("(u.nombre_completo LIKE %s OR u.email LIKE %s)")
+            params.extend([patron, patron])
+        if rol:
+            condiciones.append("u.rol = %s")
+            params.append(rol)
+        if activo is not None:
+            condiciones.append("u.activo = %s")
+            params.append(activo)
+        where = ("WHERE " + " AND ".join(condiciones)) if condiciones else ""
+
+        try:
+            cursor = db.connection.cursor(MySQLdb.cursors.DictCursor)
+            cursor.execute(f"SELECT COUNT(*) AS total FROM Usuario u {where}", params)
+            total = cursor.fetchone()['total']
+
+            cursor.execute(f"""
+                SELECT u.id_usuario, u.nombre_completo, u.email, u.rol, u.activo
+                FROM Usuario u
+                {where}
+                ORDER BY u.nombre_completo, u.id_usuario
+                LIMIT %s OFFSET %s
+            """, params + [por_pagina, (pagina - 1) * por_pagina])
+            usuarios = list(cursor.fetchall())
+            cursor.close()
+            return usuarios, total
+        except Exception as ex:
+            print("ERROR ModelUser.listar:", ex)
+            return [], 0
+
+    @classmethod
+    def resumen(cls, db):
+        """Conteos para las tarjetas del panel: total, activos, inactivos y admins."""
         try:
-            cursor = db.connection.cursor()
-            sql = """
-                SELECT 
+            cursor = db.connection.cursor(MySQLdb.cursors.DictCursor)
+            cursor.execute("""
+                SELECT
+                    COUNT(*)                         AS total,
+                    COALESCE(SUM(activo = 1), 0)     AS activos,
+                    COALESCE(SUM(activo = 0), 0)     AS inactivos,
+                    COALESCE(SUM(rol = 'Admin'), 0)  AS admins
+                FROM Usuario
+            """)
+            row = cursor.fetchone()
+            cursor.close()
+            return {k: int(v) for k, v in row.items()}
+        except Exception as ex:
+            print("ERROR ModelUser.resumen:", ex)
+            return {'total': 0, 'activos': 0, 'inactivos': 0, 'admins': 0}
+
+    @classmethod
+    def get_user_detail(cls, db, id_usuario):
+        """Usuario con sus datos de Empleado y Chofer (modal de edición), o None."""
+        try:
+            cursor = db.connection.cursor(MySQLdb.cursors.DictCursor)
+            cursor.execute("""
+                SELECT
                     u.id_usuario,
                     u.nombre_completo,
                     u.email,
@@ -67,36 +177,16 @@ class ModelUser:
                 FROM Usuario u
                 LEFT JOIN Empleado e ON u.id_empleado = e.id_empleado
                 LEFT JOIN Chofer ch ON ch.id_empleado = e.id_empleado
-                ORDER BY u.nombre_completo;
-            """
-            cursor.execute(sql)
-            rows = cursor.fetchall()
-            users = []
-            for row in rows:
-                user = {
-                    'id_usuario': row[0],
-                    'nombre_completo': row[1],
-                    'email': row[2],
-                    'rol': row[3],
-                    'activo': row[4],
-                    'id_empleado': row[5],
-                    'telefono': row[6],
-                    'rfc': row[7],
-                    'curp': row[8],
-                    'nss': row[9],
-                    'direccion': row[10],
-                    'fecha_ingreso': row[11],
-                    'licencia': row[12],
-                    'licencia_tipo': row[13],
-                    'licencia_expira': row[14],
-                    'anios_experiencia': row[15],
-                    'notas': row[16]
-                }
-                users.append(user)
-            return users
+                WHERE u.id_usuario = %s
+                ORDER BY ch.id_chofer
+                LIMIT 1
+            """, (id_usuario,))
+            row = cursor.fetchone()
+            cursor.close()
+            return row
         except Exception as ex:
-            print("ERROR ModelUser.get_all_users:", ex)
-            return []
+            print("ERROR ModelUser.get_user_detail:", ex)
+            return None
 
     @classmethod
     def create_user(cls, db, nombre_completo, email, password, rol='Empleado',
@@ -200,6 +290,7 @@ class ModelUser:
             """
             cursor.execute(sql, (nombre_completo, email, rol, activo, id_usuario))
             db.connection.commit()
+            cls.invalidate_user(id_usuario)
             return True
         except Exception as ex:
             print("ERROR ModelUser.update_user:", ex)
@@ -214,6 +305,7 @@ class ModelUser:
             sql = "UPDATE Usuario SET activo = NOT activo WHERE id_usuario = %s"
             cursor.execute(sql, (id_usuario,))
             db.connection.commit()
+            cls.invalidate_user(id_usuario)
             return True
         except Exception as ex:
             print("ERROR ModelUser.toggle_user_status:", ex)
@@ -229,6 +321,7 @@ class ModelUser:
             sql = "UPDATE Usuario SET password_hash = %s WHERE id_usuario = %s"
             cursor.execute(sql, (password_hash, id_usuario))
             db.connection.commit()
+            cls.invalidate_user(id_usuario)
             return True
         except Exception as ex:
             print("ERROR ModelUser.change_password:", ex)
@@ -430,6 +523,9 @@ class ModelUser:
                 """, (id_empleado,))
 
             conn.commit()
+            # El principal en caché puede traer id_empleado/id_chofer viejos
+            # (se acaba de crear el Empleado o el Chofer): se recarga entero
+            cls.invalidate_user(id_usuario)
             return True
 
         except Exception as ex:
@@ -0,0 +1,355 @@
+import MySQLdb
+import MySQLdb.cursors
+
+# ER_SIGNAL_EXCEPTION (SIGNAL SQLSTATE '45000' en los procedimientos)
+_ER_SIGNAL = 1644
+# ER_DUP_ENTRY (uq_boleto_asiento)
+_ER_DUP_ENTRY = 1062
+
+
+class VentaError(Exception):
+    """Venta rechazada por una regla de negocio; el mensaje es para el usuario."""
+
+
+class VentaRepetida(Exception):
+    """La llave de idempotencia ya se usó: la venta original es `id_boleto`."""
+
+    def __init__(self, id_boleto):
+        super().__init__(id_boleto)
+        self.id_boleto = id_boleto
+
+
+class ModelVenta:
+
+    # Horas que se conserva una llave de idempotencia
+    horas_clave = 24
+
+    @classmethod
+    def init_config(cls, horas_clave):
+        cls.horas_clave = horas_clave
+
+    @classmethod
+    def registrar(cls, db, id_viaje, numero_asiento, nombre, correo, telefono,
+                  metodo_pago, id_usuario, id_tarifa, precio_total, nota, posicion=None,
+                  clave=None, id_empleado=None):
+        """
+        Registra pasajero + boleto + venta con un solo CALL a
+        sp_registrar_venta (el procedimiento valida el viaje y hace COMMIT).
+
+        numero_asiento None = cualquier asiento libre; el procedimiento lo
+        elige con FOR UPDATE SKIP LOCKED (posicion: 'Ventana', 'Pasillo' o None).
+
+        clave: llave de idempotencia; si ya se usó no se vende de nuevo y se
+        lanza VentaRepetida con el boleto original.
+
+        id_empleado: el del usuario en sesión (User.id_empleado); con None
+        el procedimiento lo busca en Usuario.
+
+        Retorna dict con id_boleto, id_pasajero, numero_asiento y precio_total.
+        Lanza VentaError si el viaje no admite la venta o el asiento ya
+        está ocupado; cualquier otro error se propaga.
+        """
+        conn = db.connection
+        cursor = conn.cursor(MySQLdb.cursors.DictCursor)
+        try:
+            cursor.execute(
+                "CALL sp_registrar_venta(%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)",
+                (id_viaje, numero_asiento, posicion, nombre, correo, telefono,
+                 metodo_pago, id_usuario, id_empleado, id_tarifa, precio_total, nota,
+                 clave, cls.horas_clave)
+            )
+            row = cursor.fetchone()
+            while cursor.nextset():
+                pass
+        except (MySQLdb.OperationalError, MySQLdb.IntegrityError) as ex:
+            conn.rollback()
+            error = cls._error_venta(ex)
+            if error is ex:
+                raise
+            raise error from ex
+        finally:
+            cursor.close()
+
+        return cls._resultado(row)
+
+    @staticmethod
+    def _error_venta(ex):
+        """Traduce SIGNAL 45000 / asiento duplicado a VentaError; lo demás se deja igual."""
+        if isinstance(ex, MySQLdb.OperationalError) and ex.args and ex.args[0] == _ER_SIGNAL:
+            return VentaError(ex.args[1])
+        if isinstance(ex, MySQLdb.IntegrityError) and ex.args and ex.args[0] == _ER_DUP_ENTRY:
+            return VentaError('El asiento seleccionado ya fue vendido. Elija otro.')
+        return ex
+
+    @staticmethod
+    def _resultado(row):
+        """Fila de sp_registrar_venta/sp_venta_insertar -> dict, o VentaRepetida/VentaError."""
+        if row is None:
+            # Llave usada por una venta cuyo boleto ya no existe
+            raise VentaError('Esta venta ya se había procesado.')
+        if row.pop('repetida'):
+            raise VentaRepetida(row['id_boleto'])
+        return row
+
+    @classmethod
+    def registrar_lote(cls, db, ventas):
+        """
+        Group commit: registra varias ventas independientes en una sola
+        transacción, un SAVEPOINT por venta (CALL sp_venta_insertar), y un
+        solo COMMIT al final. Una venta rechazada se deshace hasta su
+        SAVEPOINT sin afectar a las demás.
+
+        ventas: lista de dicts con los argumentos de registrar().
+        Retorna lista paralela con el dict de la venta o la excepción
+        (VentaError, VentaRepetida, ...) de cada una. Si falla el COMMIT la
+        excepción se propaga y ninguna venta del lote quedó registrada.
+        """
+        conn = db.connection
+        cursor = conn.cursor(MySQLdb.cursors.DictCursor)
+        resultados = []
+        try:
+            for i, v in enumerate(ventas):
+                cursor.execute(f"SAVEPOINT venta_{i}")
+                try:
+                    cursor.execute(
+                        "CALL sp_venta_insertar(%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)",
+                        (v['id_viaje'], v['numero_asiento'], v.get('posicion'),
+                         v['nombre'], v['correo'], v['telefono'],
+                         v['metodo_pago'], v['id_usuario'], v.get('id_empleado'), v['id_tarifa'],
+                         v['precio_total'], v['nota'], v.get('clave'), cls.horas_clave)
+                    )
+                    row = cursor.fetchone()
+                    while cursor.nextset():
+                        pass
+                    resultados.append(cls._resultado(row))
+                except (VentaError, VentaRepetida) as ex:
+                    resultados.append(ex)
+                except (MySQLdb.OperationalError, MySQLdb.IntegrityError) as ex:
+                    cursor.execute(f"ROLLBACK TO SAVEPOINT venta_{i}")
+                    resultados.append(cls._error_venta(ex))
+
+            conn.commit()
+            return resultados
+
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+
+    @classmethod
+    def registrar_grupo(cls, db, id_viaje, pasajeros, metodo_pago, id_usuario,
+                        id_tarifa, precio_total, nota, clave=None, id_empleado=None):
+        """
+        Venta de varios asientos de un mismo viaje en una sola transacción:
+        Pasajero, Boleto y Venta se insertan con executemany (MySQLdb lo
+        convierte en un INSERT multi-fila si VALUES solo lleva %s) y hay un
+        solo COMMIT; si algo falla no se vende ningún asiento.
+
+        pasajeros: lista de dicts con nombre, correo, telefono, numero_asiento
+        (la capacidad y los duplicados se validan antes, en la vista).
+
+        clave: llave de idempotencia (ver registrar); la llave queda ligada
+        al primer boleto del grupo. id_empleado: como en registrar.
+
+        Retorna lista de dicts (numero_asiento, id_boleto, id_pasajero) en el
+        orden recibido. Lanza VentaError por reglas de negocio y
+        VentaRepetida si la llave ya se usó.
+        """
+        conn = db.connection
+        cursor = conn.cursor()
+        asientos = [p['numero_asiento'] for p in pasajeros]
+        marcadores = ', '.join(['%s'] * len(asientos))
+
+        try:
+            # 0) Idempotencia (el INSERT espera si otra petición usa la misma llave)
+            if clave:
+                cursor.execute("""
+                    INSERT IGNORE INTO Venta_Idempotencia (clave, id_usuario, expira_en)
+                    VALUES (%s, %s, NOW() + INTERVAL %s HOUR)
+                """, (clave, id_usuario, cls.horas_clave))
+                if cursor.rowcount == 0:
+                    cursor.execute("""
+                        SELECT id_boleto FROM Venta_Idempotencia
+                        WHERE clave = %s
+                        FOR SHARE
+                    """, (clave,))
+                    row = cursor.fetchone()
+                    if row is None or row[0] is None:
+                        # Llave vencida y borrada, o usada por una venta cuyo
+                        # boleto ya no existe (igual que _resultado)
+                        raise VentaError('Esta venta ya se había procesado.')
+                    raise VentaRepetida(row[0])
+
+            # 1) Viaje vigente (+ empleado que vende si no vino de la sesión)
+            if id_empleado is not None:
+                empleado_sql, empleado_arg = "%s", id_empleado
+            else:
+                empleado_sql = "(SELECT u.id_empleado FROM Usuario u WHERE u.id_usuario = %s)"
+                empleado_arg = id_usuario
+            cursor.execute(f"""
+                SELECT v.estado,
+                       v.fecha_salida > NOW() AS a_tiempo,
+                       {empleado_sql} AS id_empleado
+                FROM Viaje v
+                WHERE v.id_viaje = %s
+                FOR SHARE
+            """, (empleado_arg, id_viaje))
+            row = cursor.fetchone()
+            if not row:
+                raise VentaError('El viaje seleccionado ya no existe.')
+            estado, a_tiempo, id_empleado = row
+            if estado == 'Cancelado' or not a_tiempo:
+                raise VentaError('No es posible registrar la venta: el viaje ya salió o fue cancelado.')
+
+            # 2) Asientos apartados por otra taquilla
+            cursor.execute(f"""
+                SELECT numero_asiento FROM Asiento_Retencion
+                WHERE id_viaje = %s
+                  AND numero_asiento IN ({marcadores})
+                  AND expira_en > NOW()
+                  AND id_usuario <> %s
+            """, [id_viaje, *asientos, id_usuario])
+            ajenos = sorted(r[0] for r in cursor.fetchall())
+            if ajenos:
+                raise VentaError('Asientos apartados por otra taquilla: '
+                                 + ', '.join(str(n) for n in ajenos) + '.')
+
+            # 2b) Bloquear las filas de los asientos (Viaje_Asiento) antes de
+            #     insertar, igual que sp_registrar_venta
+            cursor.execute(f"""
+                SELECT numero_asiento, id_boleto FROM Viaje_Asiento
+                WHERE id_viaje = %s
+                  AND numero_asiento IN ({marcadores})
+                FOR UPDATE
+            """, [id_viaje, *asientos])
+            vendidos = sorted(r[0] for r in cursor.fetchall() if r[1] is not None)
+            if vendidos:
+                raise VentaError('Asientos ya vendidos: '
+                                 + ', '.join(str(n) for n in vendidos) + '.')
+
+            # 3) Pasajeros
+            ids_pasajero = cls._insertar_pasajeros(cursor, pasajeros)
+
+            # 4) Boletos (uq_boleto_asiento / tr_boleto_capacidad siguen validando)
+            cursor.executemany("""
+                INSERT INTO Boleto (id_viaje, id_pasajero, id_tarifa, numero_asiento, estado, precio_total)
+                VALUES (%s, %s, %s, %s, %s, %s)
+            """, [(id_viaje, id_p, id_tarifa, n, 'Pagado', precio_total)
+                  for id_p, n in zip(ids_pasajero, asientos)])
+
+            # (id_viaje, asiento_activo) es único: de ahí salen los folios
+            # (los boletos cancelados del mismo asiento quedan fuera)
+            cursor.execute(f"""
+                SELECT asiento_activo, id_boleto FROM Boleto
+                WHERE id_viaje = %s AND asiento_activo IN ({marcadores})
+            """, [id_viaje, *asientos])
+            ids_boleto = dict(cursor.fetchall())
+
+            # 5) Ventas
+            cursor.executemany("""
+                INSERT INTO Venta (id_boleto, id_empleado, id_cliente, metodo_pago, monto, nota)
+                VALUES (%s, %s, %s, %s, %s, %s)
+            """, [(ids_boleto[n], id_empleado, None, metodo_pago, precio_total, nota)
+                  for n in asientos])
+
+            # 6) Los asientos ya están vendidos: se sueltan los apartados
+            cursor.execute(f"""
+                DELETE FROM Asiento_Retencion
+                WHERE id_viaje = %s AND numero_asiento IN ({marcadores})
+            """, [id_viaje, *asientos])
+
+            if clave:
+                cursor.execute("""
+                    UPDATE Venta_Idempotencia SET id_boleto = %s WHERE clave = %s
+                """, (ids_boleto[asientos[0]], clave))
+
+            conn.commit()
+            return [
+                {'numero_asiento': n, 'id_boleto': ids_boleto[n], 'id_pasajero': id_p}
+                for id_p, n in zip(ids_pasajero, asientos)
+            ]
+
+        except (VentaError, VentaRepetida):
+            conn.rollback()
+            raise
+        except MySQLdb.OperationalError as ex:
+            conn.rollback()
+            if ex.args and ex.args[0] == _ER_SIGNAL:
+                raise VentaError(ex.args[1]) from ex
+            raise
+        except MySQLdb.IntegrityError as ex:
+            conn.rollback()
+            if ex.args and ex.args[0] == _ER_DUP_ENTRY:
+                raise VentaError('Alguno de los asientos ya fue vendido. No se registró ninguna venta.') from ex
+            raise
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+
+    @classmethod
+    def _insertar_pasajeros(cls, cursor, pasajeros):
+        """
+        Inserta los pasajeros del grupo y retorna sus ids en el mismo orden.
+        Con correo se reutiliza el existente (uq_pasajero_correo).
+        """
+        ids = [None] * len(pasajeros)
+
+        con_correo = [i for i, p in enumerate(pasajeros) if p['correo']]
+        if con_correo:
+            cursor.executemany("""
+                INSERT INTO Pasajero (nombre, correo, telefono)
+                VALUES (%s, %s, %s)
+                ON DUPLICATE KEY UPDATE id_pasajero = id_pasajero
+            """, [(pasajeros[i]['nombre'], pasajeros[i]['correo'], pasajeros[i]['telefono'])
+                  for i in con_correo])
+
+            correos = sorted({pasajeros[i]['correo'] for i in con_correo})
+            cursor.execute(f"""
+                SELECT correo, id_pasajero FROM Pasajero
+                WHERE correo IN ({', '.join(['%s'] * len(correos))})
+            """, correos)
+            por_correo = {c.lower(): id_p for c, id_p in cursor.fetchall()}
+            for i in con_correo:
+                ids[i] = por_correo[pasajeros[i]['correo'].lower()]
+
+        # Sin correo no hay llave para volver a leerlos: uno por uno con su
+        # lastrowid (a lo más MAX_PASAJEROS_GRUPO de app.py), sin suponer ids
+        # consecutivos
+        for i, p in enumerate(pasajeros):
+            if not p['correo']:
+                cursor.execute("""
+                    INSERT INTO Pasajero (nombre, correo, telefono)
+                    VALUES (%s, %s, %s)
+                """, (p['nombre'], None, p['telefono']))
+                ids[i] = cursor.lastrowid
+
+        return ids
+
+    @classmethod
+    def purgar_claves_vencidas(cls, db, lote=1000):
+        """Borra en bloques de `lote` las llaves de idempotencia vencidas. Retorna cuántas borró."""
+        try:
+            conn = db.connection
+            cursor = conn.cursor()
+            total = 0
+            while True:
+                cursor.execute("""
+                    DELETE FROM Venta_Idempotencia
+                    WHERE expira_en <= NOW()
+                    LIMIT %s
+                """, (lote,))
+                borrados = cursor.rowcount
+                conn.commit()
+                total += borrados
+                if borrados < lote:
+                    break
+            cursor.close()
+            return total
+
+        except Exception as ex:
+            print("ERROR ModelVenta.purgar_claves_vencidas:", ex)
+            db.connection.rollback()
+            raise
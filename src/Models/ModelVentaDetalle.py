@@ -0,0 +1,186 @@
+import MySQLdb.cursors
+
+
+class ModelVentaDetalle:
+    """
+    Snapshot de la venta (tabla Venta_Detalle) y los datos del boleto que
+    se leen de él.
+
+    En modo diferido (VENTA_DETALLE_DIFERIDO=1) tr_venta_snapshot solo
+    encola la venta en Venta_Detalle_Pendiente y los snapshots se arman
+    aquí, por lotes, fuera de la transacción de la venta
+    (ver migrations/0011_venta_detalle_diferido.sql).
+    """
+
+    # Ventas por INSERT ... SELECT
+    lote = 500
+
+    @classmethod
+    def init_config(cls, lote):
+        cls.lote = lote
+
+    @classmethod
+    def procesar_pendientes(cls, db, lote=None):
+        """
+        Arma los snapshots pendientes, un lote por CALL, hasta vaciar la cola.
+        Retorna cuántas ventas quedaron con su Venta_Detalle.
+        """
+        lote = lote or cls.lote
+        try:
+            conn = db.connection
+            cursor = conn.cursor(MySQLdb.cursors.DictCursor)
+            total = 0
+            while True:
+                cursor.execute("CALL sp_venta_detalle_procesar(%s)", (lote,))
+                row = cursor.fetchone()
+                while cursor.nextset():
+                    pass
+                conn.commit()
+                procesadas = row['procesadas'] if row else 0
+                total += procesadas
+                # Lote incompleto: la cola se vació, otro proceso la está
+                # atendiendo o quedan ventas que no se pudieron armar
+                if procesadas < lote:
+                    break
+            cursor.close()
+            return total
+
+        except Exception as ex:
+            print("ERROR ModelVentaDetalle.procesar_pendientes:", ex)
+            db.connection.rollback()
+            raise
+
+    @classmethod
+    def reconciliar(cls, db):
+        """Encola las ventas sin snapshot que no estén pendientes. Retorna cuántas encoló."""
+        try:
+            conn = db.connection
+            cursor = conn.cursor(MySQLdb.cursors.DictCursor)
+            cursor.execute("CALL sp_venta_detalle_reconciliar()")
+            row = cursor.fetchone()
+            while cursor.nextset():
+                pass
+            conn.commit()
+            cursor.close()
+            return row['encoladas'] if row else 0
+
+        except Exception as ex:
+            print("ERROR ModelVentaDetalle.reconciliar:", ex)
+            db.connection.rollback()
+            raise
+
+    @classmethod
+    def pendientes(cls, db):
+        """(ventas en cola, fecha de la más antigua o None)."""
+        cursor = db.connection.cursor()
+        cursor.execute("""
+            SELECT COUNT(*), MIN(creado_en)
+            FROM Venta_Detalle_Pendiente
+        """)
+        num, mas_antigua = cursor.fetchone()
+        cursor.close()
+        return num, mas_antigua
+
+    @classmethod
+    def boleto(cls, db, id_boleto):
+        """
+        Datos del boleto para confirmación/reimpresión.
+
+        Sale de la fila de Venta_Detalle (el boleto tal como se vendió); solo
+        si aún no existe (modo diferido con el snapshot pendiente, o boleto
+        sin venta) se arma con el join en vivo. Retorna dict o None; la
+        llave `snapshot` indica de dónde salió.
+        """
+        cursor = db.connection.cursor(MySQLdb.cursors.DictCursor)
+        cursor.execute("""
+            SELECT
+                vd.id_boleto,
+                vd.numero_asiento,
+                vd.precio_total,
+                DATE_FORMAT(b.creado_en, '%%Y-%%m-%%d %%H:%%i') AS fecha_emision,
+                b.estado,
+
+                vd.pasajero_nombre,
+                vd.pasajero_correo,
+                vd.pasajero_telefono,
+
+                b.id_viaje,
+                DATE_FORMAT(vd.fecha_salida, '%%Y-%%m-%%d %%H:%%i') AS salida,
+                DATE_FORMAT(vd.fecha_llegada, '%%Y-%%m-%%d %%H:%%i') AS llegada,
+
+                vd.origen_ciudad,
+                vd.origen_terminal,
+                vd.destino_ciudad,
+                vd.destino_terminal,
+
+                vd.autobus_placa  AS numero_placa,
+                vd.autobus_numero AS numero_fisico,
+                CONCAT_WS(' ', vd.autobus_placa, vd.autobus_numero) AS autobus_identificador,
+                vd.clase_nombre
+            FROM Venta_Detalle vd
+            JOIN Boleto b ON b.id_boleto = vd.id_boleto
+            WHERE vd.id_boleto = %s
+            ORDER BY vd.id_venta DESC
+            LIMIT 1
+        """, (id_boleto,))
+        row = cursor.fetchone()
+        cursor.close()
+
+        if row is not None:
+            row['snapshot'] = True
+            return row
+
+        row = cls.boleto_en_vivo(db, id_boleto)
+        if row is not None:
+            row['snapshot'] = False
+        return row
+
+    @classmethod
+    def boleto_en_vivo(cls, db, id_boleto):
+        """Mismos datos que boleto(), armados con el join actual de las tablas."""
+        cursor = db.connection.cursor(MySQLdb.cursors.DictCursor)
+        cursor.execute("""
+            SELECT
+                b.id_boleto,
+                b.numero_asiento,
+                b.precio_total,
+                DATE_FORMAT(b.creado_en, '%%Y-%%m-%%d %%H:%%i') AS fecha_emision,
+                b.estado,
+
+                p.nombre AS pasajero_nombre,
+                p.correo AS pasajero_correo,
+                p.telefono AS pasajero_telefono,
+
+                v.id_viaje,
+                DATE_FORMAT(v.fecha_salida, '%%Y-%%m-%%d %%H:%%i') AS salida,
+                DATE_FORMAT(v.fecha_llegada, '%%Y-%%m-%%d %%H:%%i') AS llegada,
+
+                oc.nombre AS origen_ciudad,
+                ot.nombre AS origen_terminal,
+
+                dc.nombre AS destino_ciudad,
+                dt.nombre AS destino_terminal,
+
+                a.numero_placa,
+                a.numero_fisico,
+                CONCAT_WS(' ', a.numero_placa, a.numero_fisico) AS autobus_identificador,
+                cs.nombre AS clase_nombre
+
+            FROM Boleto b
+            JOIN Pasajero p ON p.id_pasajero = b.id_pasajero
+            JOIN Viaje v ON v.id_viaje = b.id_viaje
+            JOIN Autobus a ON a.id_autobus = v.id_autobus
+            LEFT JOIN ClaseServicio cs ON cs.id_clase = a.id_clase
+
+            -- Origen/destino desnormalizados (Viaje_Resumen, mantenido por triggers)
+            JOIN Viaje_Resumen vr ON vr.id_viaje = v.id_viaje
+            JOIN Terminal ot ON ot.id_terminal = vr.id_terminal_origen
+            JOIN Ciudad  oc  ON oc.id_ciudad   = vr.id_ciudad_origen
+            JOIN Terminal dt ON dt.id_terminal = vr.id_terminal_destino
+            JOIN Ciudad  dc  ON dc.id_ciudad   = vr.id_ciudad_destino
+
+            WHERE b.id_boleto = %s
+        """, (id_boleto,))
+        row = cursor.fetchone()
+        cursor.close()
+        return row
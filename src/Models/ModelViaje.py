@@ -0,0 +1,289 @@
+import MySQLdb.cursors
+
+from Services.TTLCache import TTLCache
+
+
+class ModelViaje:
+
+    # id_viaje -> {id_ruta, id_clase, fecha_salida}: lo que necesita la
+    # cotización; sp_registrar_venta revalida estado y salida en el servidor.
+    datos_cache = TTLCache(4096, 60)
+
+    # Ciudades y clases para los filtros de viajes próximos
+    catalogos_cache = TTLCache(4, 300)
+
+    @classmethod
+    def init_cache(cls, maxsize, ttl):
+        cls.datos_cache = TTLCache(maxsize, ttl)
+
+    @classmethod
+    def datos_tarifa(cls, db, id_viaje):
+        """Ruta, clase y fecha de salida del viaje (cacheado) o None."""
+        datos = cls.datos_cache.get(id_viaje)
+        if datos is not None:
+            return datos
+
+        cursor = db.connection.cursor(MySQLdb.cursors.DictCursor)
+        cursor.execute("""
+            SELECT v.id_ruta, a.id_clase, v.fecha_salida
+            FROM Viaje v
+            JOIN Autobus a ON a.id_autobus = v.id_autobus
+            WHERE v.id_viaje = %s
+        """, (id_viaje,))
+        datos = cursor.fetchone()
+        cursor.close()
+
+        if datos is not None:
+            cls.datos_cache.set(id_viaje, datos)
+        return datos
+
+    @classmethod
+    def invalidar_datos(cls, id_viaje):
+        cls.datos_cache.invalidate(id_viaje)
+
+    @classmethod
+    def proximos(cls, db, desde=None, hasta=None, id_ciudad_origen=None,
+                 id_ciudad_destino=None, id_clase=None, despues=None, limite=50):
+        """
+        Viajes no cancelados que aún no salen, ordenados por
+        (fecha_salida, id_viaje), una página a la vez (keyset pagination).
+
+        desde/hasta: fechas (date) de salida, ambas inclusive.
+        despues: (fecha_salida, id_viaje) del último viaje de la página
+        anterior; la página sigue justo después sin OFFSET, así que cuesta
+        lo mismo sin importar qué tan adelante esté.
+
+        Retorna (viajes, siguiente): `siguiente` es el (fecha_salida,
+        id_viaje) para pedir la página que sigue, o None si es la última.
+        """
+        condiciones = ["v.fecha_salida >= NOW()", "v.estado <> 'Cancelado'"]
+        params = []
+        if desde is not None:
+            condiciones.append("v.fecha_salida >= %s")
+            params.append(desde)
+        if hasta is not None:
+            condiciones.append("v.fecha_salida < %s + INTERVAL 1 DAY")
+            params.append(hasta)
+        if id_ciudad_origen is not None:
+            condiciones.append("vr.id_ciudad_origen = %s")
+            params.append(id_ciudad_origen)
+        if id_ciudad_destino is not None:
+            condiciones.append("vr.id_ciudad_destino = %s")
+            params.append(id_ciudad_destino)
+        if id_clase is not None:
+            condiciones.append("a.id_clase = %s")
+            params.append(id_clase)
+        if despues is not None:
+            condiciones.append("(v.fecha_salida > %s OR (v.fecha_salida = %s AND v.id_viaje > %s))")
+            params.extend([despues[0], despues[0], despues[1]])
+
+        cursor = db.connection.cursor(MySQLdb.cursors.DictCursor)
+        cursor.execute(f"""
+            SELECT
+                v.id_viaje,
+                v.fecha_salida AS salida,
+                DATE_FORMAT(v.fecha_salida, '%%d/%%m/%%Y %%H:%%i') AS fecha_salida,
+                DATE_FORMAT(v.fecha_llegada, '%%d/%%m/%%Y %%H:%%i') AS fecha_llegada,
+
+                r.nombre AS ruta_nombre,
+
+                oc.nombre AS origen_ciudad,
+                ot.nombre AS origen_terminal,
+
+                dc.nombre AS destino_ciudad,
+                dt.nombre AS destino_terminal,
+
+                CONCAT_WS(' ', a.numero_placa, a.numero_fisico) AS autobus_identificador,
+                cs.nombre AS clase_nombre,
+
+                ch.nombre AS chofer_nombre,
+
+                COALESCE(ad.asientos_disponibles, a.capacidad) AS asientos_disponibles,
+
+                CASE
+                  WHEN v.estado = 'Cancelado' THEN 'Cancelado'
+                  WHEN NOW() < v.fecha_salida THEN 'Programado'
+                  WHEN NOW() BETWEEN v.fecha_salida AND v.fecha_llegada THEN 'EnRuta'
+                  ELSE 'Finalizado'
+                END AS estado_actual
+
+            FROM Viaje v
+            JOIN Ruta   r  ON r.id_ruta    = v.id_ruta
+            JOIN Autobus a ON a.id_autobus = v.id_autobus
+            LEFT JOIN ClaseServicio cs ON cs.id_clase = a.id_clase
+            JOIN Chofer ch  ON ch.id_chofer = v.id_chofer
+
+            -- Origen/destino desnormalizados (Viaje_Resumen, mantenido por triggers)
+            JOIN Viaje_Resumen vr ON vr.id_viaje = v.id_viaje
+            JOIN Terminal ot ON ot.id_terminal = vr.id_terminal_origen
+            JOIN Ciudad  oc  ON oc.id_ciudad   = vr.id_ciudad_origen
+            JOIN Terminal dt ON dt.id_terminal = vr.id_terminal_destino
+            JOIN Ciudad  dc  ON dc.id_ciudad   = vr.id_ciudad_destino
+
+            -- Contadores incrementales (Viaje_Ocupacion, mantenido por triggers)
+            LEFT JOIN Viaje_Ocupacion ad
+                   ON ad.id_viaje = v.id_viaje
+
+            WHERE {' AND '.join(condiciones)}
+            ORDER BY v.fecha_salida ASC, v.id_viaje ASC
+            LIMIT %s
+        """, params + [limite + 1])
+        viajes = list(cursor.fetchall())
+        cursor.close()
+
+        # Se pide una fila de más solo para saber si hay otra página
+        siguiente = None
+        if len(viajes) > limite:
+            viajes = viajes[:limite]
+            siguiente = (viajes[-1]['salida'], viajes[-1]['id_viaje'])
+        return viajes, siguiente
+
+    @classmethod
+    def vendibles_hoy(cls, db):
+        """ids de los viajes que aún se venden hoy (mismo criterio que la taquilla)."""
+        cursor = db.connection.cursor()
+        cursor.execute("""
+            SELECT id_viaje
+            FROM Viaje
+            WHERE fecha_salida >= NOW()
+              AND fecha_salida <  CURDATE() + INTERVAL 1 DAY
+              AND estado = 'Programado'
+            ORDER BY fecha_salida ASC
+        """)
+        ids = [r[0] for r in cursor.fetchall()]
+        cursor.close()
+        return ids
+
+    @classmethod
+    def catalogos(cls, db):
+        """Ciudades y clases para los filtros (cacheado)."""
+        datos = cls.catalogos_cache.get('filtros')
+        if datos is not None:
+            return datos
+
+        cursor = db.connection.cursor(MySQLdb.cursors.DictCursor)
+        cursor.execute("SELECT id_ciudad, nombre, estado FROM Ciudad ORDER BY nombre, estado")
+        ciudades = cursor.fetchall()
+        cursor.execute("SELECT id_clase, nombre FROM ClaseServicio ORDER BY nombre")
+        clases = cursor.fetchall()
+        cursor.close()
+
+        datos = {'ciudades': ciudades, 'clases': clases}
+        cls.catalogos_cache.set('filtros', datos)
+        return datos
+
+    @classmethod
+    def backfill_resumen(cls, db):
+        """
+        Reconstruye Viaje_Resumen a partir de Viaje_Escala en una sola
+        pasada (para datos cargados antes de existir los triggers).
+
+        Retorna (filas_afectadas, huerfanos_borrados).
+        """
+        try:
+            conn = db.connection
+            cursor = conn.cursor()
+
+            cursor.execute("""
+                INSERT INTO Viaje_Resumen (
+                    id_viaje, id_terminal_origen, id_ciudad_origen,
+                    id_terminal_destino, id_ciudad_destino, num_escalas
+                )
+                SELECT
+                    m.id_viaje,
+                    o.id_terminal, tor.id_ciudad,
+                    d.id_terminal, tde.id_ciudad,
+                    m.num_escalas
+                FROM (
+                    SELECT id_viaje,
+                           MIN(orden_parada) AS orden_min,
+                           MAX(orden_parada) AS orden_max,
+                           COUNT(*)          AS num_escalas
+                    FROM Viaje_Escala
+                    GROUP BY id_viaje
+                ) m
+                JOIN Viaje_Escala o ON o.id_viaje = m.id_viaje AND o.orden_parada = m.orden_min
+                JOIN Terminal tor   ON tor.id_terminal = o.id_terminal
+                JOIN Viaje_Escala d ON d.id_viaje = m.id_viaje AND d.orden_parada = m.orden_max
+                JOIN Terminal tde   ON tde.id_terminal = d.id_terminal
+                ON DUPLICATE KEY UPDATE
+                    id_terminal_origen  = VALUES(id_terminal_origen),
+                    id_ciudad_origen    = VALUES(id_ciudad_origen),
+                    id_terminal_destino = VALUES(id_terminal_destino),
+                    id_ciudad_destino   = VALUES(id_ciudad_destino),
+                    num_escalas         = VALUES(num_escalas)
+            """)
+            afectadas = cursor.rowcount
+
+            # Viajes que se quedaron sin escalas
+            cursor.execute("""
+                DELETE vr
+                FROM Viaje_Resumen vr
+                LEFT JOIN Viaje_Escala ve ON ve.id_viaje = vr.id_viaje
+                WHERE ve.id_viaje IS NULL
+            """)
+            huerfanos = cursor.rowcount
+
+            conn.commit()
+            cursor.close()
+            return afectadas, huerfanos
+
+        except Exception as ex:
+            print("ERROR ModelViaje.backfill_resumen:", ex)
+            db.connection.rollback()
+            raise
+
+    @classmethod
+    def reconciliar_ocupacion(cls, db):
+        """
+        Reconstruye Viaje_Ocupacion desde Boleto (por si algún cambio se
+        hizo con los triggers deshabilitados o antes de crearlos).
+
+        Retorna (viajes_desfasados, filas_afectadas).
+        """
+        try:
+            conn = db.connection
+            cursor = conn.cursor()
+
+            sql_real = """
+                SELECT v.id_viaje,
+                       a.capacidad,
+                       COUNT(b.id_boleto) AS ocupados
+                FROM Viaje v
+                JOIN Autobus a ON a.id_autobus = v.id_autobus
+                LEFT JOIN Boleto b
+                       ON b.id_viaje = v.id_viaje
+                      AND b.estado IN ('Reservado','Pagado','Abordado')
+                GROUP BY v.id_viaje, a.capacidad
+            """
+
+            # 1) Cuántos viajes no cuadran (solo informativo)
+            cursor.execute(f"""
+                SELECT COUNT(*)
+                FROM ({sql_real}) r
+                LEFT JOIN Viaje_Ocupacion vo ON vo.id_viaje = r.id_viaje
+                WHERE vo.id_viaje IS NULL
+                   OR vo.capacidad <> r.capacidad
+                   OR vo.asientos_ocupados <> r.ocupados
+            """)
+            desfasados = cursor.fetchone()[0]
+
+            # 2) Reescribir contadores en una sola pasada
+            cursor.execute(f"""
+                INSERT INTO Viaje_Ocupacion (id_viaje, capacidad, asientos_ocupados)
+                SELECT r.id_viaje, r.capacidad, r.ocupados
+                FROM ({sql_real}) r
+                ON DUPLICATE KEY UPDATE
+                    capacidad         = VALUES(capacidad),
+                    asientos_ocupados = VALUES(asientos_ocupados)
+            """)
+            afectadas = cursor.rowcount
+
+            conn.commit()
+            cursor.close()
+            return desfasados, afectadas
+
+        except Exception as ex:
+            print("ERROR ModelViaje.reconciliar_ocupacion:", ex)
+            db.connection.rollback()
+            raise
@@ -3,18 +3,121 @@ import MySQLdb.cursors
 from datetime import datetime
 from decimal import Decimal
 
+from Services.TariffIndex import TariffIndex
+
 class ModelTarifa:
+
+    # Índice en memoria de Tarifa/ClaseServicio (se recarga por TTL o con invalidar())
+    indice = TariffIndex(ttl=300)
+
     @classmethod
-    def calcular_precio_boleto(cls, db, id_viaje: int):
-        """
-        Calcula el precio final de un boleto para un viaje dado.
+    def init_indice(cls, ttl):
+        cls.indice = TariffIndex(ttl=ttl)
 
-        Regla de negocio:
+    @classmethod
+    def precio_final(cls, precio_base, impuesto, recargo_fijo, recargo_pct, fecha_salida):
+        """
+        Regla de negocio (todo en Decimal):
         - Precio base desde Tarifa.precio_base
         - + recargo_fijo de ClaseServicio
         - + recargo_pct (porcentaje sobre precio_base)
         - + impuesto (monto fijo en Tarifa.impuesto)
         - +10% adicional si la fecha de salida es de Lunes a Viernes
+        """
+        # 1) Base + recargos por clase
+        subtotal = precio_base + recargo_fijo
+        subtotal += precio_base * (recargo_pct / Decimal('100'))
+
+        # 2) Sumamos impuesto (lo tomamos como monto fijo)
+        subtotal += impuesto
+
+        # 3) Recargo del 10% si la salida es de lunes a viernes
+        if isinstance(fecha_salida, str):
+            # por si el driver devolviera string
+            fecha_dt = datetime.fromisoformat(fecha_salida)
+        else:
+            fecha_dt = fecha_salida
+
+        # weekday(): 0 = lunes, 6 = domingo
+        if fecha_dt.weekday() < 5:  # 0..4 → lunes a viernes
+            subtotal *= Decimal('1.10')
+
+        # 4) Redondear a 2 decimales
+        return subtotal.quantize(Decimal('0.01'))
+
+    @classmethod
+    def cotizar(cls, db, id_ruta, id_clase, fecha_salida):
+        """
+        Precio para (ruta, clase, fecha) usando solo el índice en memoria.
+
+        Retorna:
+        - (id_tarifa, precio_final: Decimal)  ó  (None, None) si no hay tarifa
+        """
+        tarifa = cls.indice.tarifa_vigente(db, id_ruta, id_clase, fecha_salida)
+        if tarifa is None:
+            return None, None
+
+        recargo_fijo, recargo_pct = cls.indice.recargos_clase(db, id_clase)
+        precio = cls.precio_final(tarifa.precio_base, tarifa.impuesto,
+                                  recargo_fijo, recargo_pct, fecha_salida)
+        return tarifa.id_tarifa, precio
+
+    @classmethod
+    def cotizar_filas(cls, db, filas):
+        """
+        Cotiza en una sola pasada una lista de filas con id_ruta, id_clase y
+        fecha_salida (p. ej. las que ya trae la consulta de viajes).
+        Cada combinación (ruta, clase, día) se calcula una vez.
+
+        Retorna lista paralela de (id_tarifa, precio_final: Decimal) / (None, None).
+        """
+        memo = {}
+        resultado = []
+        for f in filas:
+            fecha = f['fecha_salida']
+            if isinstance(fecha, str):
+                fecha = datetime.fromisoformat(fecha)
+            llave = (f['id_ruta'], f['id_clase'], fecha.date())
+            if llave not in memo:
+                memo[llave] = cls.cotizar(db, f['id_ruta'], f['id_clase'], fecha)
+            resultado.append(memo[llave])
+        return resultado
+
+    @classmethod
+    def cotizar_viajes(cls, db, ids_viaje):
+        """
+        Precios de varios viajes con una sola consulta (IN) + el índice.
+
+        Retorna dict id_viaje -> (id_tarifa, precio_final: Decimal); los
+        viajes sin tarifa quedan como (None, None) y los inexistentes no
+        aparecen.
+        """
+        ids = sorted({int(i) for i in ids_viaje})
+        if not ids:
+            return {}
+
+        cursor = db.connection.cursor(MySQLdb.cursors.DictCursor)
+        marcadores = ', '.join(['%s'] * len(ids))
+        cursor.execute(f"""
+            SELECT v.id_viaje, v.id_ruta, a.id_clase, v.fecha_salida
+            FROM Viaje v
+            JOIN Autobus a ON v.id_autobus = a.id_autobus
+            WHERE v.id_viaje IN ({marcadores})
+        """, ids)
+        filas = cursor.fetchall()
+        cursor.close()
+
+        precios = cls.cotizar_filas(db, filas)
+        return {f['id_viaje']: p for f, p in zip(filas, precios)}
+
+    @classmethod
+    def calcular_precio_boleto(cls, db, id_viaje: int):
+        """
+        Calcula el precio final de un boleto para un viaje dado
+        (ver precio_final para la regla de negocio).
+
+        Solo consulta a MySQL la ruta/clase/fecha del viaje (por PK); la
+        tarifa vigente sale del índice en memoria.
 
         Retorna:
         - (id_tarifa, precio_final)  ó  (None, None) si no encuentra tarifa
@@ -23,28 +126,10 @@ class ModelTarifa:
             cursor = db.connection.cursor(MySQLdb.cursors.DictCursor)
 
             sql = """
-            SELECT 
-                t.id_tarifa,
-                t.precio_base,
-                t.impuesto,
-                cs.recargo_fijo,
-                cs.recargo_pct,
-                v.fecha_salida
+            SELECT v.id_ruta, a.id_clase, v.fecha_salida
             FROM Viaje v
-            JOIN Ruta r       ON v.id_ruta    = r.id_ruta
-            JOIN Autobus a    ON v.id_autobus = a.id_autobus
-            LEFT JOIN ClaseServicio cs 
-                   ON a.id_clase = cs.id_clase
-            JOIN Tarifa t
-              ON t.id_ruta = r.id_ruta
-             AND (t.id_clase = a.id_clase OR t.id_clase IS NULL)
-             AND DATE(v.fecha_salida) BETWEEN t.vigencia_inicio 
-                                          AND IFNULL(t.vigencia_fin, DATE(v.fecha_salida))
+            JOIN Autobus a ON v.id_autobus = a.id_autobus
             WHERE v.id_viaje = %s
-            ORDER BY 
-              (t.id_clase IS NULL) ASC,
-              t.vigencia_inicio DESC
-            LIMIT 1;
             """
 
             cursor.execute(sql, (id_viaje,))
@@ -52,38 +137,14 @@ class ModelTarifa:
             cursor.close()
 
             if not row:
-                # No hay tarifa definida para ese viaje
                 return None, None
 
-            # Extraemos valores y los convertimos a Decimal para evitar problemas de flotantes
-            precio_base   = Decimal(row['precio_base']   or 0)
-            impuesto      = Decimal(row['impuesto']      or 0)
-            recargo_fijo  = Decimal(row.get('recargo_fijo') or 0)
-            recargo_pct   = Decimal(row.get('recargo_pct')  or 0)
-
-            # 1) Base + recargos por clase
-            subtotal = precio_base + recargo_fijo
-            subtotal += precio_base * (recargo_pct / Decimal('100'))
-
-            # 2) Sumamos impuesto (lo tomamos como monto fijo)
-            subtotal += impuesto
-
-            # 3) Recargo del 10% si la salida es de lunes a viernes
-            fecha_salida = row['fecha_salida']
-            if isinstance(fecha_salida, str):
-                # por si el driver devolviera string
-                fecha_dt = datetime.fromisoformat(fecha_salida)
-            else:
-                fecha_dt = fecha_salida
-
-            # weekday(): 0 = lunes, 6 = domingo
-            if fecha_dt.weekday() < 5:  # 0..4 → lunes a viernes
-                subtotal *= Decimal('1.10')
-
-            # 4) Redondear a 2 decimales
-            precio_final = subtotal.quantize(Decimal('0.01'))
+            id_tarifa, precio = cls.cotizar(db, row['id_ruta'], row['id_clase'], row['fecha_salida'])
+            if id_tarifa is None:
+                # No hay tarifa definida para ese viaje
+                return None, None
 
-            return row['id_tarifa'], float(precio_final)
+            return id_tarifa, float(precio)
 
         except Exception as ex:
             print("ERROR ModelTarifa.calcular_precio_boleto:", ex)
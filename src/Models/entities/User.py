@@ -2,13 +2,17 @@ from werkzeug.security import check_password_hash, generate_password_hash
 from flask_login import UserMixin
 
 class User(UserMixin):
-    def __init__(self, id_usuario, nombre_completo=None, email=None, password=None, rol=None, activo=True):
+    def __init__(self, id_usuario, nombre_completo=None, email=None, password=None, rol=None, activo=True,
+                 id_empleado=None, id_chofer=None):
         self.id_usuario = id_usuario
         self.nombre_completo = nombre_completo
         self.email = email
         self.password = password
         self.rol = rol
         self.activo = activo
+        # Registros vinculados (Empleado / Chofer), cargados con el usuario
+        self.id_empleado = id_empleado
+        self.id_chofer = id_chofer
 
     def get_id(self):
         return str(self.id_usuario)
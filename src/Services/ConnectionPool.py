@@ -0,0 +1,340 @@
+import threading
+import time
+from contextlib import contextmanager
+
+import MySQLdb
+from MySQLdb import cursors
+from flask import g, has_app_context
+
+
+class PoolTimeout(Exception):
+    """No se pudo obtener una conexión del pool dentro del tiempo de espera."""
+
+
+class _PooledConnection:
+    """Conexión física + marcas de tiempo que usa el pool para reciclarla."""
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.creada_en = time.monotonic()
+        self.ultimo_uso = self.creada_en
+
+    def close(self):
+        try:
+            self.raw.close()
+        except Exception:
+            pass
+
+
+class ConnectionPool:
+    """
+    Pool de conexiones MySQL seguro para hilos.
+
+    - Mantiene entre `min_size` y `max_size` conexiones abiertas.
+    - Al hacer checkout verifica la conexión con ping() si lleva más de
+      `ping_interval` segundos sin usarse; si falla, abre una nueva.
+    - Las conexiones ociosas más de `idle_timeout` segundos (o más viejas
+      que `max_lifetime`) se cierran, sin bajar de `min_size`.
+    - Lleva métricas de espera (cuántas veces y cuánto se esperó por una
+      conexión libre) para dimensionar el pool en horas pico.
+    """
+
+    def __init__(self, connect_kwargs, min_size=2, max_size=10, timeout=5.0,
+                 idle_timeout=300, max_lifetime=3600, ping_interval=30):
+        if max_size < 1 or min_size < 0 or min_size > max_size:
+            raise ValueError("Tamaño de pool inválido (min=%s, max=%s)" % (min_size, max_size))
+
+        self.connect_kwargs = dict(connect_kwargs)
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.idle_timeout = idle_timeout
+        self.max_lifetime = max_lifetime
+        self.ping_interval = ping_interval
+
+        self._idle = []          # pila LIFO de _PooledConnection libres
+        self._total = 0          # conexiones abiertas (libres + prestadas)
+        self._cond = threading.Condition()
+
+        # Métricas
+        self._checkouts = 0
+        self._waits = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._timeouts = 0
+        self._created = 0
+        self._closed = 0
+        self._failed_pings = 0
+
+    # ------------------------------------------------------------------
+    # Conexiones físicas
+    # ------------------------------------------------------------------
+    def _open(self):
+        raw = MySQLdb.connect(**self.connect_kwargs)
+        with self._cond:
+            self._created += 1
+        return _PooledConnection(raw)
+
+    def _discard(self, pc):
+        pc.close()
+        with self._cond:
+            self._total -= 1
+            self._closed += 1
+            self._cond.notify()
+
+    def _expired(self, pc, now):
+        if self.max_lifetime and now - pc.creada_en > self.max_lifetime:
+            return True
+        return False
+
+    def _healthy(self, pc, now):
+        """Ping sólo si la conexión lleva rato ociosa (evita un round trip por checkout)."""
+        if now - pc.ultimo_uso < self.ping_interval:
+            return True
+        try:
+            pc.raw.ping()
+            return True
+        except MySQLdb.Error:
+            with self._cond:
+                self._failed_pings += 1
+            return False
+
+    def prefill(self):
+        """Abre conexiones hasta alcanzar `min_size`."""
+        while True:
+            with self._cond:
+                if self._total >= self.min_size:
+                    return
+                self._total += 1
+            try:
+                pc = self._open()
+            except Exception:
+                with self._cond:
+                    self._total -= 1
+                raise
+            with self._cond:
+                self._idle.append(pc)
+                self._cond.notify()
+
+    # ------------------------------------------------------------------
+    # Checkout / checkin
+    # ------------------------------------------------------------------
+    def acquire(self, timeout=None):
+        """Presta una conexión del pool (MySQLdb.Connection)."""
+        timeout = self.timeout if timeout is None else timeout
+        inicio = time.monotonic()
+        esperado = False
+
+        while True:
+            pc = None
+            crear = False
+            with self._cond:
+                while not self._idle and self._total >= self.max_size:
+                    restante = timeout - (time.monotonic() - inicio)
+                    if restante <= 0:
+                        self._timeouts += 1
+                        raise PoolTimeout(
+                            "Sin conexiones libres tras %.2fs (max_size=%s)" % (timeout, self.max_size)
+                        )
+                    esperado = True
+                    self._cond.wait(restante)
+
+                if self._idle:
+                    pc = self._idle.pop()
+                else:
+                    self._total += 1
+                    crear = True
+
+            if crear:
+                try:
+                    pc = self._open()
+                except Exception:
+                    with self._cond:
+                        self._total -= 1
+                        self._cond.notify()
+                    raise
+            else:
+                now = time.monotonic()
+                if self._expired(pc, now) or not self._healthy(pc, now):
+                    self._discard(pc)
+                    continue
+
+            espera = time.monotonic() - inicio
+            with self._cond:
+                self._checkouts += 1
+                if esperado:
+                    self._waits += 1
+                    self._wait_total += espera
+                    self._wait_max = max(self._wait_max, espera)
+
+            pc.raw._pool_entry = pc
+            return pc.raw
+
+    def release(self, conn):
+        """Devuelve una conexión al pool, descartando cualquier transacción abierta."""
+        pc = getattr(conn, '_pool_entry', None)
+        if pc is None:
+            conn.close()
+            return
+
+        try:
+            # Cierra la transacción implícita (y su snapshot REPEATABLE READ)
+            # para que el siguiente request no vea datos viejos.
+            conn.rollback()
+        except MySQLdb.Error:
+            self._discard(pc)
+            return
+
+        now = time.monotonic()
+        pc.ultimo_uso = now
+        if self._expired(pc, now):
+            self._discard(pc)
+            return
+
+        with self._cond:
+            self._idle.append(pc)
+            self._cond.notify()
+        self.recycle_idle()
+
+    @contextmanager
+    def connection(self, timeout=None):
+        """Uso: `with pool.connection() as conn: ...` (para trabajo fuera del request)."""
+        conn = self.acquire(timeout)
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def recycle_idle(self):
+        """Cierra conexiones ociosas más allá de `idle_timeout`, respetando `min_size`."""
+        if not self.idle_timeout:
+            return
+        now = time.monotonic()
+        cerrar = []
+        with self._cond:
+            # Las más viejas quedan al fondo de la pila LIFO
+            while (self._idle and self._total - len(cerrar) > self.min_size
+                   and now - self._idle[0].ultimo_uso > self.idle_timeout):
+                cerrar.append(self._idle.pop(0))
+        for pc in cerrar:
+            self._discard(pc)
+
+    def close_all(self):
+        with self._cond:
+            cerrar, self._idle = self._idle, []
+        for pc in cerrar:
+            self._discard(pc)
+
+    # ------------------------------------------------------------------
+    # Métricas
+    # ------------------------------------------------------------------
+    def stats(self):
+        with self._cond:
+            return {
+                'min_size': self.min_size,
+                'max_size': self.max_size,
+                'abiertas': self._total,
+                'libres': len(self._idle),
+                'en_uso': self._total - len(self._idle),
+                'checkouts': self._checkouts,
+                'esperas': self._waits,
+                'espera_total_ms': round(self._wait_total * 1000, 2),
+                'espera_max_ms': round(self._wait_max * 1000, 2),
+                'espera_prom_ms': round(self._wait_total * 1000 / self._waits, 2) if self._waits else 0.0,
+                'timeouts': self._timeouts,
+                'creadas': self._created,
+                'cerradas': self._closed,
+                'pings_fallidos': self._failed_pings,
+            }
+
+
+class PooledMySQL:
+    """
+    Reemplazo directo de flask_mysqldb.MySQL respaldado por ConnectionPool.
+
+    `db.connection` sigue devolviendo una conexión MySQLdb ligada al contexto
+    de la aplicación (la misma durante todo el request); al terminar el
+    contexto se regresa al pool en lugar de cerrarse.
+    """
+
+    def __init__(self, app=None):
+        self.app = app
+        self.pool = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault("MYSQL_HOST", "localhost")
+        app.config.setdefault("MYSQL_USER", None)
+        app.config.setdefault("MYSQL_PASSWORD", None)
+        app.config.setdefault("MYSQL_DB", None)
+        app.config.setdefault("MYSQL_PORT", 3306)
+        app.config.setdefault("MYSQL_UNIX_SOCKET", None)
+        app.config.setdefault("MYSQL_CONNECT_TIMEOUT", 10)
+        app.config.setdefault("MYSQL_CHARSET", "utf8")
+        app.config.setdefault("MYSQL_SQL_MODE", None)
+        app.config.setdefault("MYSQL_CURSORCLASS", None)
+        app.config.setdefault("MYSQL_AUTOCOMMIT", False)
+        app.config.setdefault("MYSQL_CUSTOM_OPTIONS", None)
+
+        app.config.setdefault("MYSQL_POOL_MIN", 2)
+        app.config.setdefault("MYSQL_POOL_MAX", 10)
+        app.config.setdefault("MYSQL_POOL_TIMEOUT", 5.0)
+        app.config.setdefault("MYSQL_POOL_IDLE_TIMEOUT", 300)
+        app.config.setdefault("MYSQL_POOL_MAX_LIFETIME", 3600)
+        app.config.setdefault("MYSQL_POOL_PING_INTERVAL", 30)
+
+        self.pool = ConnectionPool(
+            self._connect_kwargs(app.config),
+            min_size=int(app.config["MYSQL_POOL_MIN"]),
+            max_size=int(app.config["MYSQL_POOL_MAX"]),
+            timeout=float(app.config["MYSQL_POOL_TIMEOUT"]),
+            idle_timeout=float(app.config["MYSQL_POOL_IDLE_TIMEOUT"]),
+            max_lifetime=float(app.config["MYSQL_POOL_MAX_LIFETIME"]),
+            ping_interval=float(app.config["MYSQL_POOL_PING_INTERVAL"]),
+        )
+        app.extensions['mysql_pool'] = self
+
+        if hasattr(app, "teardown_appcontext"):
+            app.teardown_appcontext(self.teardown)
+
+    @staticmethod
+    def _connect_kwargs(config):
+        kwargs = {}
+        mapping = (
+            ("MYSQL_HOST", "host"),
+            ("MYSQL_USER", "user"),
+            ("MYSQL_PASSWORD", "passwd"),
+            ("MYSQL_DB", "db"),
+            ("MYSQL_PORT", "port"),
+            ("MYSQL_UNIX_SOCKET", "unix_socket"),
+            ("MYSQL_CONNECT_TIMEOUT", "connect_timeout"),
+            ("MYSQL_CHARSET", "charset"),
+            ("MYSQL_SQL_MODE", "sql_mode"),
+            ("MYSQL_AUTOCOMMIT", "autocommit"),
+        )
+        for key, arg in mapping:
+            if config.get(key):
+                kwargs[arg] = config[key]
+
+        if config.get("MYSQL_CURSORCLASS"):
+            kwargs["cursorclass"] = getattr(cursors, config["MYSQL_CURSORCLASS"])
+
+        if config.get("MYSQL_CUSTOM_OPTIONS"):
+            kwargs.update(config["MYSQL_CUSTOM_OPTIONS"])
+
+        return kwargs
+
+    @property
+    def connection(self):
+        """Conexión del request actual (se presta del pool la primera vez)."""
+        if not has_app_context():
+            return None
+        if not hasattr(g, "mysql_db"):
+            g.mysql_db = self.pool.acquire()
+        return g.mysql_db
+
+    def teardown(self, exception):
+        conn = g.pop("mysql_db", None)
+        if conn is not None:
+            self.pool.release(conn)
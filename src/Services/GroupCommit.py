@@ -0,0 +1,159 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+
+from Services.Metrics import LatencyStats
+
+
+class EnvioVencido(Exception):
+    """
+    El elemento no se procesó dentro del timeout y se retiró de la cola:
+    es seguro que el escritor nunca lo verá (se puede reintentar).
+    """
+
+
+class GroupCommitQueue:
+    """
+    Cola en proceso para agrupar escrituras pequeñas en pocas transacciones.
+
+    Los llamadores encolan un elemento con enviar() y esperan su resultado;
+    un hilo escritor junta lo que llegue durante `ventana` segundos (o hasta
+    `max_lote` elementos) y llama `procesar(lote)`, que debe regresar una
+    lista paralela con el resultado o la excepción de cada elemento. Si
+    `procesar` lanza, todos los elementos del lote reciben esa excepción.
+
+    El timeout de enviar() solo retira elementos que el escritor aún no
+    toma; uno que ya está en un lote se espera hasta tener su resultado,
+    porque puede terminar en COMMIT.
+    """
+
+    def __init__(self, procesar, ventana=0.02, max_lote=32, nombre='group-commit'):
+        self.procesar = procesar
+        self.ventana = ventana
+        self.max_lote = max_lote
+        self.nombre = nombre
+
+        self._cola = queue.Queue()
+        self._hilo = None
+        self._lock = threading.Lock()
+        self._cerrada = False
+
+        self.lotes = 0
+        self.elementos = 0
+        self.max_visto = 0
+        self.errores_lote = 0
+        self.vencidos = 0
+        self.espera = LatencyStats()   # desde enviar() hasta tener resultado
+
+    # ------------------------------------------------------------------
+    # Llamadores
+    # ------------------------------------------------------------------
+    def enviar(self, elemento, timeout=None):
+        """
+        Encola `elemento` y bloquea hasta su resultado (o lanza su excepción).
+
+        Si pasa `timeout` y el escritor aún no lo toma, se cancela y lanza
+        EnvioVencido; si ya lo tomó, se sigue esperando su resultado.
+        """
+        self._asegurar_hilo()
+        futuro = Future()
+        inicio = time.perf_counter()
+        self._cola.put((elemento, futuro))
+        try:
+            try:
+                return futuro.result(timeout)
+            except FutureTimeoutError:
+                if futuro.cancel():
+                    self.vencidos += 1
+                    raise EnvioVencido(f"{self.nombre}: no se procesó en {timeout} s")
+                # Ya está en un lote: su resultado llega con el COMMIT
+                return futuro.result()
+        finally:
+            self.espera.registrar(time.perf_counter() - inicio)
+
+    def _asegurar_hilo(self):
+        if self._hilo is not None:
+            return
+        with self._lock:
+            if self._cerrada:
+                raise RuntimeError(f"{self.nombre}: la cola está cerrada")
+            if self._hilo is None:
+                self._hilo = threading.Thread(target=self._escritor, name=self.nombre, daemon=True)
+                self._hilo.start()
+
+    def cerrar(self):
+        """Procesa lo pendiente y detiene el hilo escritor."""
+        with self._lock:
+            self._cerrada = True
+            hilo = self._hilo
+        if hilo is not None:
+            self._cola.put(None)
+            hilo.join()
+
+    # ------------------------------------------------------------------
+    # Escritor
+    # ------------------------------------------------------------------
+    def _juntar_lote(self, primero):
+        lote = [primero]
+        limite = time.monotonic() + self.ventana
+        while len(lote) < self.max_lote:
+            restante = limite - time.monotonic()
+            if restante <= 0:
+                break
+            try:
+                siguiente = self._cola.get(timeout=restante)
+            except queue.Empty:
+                break
+            if siguiente is None:
+                self._cola.put(None)   # se atiende al salir del lote
+                break
+            lote.append(siguiente)
+        return lote
+
+    def _escritor(self):
+        while True:
+            primero = self._cola.get()
+            if primero is None:
+                return
+            # Los cancelados por timeout se saltan; los demás quedan en
+            # RUNNING y ya no se pueden cancelar
+            lote = [(e, f) for e, f in self._juntar_lote(primero)
+                    if f.set_running_or_notify_cancel()]
+            if not lote:
+                continue
+
+            elementos = [e for e, _ in lote]
+            try:
+                resultados = self.procesar(elementos)
+            except Exception as ex:
+                self.errores_lote += 1
+                resultados = [ex] * len(lote)
+            if len(resultados) != len(lote):
+                self.errores_lote += 1
+                resultados = [RuntimeError(f"{self.nombre}: procesar regresó "
+                                           f"{len(resultados)} resultados para {len(lote)}")] * len(lote)
+
+            self.lotes += 1
+            self.elementos += len(lote)
+            self.max_visto = max(self.max_visto, len(lote))
+
+            for (_, futuro), res in zip(lote, resultados):
+                if isinstance(res, BaseException):
+                    futuro.set_exception(res)
+                else:
+                    futuro.set_result(res)
+
+    def stats(self):
+        return {
+            'ventana_ms': round(self.ventana * 1000, 2),
+            'max_lote': self.max_lote,
+            'lotes': self.lotes,
+            'elementos': self.elementos,
+            'promedio_lote': round(self.elementos / self.lotes, 2) if self.lotes else 0.0,
+            'max_lote_visto': self.max_visto,
+            'errores_lote': self.errores_lote,
+            'vencidos': self.vencidos,
+            'pendientes': self._cola.qsize(),
+            'espera': self.espera.stats(),
+        }
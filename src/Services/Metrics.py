@@ -0,0 +1,45 @@
+import threading
+from collections import deque
+
+
+class LatencyStats:
+    """
+    Contador de latencias (segundos) para exponer en /api/admin/metricas:
+    total, promedio, máximo y percentiles sobre las últimas `ventana`
+    muestras.
+    """
+
+    def __init__(self, ventana=1000):
+        self._muestras = deque(maxlen=ventana)
+        self._lock = threading.Lock()
+        self.conteo = 0
+        self.total = 0.0
+        self.maximo = 0.0
+
+    def registrar(self, segundos):
+        with self._lock:
+            self._muestras.append(segundos)
+            self.conteo += 1
+            self.total += segundos
+            if segundos > self.maximo:
+                self.maximo = segundos
+
+    @staticmethod
+    def _percentil(ordenadas, p):
+        if not ordenadas:
+            return 0.0
+        i = min(len(ordenadas) - 1, int(round(p / 100.0 * (len(ordenadas) - 1))))
+        return ordenadas[i]
+
+    def stats(self):
+        with self._lock:
+            ordenadas = sorted(self._muestras)
+            conteo, total, maximo = self.conteo, self.total, self.maximo
+        return {
+            'conteo': conteo,
+            'promedio_ms': round(total / conteo * 1000, 2) if conteo else 0.0,
+            'p50_ms': round(self._percentil(ordenadas, 50) * 1000, 2),
+            'p95_ms': round(self._percentil(ordenadas, 95) * 1000, 2),
+            'p99_ms': round(self._percentil(ordenadas, 99) * 1000, 2),
+            'max_ms': round(maximo * 1000, 2),
+        }
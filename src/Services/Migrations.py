@@ -0,0 +1,147 @@
+import hashlib
+import os
+import re
+
+
+_ARCHIVO_RE = re.compile(r'^(\d{4})_([\w\-]+)\.sql$')
+
+
+class MigrationError(Exception):
+    """Falla al aplicar una migración (incluye versión y sentencia)."""
+
+
+def split_sql(texto):
+    """
+    Divide un script .sql en sentencias, respetando `DELIMITER` como en el
+    cliente mysql (necesario para procedimientos y triggers).
+    """
+    delim = ';'
+    buffer = []
+    sentencias = []
+
+    for linea in texto.splitlines():
+        limpia = linea.strip()
+        if limpia.upper().startswith('DELIMITER '):
+            delim = limpia.split(None, 1)[1]
+            continue
+
+        buffer.append(linea)
+        if limpia.endswith(delim):
+            buffer[-1] = linea.rstrip()[:-len(delim)]
+            sentencia = '\n'.join(buffer).strip()
+            buffer = []
+            if _tiene_codigo(sentencia):
+                sentencias.append(sentencia)
+
+    resto = '\n'.join(buffer).strip()
+    if _tiene_codigo(resto):
+        sentencias.append(resto)
+    return sentencias
+
+
+def _tiene_codigo(sentencia):
+    for linea in sentencia.splitlines():
+        linea = linea.strip()
+        if linea and not linea.startswith('--'):
+            return True
+    return False
+
+
+class MigrationRunner:
+    """
+    Aplica en orden los archivos `NNNN_nombre.sql` de `directorio` que aún
+    no estén registrados en la tabla `schema_migrations`.
+
+    MySQL hace commit implícito en cada DDL, así que una migración no es
+    atómica: si falla a la mitad no se registra y hay que corregirla y
+    volver a correrla. Por eso las migraciones se escriben idempotentes
+    cuando el DDL lo permite (IF NOT EXISTS / DROP ... IF EXISTS).
+    """
+
+    def __init__(self, db, directorio):
+        self.db = db
+        self.directorio = directorio
+
+    def _asegurar_tabla(self, cursor):
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+              version    CHAR(4)      NOT NULL PRIMARY KEY,
+              nombre     VARCHAR(120) NOT NULL,
+              checksum   CHAR(64)     NOT NULL,
+              aplicado_en DATETIME    NOT NULL DEFAULT CURRENT_TIMESTAMP
+            ) ENGINE=InnoDB
+        """)
+
+    def disponibles(self):
+        """Lista ordenada de (version, nombre, ruta, checksum)."""
+        migraciones = []
+        for archivo in sorted(os.listdir(self.directorio)):
+            m = _ARCHIVO_RE.match(archivo)
+            if not m:
+                continue
+            ruta = os.path.join(self.directorio, archivo)
+            with open(ruta, 'rb') as f:
+                checksum = hashlib.sha256(f.read()).hexdigest()
+            migraciones.append((m.group(1), m.group(2), ruta, checksum))
+        return migraciones
+
+    def aplicadas(self):
+        """Dict version -> checksum de las migraciones ya registradas."""
+        cursor = self.db.connection.cursor()
+        self._asegurar_tabla(cursor)
+        cursor.execute("SELECT version, checksum FROM schema_migrations")
+        rows = cursor.fetchall()
+        cursor.close()
+        return {r[0]: r[1] for r in rows}
+
+    def estado(self):
+        """Lista de (version, nombre, 'aplicada'|'pendiente'|'modificada')."""
+        hechas = self.aplicadas()
+        resultado = []
+        for version, nombre, _, checksum in self.disponibles():
+            if version not in hechas:
+                estado = 'pendiente'
+            elif hechas[version] != checksum:
+                estado = 'modificada'
+            else:
+                estado = 'aplicada'
+            resultado.append((version, nombre, estado))
+        return resultado
+
+    def migrar(self, hasta=None):
+        """Aplica las pendientes (opcionalmente hasta la versión `hasta`). Retorna las aplicadas."""
+        hechas = self.aplicadas()
+        conn = self.db.connection
+        aplicadas = []
+
+        for version, nombre, ruta, checksum in self.disponibles():
+            if hasta and version > hasta:
+                break
+            if version in hechas:
+                continue
+
+            with open(ruta, encoding='utf-8') as f:
+                sentencias = split_sql(f.read())
+
+            cursor = conn.cursor()
+            for sentencia in sentencias:
+                try:
+                    cursor.execute(sentencia)
+                    while cursor.nextset():
+                        pass
+                except Exception as ex:
+                    conn.rollback()
+                    cursor.close()
+                    raise MigrationError(
+                        f"Migración {version}_{nombre} falló: {ex}\n--- sentencia ---\n{sentencia}"
+                    ) from ex
+
+            cursor.execute("""
+                INSERT INTO schema_migrations (version, nombre, checksum)
+                VALUES (%s, %s, %s)
+            """, (version, nombre, checksum))
+            conn.commit()
+            cursor.close()
+            aplicadas.append((version, nombre))
+
+        return aplicadas
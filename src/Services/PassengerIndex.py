@@ -0,0 +1,246 @@
+import re
+import threading
+import time
+import unicodedata
+from bisect import bisect_left, insort
+
+import MySQLdb.cursors
+
+
+def _normalizar(texto):
+    """Minúsculas y sin acentos ('Peña' -> 'pena')."""
+    texto = unicodedata.normalize('NFKD', texto or '')
+    return ''.join(c for c in texto if not unicodedata.combining(c)).lower()
+
+
+def _digitos(texto):
+    return re.sub(r'\D', '', texto or '')
+
+
+class PassengerIndex:
+    """
+    Índice en memoria de Pasajero para el autocompletado de taquilla.
+
+    Tres arreglos ordenados de (llave, id_pasajero), buscados con bisect:
+      - cada palabra del nombre, normalizada -> búsqueda por prefijo
+      - correo en minúsculas                 -> búsqueda por prefijo
+      - dígitos del teléfono al revés        -> búsqueda por sufijo
+
+    Se carga completo la primera vez y cada `recarga` segundos (así salen
+    los pasajeros borrados o editados directo en la base). Entre recargas
+    se mantiene al día con agregar() después de cada venta y, a lo más
+    cada `intervalo` segundos, leyendo los id_pasajero nuevos (ventas de
+    otros workers).
+    """
+
+    # Entradas que se revisan por búsqueda antes de cortar (prefijos de
+    # una o dos letras pueden empatar con miles de nombres)
+    MAX_REVISADOS = 2000
+
+    def __init__(self, intervalo=5, recarga=3600):
+        self.intervalo = intervalo
+        self.recarga = recarga
+
+        self._pasajeros = {}    # id_pasajero -> (nombre, correo, telefono)
+        self._nombres = []      # [(palabra, id_pasajero)] ordenado
+        self._correos = []      # [(correo, id_pasajero)] ordenado
+        self._telefonos = []    # [(dígitos al revés, id_pasajero)] ordenado
+        self._ultimo_id = 0     # mayor id_pasajero leído de la base
+        self._cargado_en = None
+        self._revisado_en = 0.0
+        self._lock = threading.Lock()
+
+        self.recargas = 0
+        self.incrementos = 0
+        self.busquedas = 0
+
+    # ------------------------------------------------------------------
+    # Llaves
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _llaves(id_pasajero, nombre, correo, telefono):
+        nombres = [(p, id_pasajero) for p in set(_normalizar(nombre).split())]
+        correos = [(correo.lower(), id_pasajero)] if correo else []
+        tel = _digitos(telefono)
+        telefonos = [(tel[::-1], id_pasajero)] if tel else []
+        return nombres, correos, telefonos
+
+    def _poner(self, id_pasajero, nombre, correo, telefono):
+        """Agrega o reemplaza un pasajero (con el lock tomado)."""
+        if id_pasajero in self._pasajeros:
+            self._quitar(id_pasajero)
+        self._pasajeros[id_pasajero] = (nombre, correo, telefono)
+        nombres, correos, telefonos = self._llaves(id_pasajero, nombre, correo, telefono)
+        for lista, llaves in ((self._nombres, nombres),
+                              (self._correos, correos),
+                              (self._telefonos, telefonos)):
+            for llave in llaves:
+                insort(lista, llave)
+
+    def _quitar(self, id_pasajero):
+        nombre, correo, telefono = self._pasajeros.pop(id_pasajero)
+        nombres, correos, telefonos = self._llaves(id_pasajero, nombre, correo, telefono)
+        for lista, llaves in ((self._nombres, nombres),
+                              (self._correos, correos),
+                              (self._telefonos, telefonos)):
+            for llave in llaves:
+                i = bisect_left(lista, llave)
+                if i < len(lista) and lista[i] == llave:
+                    del lista[i]
+
+    # ------------------------------------------------------------------
+    # Carga desde MySQL
+    # ------------------------------------------------------------------
+    def recargar(self, db):
+        cursor = db.connection.cursor(MySQLdb.cursors.DictCursor)
+        cursor.execute("""
+            SELECT id_pasajero, nombre, correo, telefono
+            FROM Pasajero
+        """)
+        rows = cursor.fetchall()
+        cursor.close()
+
+        # Se arma aparte y se ordena una sola vez; luego se reemplaza todo
+        pasajeros, nombres, correos, telefonos = {}, [], [], []
+        ultimo_id = 0
+        for r in rows:
+            pasajeros[r['id_pasajero']] = (r['nombre'], r['correo'], r['telefono'])
+            n, c, t = self._llaves(r['id_pasajero'], r['nombre'], r['correo'], r['telefono'])
+            nombres.extend(n)
+            correos.extend(c)
+            telefonos.extend(t)
+            ultimo_id = max(ultimo_id, r['id_pasajero'])
+        nombres.sort()
+        correos.sort()
+        telefonos.sort()
+
+        ahora = time.monotonic()
+        with self._lock:
+            self._pasajeros = pasajeros
+            self._nombres = nombres
+            self._correos = correos
+            self._telefonos = telefonos
+            self._ultimo_id = ultimo_id
+            self._cargado_en = ahora
+            self._revisado_en = ahora
+            self.recargas += 1
+
+    def _leer_nuevos(self, db):
+        with self._lock:
+            desde = self._ultimo_id
+            self._revisado_en = time.monotonic()
+
+        cursor = db.connection.cursor(MySQLdb.cursors.DictCursor)
+        cursor.execute("""
+            SELECT id_pasajero, nombre, correo, telefono
+            FROM Pasajero
+            WHERE id_pasajero > %s
+            ORDER BY id_pasajero
+        """, (desde,))
+        rows = cursor.fetchall()
+        cursor.close()
+
+        if not rows:
+            return
+        with self._lock:
+            for r in rows:
+                self._poner(r['id_pasajero'], r['nombre'], r['correo'], r['telefono'])
+            self._ultimo_id = max(self._ultimo_id, rows[-1]['id_pasajero'])
+            self.incrementos += len(rows)
+
+    def _asegurar(self, db):
+        ahora = time.monotonic()
+        cargado_en = self._cargado_en
+        if cargado_en is None or ahora - cargado_en > self.recarga:
+            self.recargar(db)
+        elif ahora - self._revisado_en > self.intervalo:
+            self._leer_nuevos(db)
+
+    def invalidar(self):
+        with self._lock:
+            self._cargado_en = None
+
+    def agregar(self, id_pasajero, nombre, correo, telefono):
+        """
+        Pasajero recién insertado por una venta de este proceso. Si ya está
+        en el índice (venta que reutilizó el pasajero por correo) no se
+        toca: los datos de la base pueden diferir de los del formulario.
+        """
+        with self._lock:
+            if self._cargado_en is None or id_pasajero in self._pasajeros:
+                return
+            self._poner(id_pasajero, nombre, correo, telefono)
+
+    # ------------------------------------------------------------------
+    # Búsqueda
+    # ------------------------------------------------------------------
+    def _prefijo(self, lista, prefijo):
+        """ids cuya llave empieza con `prefijo`, en orden de llave."""
+        i = bisect_left(lista, (prefijo,))
+        fin = min(len(lista), i + self.MAX_REVISADOS)
+        while i < fin and lista[i][0].startswith(prefijo):
+            yield lista[i][1]
+            i += 1
+
+    def buscar(self, db, texto, limite=10):
+        """
+        Pasajeros que empatan con `texto` mientras se teclea:
+          - solo dígitos (3 o más): teléfono que termina en ellos
+          - con '@': correo que empieza con el texto
+          - otro texto: nombre cuyas palabras empiezan con las palabras
+            del texto (en cualquier orden), o correo que empieza con él
+        Retorna lista de dicts (id_pasajero, nombre, correo, telefono).
+        """
+        self._asegurar(db)
+        texto = (texto or '').strip()
+        tel = _digitos(texto)
+
+        with self._lock:
+            self.busquedas += 1
+            if tel and len(tel) >= 3 and not re.search(r'[^\d\s()+-]', texto):
+                candidatos = self._prefijo(self._telefonos, tel[::-1])
+            elif '@' in texto:
+                candidatos = self._prefijo(self._correos, texto.lower())
+            else:
+                palabras = _normalizar(texto).split()
+                if not palabras:
+                    return []
+                # Se recorre la palabra más larga (la más selectiva) y se
+                # filtra con las demás
+                guia = max(palabras, key=len)
+
+                def coincide(id_pasajero):
+                    nombre = _normalizar(self._pasajeros[id_pasajero][0]).split()
+                    return all(any(n.startswith(p) for n in nombre) for p in palabras)
+
+                por_nombre = (i for i in self._prefijo(self._nombres, guia) if coincide(i))
+                por_correo = self._prefijo(self._correos, texto.lower()) if len(palabras) == 1 else ()
+                candidatos = (i for fuente in (por_nombre, por_correo) for i in fuente)
+
+            vistos = []
+            for id_pasajero in candidatos:
+                if id_pasajero not in vistos:
+                    vistos.append(id_pasajero)
+                    if len(vistos) >= limite:
+                        break
+
+            return [
+                {
+                    'id_pasajero': i,
+                    'nombre': self._pasajeros[i][0],
+                    'correo': self._pasajeros[i][1],
+                    'telefono': self._pasajeros[i][2],
+                }
+                for i in vistos
+            ]
+
+    def stats(self):
+        return {
+            'pasajeros': len(self._pasajeros),
+            'llaves_nombre': len(self._nombres),
+            'intervalo': self.intervalo,
+            'recarga': self.recarga,
+            'recargas': self.recargas,
+            'incrementos': self.incrementos,
+            'busquedas': self.busquedas,
+        }
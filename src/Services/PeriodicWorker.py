@@ -0,0 +1,77 @@
+import threading
+import time
+
+from Services.Metrics import LatencyStats
+
+
+class PeriodicWorker:
+    """
+    Hilo de fondo que corre `tarea()` cada `intervalo` segundos.
+
+    `tarea` regresa cuántos elementos procesó (solo para métricas). Un
+    error se registra y se reintenta en la siguiente vuelta; el hilo no
+    muere.
+    """
+
+    def __init__(self, tarea, intervalo=2.0, nombre='periodic-worker'):
+        self.tarea = tarea
+        self.intervalo = intervalo
+        self.nombre = nombre
+
+        self._evento = threading.Event()
+        self._hilo = None
+        self._lock = threading.Lock()
+        self._cerrado = False
+
+        self.vueltas = 0
+        self.procesados = 0
+        self.errores = 0
+        self.ultimo_error = None
+        self.duracion = LatencyStats()
+
+    def iniciar(self):
+        """Arranca el hilo si aún no corre (se puede llamar en cada request)."""
+        if self._hilo is not None:
+            return
+        with self._lock:
+            if self._cerrado or self._hilo is not None:
+                return
+            self._hilo = threading.Thread(target=self._ciclo, name=self.nombre, daemon=True)
+            self._hilo.start()
+
+    def cerrar(self):
+        """Detiene el hilo después de la vuelta en curso."""
+        with self._lock:
+            self._cerrado = True
+            hilo = self._hilo
+        self._evento.set()
+        if hilo is not None:
+            hilo.join()
+
+    def _ciclo(self):
+        while not self._cerrado:
+            self._evento.wait(self.intervalo)
+            self._evento.clear()
+            if self._cerrado:
+                return
+
+            inicio = time.perf_counter()
+            try:
+                self.procesados += self.tarea() or 0
+            except Exception as ex:
+                self.errores += 1
+                self.ultimo_error = str(ex)
+                print(f"ERROR {self.nombre}:", ex)
+            self.vueltas += 1
+            self.duracion.registrar(time.perf_counter() - inicio)
+
+    def stats(self):
+        return {
+            'intervalo_s': self.intervalo,
+            'activo': self._hilo is not None and self._hilo.is_alive(),
+            'vueltas': self.vueltas,
+            'procesados': self.procesados,
+            'errores': self.errores,
+            'ultimo_error': self.ultimo_error,
+            'duracion': self.duracion.stats(),
+        }
@@ -0,0 +1,171 @@
+import threading
+import uuid
+from collections import OrderedDict, deque
+
+
+class _Suscriptor:
+    """Cola de eventos pendientes de un cliente; `aviso` lo despierta."""
+
+    __slots__ = ('viajes', 'pendientes', 'aviso')
+
+    def __init__(self, viajes):
+        self.viajes = viajes
+        self.pendientes = deque()
+        self.aviso = threading.Event()
+
+
+class _Canal:
+    """Eventos recientes y suscriptores de un viaje."""
+
+    __slots__ = ('historial', 'suscriptores', 'descartado_hasta')
+
+    def __init__(self, maxlen):
+        self.historial = deque(maxlen=maxlen)   # (n, tipo, datos)
+        self.suscriptores = set()
+        self.descartado_hasta = 0               # mayor n que ya salió del historial
+
+
+class SeatEvents:
+    """
+    Eventos de asientos por viaje para /api/viajes/eventos (Server-Sent Events).
+
+    Tipos: 'vendido', 'liberado', 'apartado' y 'resync' (el estado del
+    viaje está en duda: el cliente debe volver a pedir los asientos).
+
+    Publicar solo toca a los suscriptores del viaje: cada uno tiene su
+    propia cola y un threading.Event, así que un cliente inactivo es un
+    hilo dormido en wait() que despierta para el latido. Cada evento lleva
+    un número consecutivo (con el id de la instancia) que el navegador
+    reenvía como Last-Event-ID al reconectar; se repite lo que falte del
+    historial del viaje o, si ya no está, se manda 'resync'.
+
+    Los eventos son por proceso: con varios workers un cliente solo ve
+    las ventas hechas en el suyo (las demás aparecen al recargar asientos).
+    """
+
+    def __init__(self, historial=256, max_canales=2048, max_suscriptores=200):
+        self.historial = historial
+        self.max_canales = max_canales
+        self.max_suscriptores = max_suscriptores
+
+        self._instancia = uuid.uuid4().hex[:8]
+        self._canales = OrderedDict()    # id_viaje -> _Canal
+        self._n = 0                      # último número de evento asignado
+        self._descartado_hasta = 0       # mayor n de los canales descartados
+        self._suscriptores = 0
+        self._lock = threading.Lock()
+
+        self.publicados = 0
+        self.rechazados = 0
+
+    def _canal(self, id_viaje):
+        # Con el lock tomado
+        canal = self._canales.get(id_viaje)
+        if canal is None:
+            # Antes de crear el nuevo se descarta el canal más viejo sin
+            # suscriptores; si todos tienen, se pasa de max_canales
+            if len(self._canales) >= self.max_canales:
+                for viejo, c in self._canales.items():
+                    if not c.suscriptores:
+                        if c.historial:
+                            self._descartado_hasta = max(self._descartado_hasta, c.historial[-1][0])
+                        del self._canales[viejo]
+                        break
+            canal = self._canales[id_viaje] = _Canal(self.historial)
+        else:
+            self._canales.move_to_end(id_viaje)
+        return canal
+
+    # ------------------------------------------------------------------
+    # Publicación (llamar después del commit)
+    # ------------------------------------------------------------------
+    def publicar(self, id_viaje, tipo, **datos):
+        datos['id_viaje'] = id_viaje
+        with self._lock:
+            self._n += 1
+            canal = self._canal(id_viaje)
+            if len(canal.historial) == canal.historial.maxlen:
+                canal.descartado_hasta = canal.historial[0][0]
+            evento = (self._n, tipo, datos)
+            canal.historial.append(evento)
+            self.publicados += 1
+            for s in canal.suscriptores:
+                s.pendientes.append(evento)
+                s.aviso.set()
+
+    # ------------------------------------------------------------------
+    # Suscripción
+    # ------------------------------------------------------------------
+    def suscribir(self, viajes, ultimo_id=None):
+        """
+        Registra un cliente para `viajes`. Retorna el _Suscriptor o None si
+        ya se alcanzó max_suscriptores. `ultimo_id` es el Last-Event-ID del
+        navegador al reconectar.
+        """
+        s = _Suscriptor(tuple(viajes))
+        with self._lock:
+            if self._suscriptores >= self.max_suscriptores:
+                self.rechazados += 1
+                return None
+            self._suscriptores += 1
+
+            desde = self._numero(ultimo_id)
+            resync = ultimo_id is not None and desde is None
+            perdidos = []
+            for id_viaje in s.viajes:
+                canal = self._canales.get(id_viaje)
+                if canal is None:
+                    canal = self._canal(id_viaje)
+                    resync = resync or (desde is not None and desde < self._descartado_hasta)
+                elif desde is not None:
+                    resync = resync or desde < canal.descartado_hasta
+                    perdidos.extend(e for e in canal.historial if e[0] > desde)
+                canal.suscriptores.add(s)
+
+            if resync:
+                s.pendientes.append((self._n, 'resync', {}))
+            else:
+                s.pendientes.extend(sorted(perdidos, key=lambda e: e[0]))
+            if s.pendientes:
+                s.aviso.set()
+        return s
+
+    def cancelar(self, s):
+        with self._lock:
+            self._suscriptores -= 1
+            for id_viaje in s.viajes:
+                canal = self._canales.get(id_viaje)
+                if canal is not None:
+                    canal.suscriptores.discard(s)
+
+    def esperar(self, s, timeout):
+        """Eventos pendientes de `s`; lista vacía si pasó `timeout` sin ninguno."""
+        if s.aviso.wait(timeout):
+            with self._lock:
+                s.aviso.clear()
+                eventos = list(s.pendientes)
+                s.pendientes.clear()
+            return eventos
+        return []
+
+    def id_evento(self, n):
+        return f"{self._instancia}-{n}"
+
+    def _numero(self, ultimo_id):
+        """n de un Last-Event-ID de esta instancia, o None."""
+        if not ultimo_id:
+            return None
+        instancia, _, n = ultimo_id.partition('-')
+        if instancia != self._instancia or not n.isdigit():
+            return None
+        return int(n)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'canales': len(self._canales),
+                'suscriptores': self._suscriptores,
+                'max_suscriptores': self.max_suscriptores,
+                'publicados': self.publicados,
+                'rechazados': self.rechazados,
+            }
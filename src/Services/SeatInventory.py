@@ -0,0 +1,315 @@
+import base64
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+import MySQLdb.cursors
+
+
+class _TripSeats:
+    """
+    Estado de un viaje: capacidad + bitmap de asientos ocupados (bit n =
+    asiento n) + versión, que cambia cada vez que cambia el bitmap.
+    """
+
+    __slots__ = ('capacidad', 'ocupados', 'cargado_en', 'version')
+
+    def __init__(self, capacidad, ocupados, cargado_en):
+        self.capacidad = capacidad
+        self.ocupados = ocupados
+        self.cargado_en = cargado_en
+        self.version = 0
+
+
+class SeatInventory:
+    """
+    Inventario de asientos en memoria, un bitmap por viaje activo.
+
+    - Se carga de forma perezosa (una sola consulta) la primera vez que se
+      pide un viaje.
+    - La venta y la cancelación de boletos lo actualizan después del commit
+      con marcar_ocupado()/liberar().
+    - Si hay duda sobre el estado (error en una venta, viaje cancelado,
+      entrada más vieja que `ttl`, cambio concurrente durante la carga) el
+      viaje se descarta y la siguiente consulta vuelve a MySQL.
+
+    El inventario es por proceso; con varios workers el `ttl` acota cuánto
+    tarda uno en ver las ventas hechas por otro (el INSERT sigue protegido
+    por uq_boleto_asiento).
+
+    Cada viaje lleva una versión (contador del proceso) que cambia con
+    cada venta/cancelación o cuando una recarga trae otro bitmap; con el
+    id de la instancia forma la base del ETag del formato compacto, así un
+    ETag de otro worker o de antes de un reinicio nunca empata. Los
+    apartados no están aquí; app._asientos_compacto los suma al ETag.
+
+    Con `eventos` (Services/SeatEvents.py) cada marcar_ocupado(),
+    liberar() e invalidar() se publica también como evento del viaje.
+    """
+
+    def __init__(self, ttl=30, maxsize=2048, eventos=None):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.eventos = eventos
+        self._trips = OrderedDict()   # id_viaje -> _TripSeats
+        self._cargando = {}           # id_viaje -> cargas en curso
+        self._sucios = set()          # viajes que cambiaron durante una carga en curso
+        self._lock = threading.Lock()
+        self._instancia = uuid.uuid4().hex[:8]
+        self._version = 0             # última versión asignada
+
+        self.hits = 0
+        self.cargas = 0
+        self.invalidaciones = 0
+
+    # ------------------------------------------------------------------
+    # Carga desde MySQL
+    # ------------------------------------------------------------------
+    def _cargar(self, db, id_viaje):
+        cursor = db.connection.cursor(MySQLdb.cursors.DictCursor)
+        cursor.execute("""
+            SELECT a.capacidad, b.numero_asiento
+            FROM Viaje v
+            JOIN Autobus a ON a.id_autobus = v.id_autobus
+            LEFT JOIN Boleto b
+                   ON b.id_viaje = v.id_viaje
+                  AND b.estado IN ('Reservado','Pagado','Abordado')
+            WHERE v.id_viaje = %s
+        """, (id_viaje,))
+        rows = cursor.fetchall()
+        cursor.close()
+
+        if not rows:
+            return None
+
+        ocupados = 0
+        for r in rows:
+            if r['numero_asiento']:
+                ocupados |= 1 << r['numero_asiento']
+        return _TripSeats(rows[0]['capacidad'], ocupados, time.monotonic())
+
+    def _cargar_varios(self, db, ids):
+        """Como _cargar, para varios viajes en una sola consulta: id_viaje -> _TripSeats."""
+        cursor = db.connection.cursor(MySQLdb.cursors.DictCursor)
+        cursor.execute(f"""
+            SELECT v.id_viaje, a.capacidad, b.numero_asiento
+            FROM Viaje v
+            JOIN Autobus a ON a.id_autobus = v.id_autobus
+            LEFT JOIN Boleto b
+                   ON b.id_viaje = v.id_viaje
+                  AND b.estado IN ('Reservado','Pagado','Abordado')
+            WHERE v.id_viaje IN ({', '.join(['%s'] * len(ids))})
+        """, list(ids))
+        rows = cursor.fetchall()
+        cursor.close()
+
+        ahora = time.monotonic()
+        viajes = {}
+        for r in rows:
+            st = viajes.get(r['id_viaje'])
+            if st is None:
+                st = viajes[r['id_viaje']] = _TripSeats(r['capacidad'], 0, ahora)
+            if r['numero_asiento']:
+                st.ocupados |= 1 << r['numero_asiento']
+        return viajes
+
+    def _vigentes(self, ids):
+        """
+        Separa `ids` en los que están vigentes en memoria (dict) y los que
+        hay que cargar; estos últimos quedan registrados en _cargando.
+        """
+        now = time.monotonic()
+        vigentes, faltan = {}, []
+        with self._lock:
+            for id_viaje in ids:
+                st = self._trips.get(id_viaje)
+                if st is not None and now - st.cargado_en <= self.ttl:
+                    self._trips.move_to_end(id_viaje)
+                    self.hits += 1
+                    vigentes[id_viaje] = st
+                else:
+                    self._cargando[id_viaje] = self._cargando.get(id_viaje, 0) + 1
+                    faltan.append(id_viaje)
+        return vigentes, faltan
+
+    def _guardar(self, faltan, cargados):
+        """Cierra la carga de `faltan` (con _vigentes) y guarda lo cargado."""
+        with self._lock:
+            for id_viaje in faltan:
+                st = cargados.get(id_viaje)
+                # Si hubo una venta/cancelación mientras cargábamos, el
+                # resultado sirve para esta respuesta pero no se guarda.
+                if st is not None:
+                    self.cargas += 1
+                    # Una recarga que trae lo mismo conserva la versión
+                    previo = self._trips.get(id_viaje)
+                    if (previo is not None and id_viaje not in self._sucios
+                            and (previo.capacidad, previo.ocupados) == (st.capacidad, st.ocupados)):
+                        st.version = previo.version
+                    else:
+                        st.version = self._nueva_version()
+                if st is not None and id_viaje not in self._sucios:
+                    self._trips[id_viaje] = st
+                    self._trips.move_to_end(id_viaje)
+
+                pendientes = self._cargando[id_viaje] - 1
+                if pendientes:
+                    self._cargando[id_viaje] = pendientes
+                else:
+                    del self._cargando[id_viaje]
+                    self._sucios.discard(id_viaje)
+
+            while len(self._trips) > self.maxsize:
+                self._trips.popitem(last=False)
+
+    def _nueva_version(self):
+        # Con el lock tomado
+        self._version += 1
+        return self._version
+
+    def _get(self, db, id_viaje):
+        vigentes, faltan = self._vigentes([id_viaje])
+        if not faltan:
+            return vigentes[id_viaje]
+
+        st = None
+        try:
+            st = self._cargar(db, id_viaje)
+        finally:
+            self._guardar(faltan, {id_viaje: st} if st is not None else {})
+        return st
+
+    # ------------------------------------------------------------------
+    # Consultas
+    # ------------------------------------------------------------------
+    def estado(self, db, id_viaje):
+        """(capacidad, bitmap_ocupados) o None si el viaje no existe."""
+        st = self._get(db, id_viaje)
+        if st is None:
+            return None
+        return st.capacidad, st.ocupados
+
+    def disponibilidad(self, db, id_viaje):
+        """
+        Dict con capacidad, ocupados y asientos_libres (formato de
+        /api/viajes/<id>/asientos) o None si el viaje no existe.
+        """
+        res = self.estado(db, id_viaje)
+        if res is None:
+            return None
+        capacidad, bits = res
+        ocupados = [n for n in range(1, capacidad + 1) if bits >> n & 1]
+        libres = [n for n in range(1, capacidad + 1) if not bits >> n & 1]
+        return {
+            'capacidad': capacidad,
+            'ocupados': ocupados,
+            'asientos_libres': libres,
+        }
+
+    def estados(self, db, ids):
+        """
+        estado() de varios viajes: dict id_viaje -> (capacidad, bitmap_ocupados),
+        sin los que no existen. Los que no están en memoria se cargan todos
+        juntos en una sola consulta.
+        """
+        ids = list(dict.fromkeys(ids))
+        vigentes, faltan = self._vigentes(ids)
+
+        cargados = {}
+        if faltan:
+            try:
+                cargados = self._cargar_varios(db, faltan)
+            finally:
+                self._guardar(faltan, cargados)
+
+        resultado = {}
+        for id_viaje in ids:
+            st = vigentes.get(id_viaje) or cargados.get(id_viaje)
+            if st is not None:
+                resultado[id_viaje] = (st.capacidad, st.ocupados)
+        return resultado
+
+    @staticmethod
+    def bitset(bits, capacidad):
+        """
+        Bitmap (bit n = asiento n) en base64, un bit por asiento, LSB
+        primero: el bit j del byte i es el asiento 8*i + j + 1.
+        """
+        crudo = ((bits >> 1) & ((1 << capacidad) - 1)).to_bytes((capacidad + 7) // 8, 'little')
+        return base64.b64encode(crudo).decode('ascii')
+
+    def compacto(self, db, id_viaje):
+        """
+        (capacidad, bitmap_ocupados, version) o None si el viaje no existe.
+        version cambia junto con el bitmap (base del ETag del formato
+        compacto; ver app._asientos_compacto).
+        """
+        st = self._get(db, id_viaje)
+        if st is None:
+            return None
+        # Bitmap y versión juntos: una venta en medio daría un ETag nuevo
+        # con el bitmap viejo
+        with self._lock:
+            capacidad, bits, version = st.capacidad, st.ocupados, st.version
+        return capacidad, bits, f"{self._instancia}-{id_viaje}-{version}"
+
+    def esta_libre(self, db, id_viaje, numero_asiento):
+        res = self.estado(db, id_viaje)
+        if res is None:
+            return False
+        capacidad, bits = res
+        return 1 <= numero_asiento <= capacidad and not bits >> numero_asiento & 1
+
+    # ------------------------------------------------------------------
+    # Actualizaciones (llamar después del commit)
+    # ------------------------------------------------------------------
+    def _mutar(self, id_viaje, fn):
+        with self._lock:
+            if id_viaje in self._cargando:
+                self._sucios.add(id_viaje)
+            st = self._trips.get(id_viaje)
+            if st is not None:
+                fn(st)
+                st.version = self._nueva_version()
+
+    def marcar_ocupado(self, id_viaje, numero_asiento):
+        def fn(st):
+            st.ocupados |= 1 << numero_asiento
+        self._mutar(id_viaje, fn)
+        if self.eventos is not None:
+            self.eventos.publicar(id_viaje, 'vendido', asiento=numero_asiento)
+
+    def liberar(self, id_viaje, numero_asiento):
+        def fn(st):
+            st.ocupados &= ~(1 << numero_asiento)
+        self._mutar(id_viaje, fn)
+        if self.eventos is not None:
+            self.eventos.publicar(id_viaje, 'liberado', asiento=numero_asiento)
+
+    def invalidar(self, id_viaje):
+        """Descarta el viaje: la siguiente consulta se resuelve contra MySQL."""
+        with self._lock:
+            if id_viaje in self._cargando:
+                self._sucios.add(id_viaje)
+            if self._trips.pop(id_viaje, None) is not None:
+                self.invalidaciones += 1
+        if self.eventos is not None:
+            self.eventos.publicar(id_viaje, 'resync')
+
+    def clear(self):
+        with self._lock:
+            self._sucios.update(self._cargando)
+            self.invalidaciones += len(self._trips)
+            self._trips.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'viajes': len(self._trips),
+                'maxsize': self.maxsize,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'cargas': self.cargas,
+                'invalidaciones': self.invalidaciones,
+            }
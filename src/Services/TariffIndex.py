@@ -0,0 +1,143 @@
+import threading
+import time
+from bisect import bisect_right
+from datetime import date, datetime
+from decimal import Decimal
+
+import MySQLdb.cursors
+
+
+class Tarifa:
+    __slots__ = ('id_tarifa', 'precio_base', 'impuesto', 'vigencia_inicio', 'vigencia_fin')
+
+    def __init__(self, id_tarifa, precio_base, impuesto, vigencia_inicio, vigencia_fin):
+        self.id_tarifa = id_tarifa
+        self.precio_base = precio_base
+        self.impuesto = impuesto
+        self.vigencia_inicio = vigencia_inicio
+        self.vigencia_fin = vigencia_fin
+
+
+class TariffIndex:
+    """
+    Índice en memoria de Tarifa y ClaseServicio.
+
+    Agrupa las tarifas por (id_ruta, id_clase) -- id_clase None = tarifa
+    genérica -- en listas ordenadas por vigencia_inicio, de modo que
+    "qué tarifa aplica a esta ruta, clase y fecha" es una búsqueda binaria.
+    Reproduce la regla de ModelTarifa: primero la tarifa de la clase, si
+    no la genérica; entre las vigentes, la de inicio más reciente.
+
+    Se recarga completo al vencer `ttl` o al llamar invalidar() (p. ej.
+    después de modificar tarifas).
+    """
+
+    def __init__(self, ttl=300):
+        self.ttl = ttl
+        # Estado inmutable que se reemplaza completo en cada recarga:
+        #   tarifas: (id_ruta, id_clase|None) -> [Tarifa] ordenada por inicio
+        #   inicios: misma llave -> [vigencia_inicio] (para bisect)
+        #   clases:  id_clase -> (recargo_fijo, recargo_pct)
+        self._estado = ({}, {}, {})
+        self._cargado_en = None
+        self._lock = threading.Lock()
+
+        self.recargas = 0
+
+    # ------------------------------------------------------------------
+    # Carga
+    # ------------------------------------------------------------------
+    def recargar(self, db):
+        cursor = db.connection.cursor(MySQLdb.cursors.DictCursor)
+        cursor.execute("""
+            SELECT id_tarifa, id_ruta, id_clase, precio_base, impuesto,
+                   vigencia_inicio, vigencia_fin
+            FROM Tarifa
+            ORDER BY id_ruta, id_clase, vigencia_inicio, id_tarifa
+        """)
+        rows_tarifa = cursor.fetchall()
+        cursor.execute("""
+            SELECT id_clase, recargo_fijo, recargo_pct
+            FROM ClaseServicio
+        """)
+        rows_clase = cursor.fetchall()
+        cursor.close()
+
+        tarifas = {}
+        for r in rows_tarifa:
+            tarifas.setdefault((r['id_ruta'], r['id_clase']), []).append(Tarifa(
+                r['id_tarifa'],
+                Decimal(r['precio_base'] or 0),
+                Decimal(r['impuesto'] or 0),
+                r['vigencia_inicio'],
+                r['vigencia_fin'],
+            ))
+        inicios = {k: [t.vigencia_inicio for t in lst] for k, lst in tarifas.items()}
+        clases = {
+            r['id_clase']: (Decimal(r['recargo_fijo'] or 0), Decimal(r['recargo_pct'] or 0))
+            for r in rows_clase
+        }
+
+        with self._lock:
+            self._estado = (tarifas, inicios, clases)
+            self._cargado_en = time.monotonic()
+            self.recargas += 1
+
+    def _asegurar(self, db):
+        cargado_en = self._cargado_en
+        if cargado_en is None or time.monotonic() - cargado_en > self.ttl:
+            self.recargar(db)
+
+    def invalidar(self):
+        with self._lock:
+            self._cargado_en = None
+
+    # ------------------------------------------------------------------
+    # Consultas (sin round trip mientras el índice esté vigente)
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _buscar(estado, llave, fecha):
+        tarifas, inicios, _ = estado
+        lista = tarifas.get(llave)
+        if not lista:
+            return None
+        # Última tarifa con inicio <= fecha; retrocede sólo si esa ya venció
+        # (caso raro de vigencias traslapadas).
+        i = bisect_right(inicios[llave], fecha) - 1
+        while i >= 0:
+            t = lista[i]
+            if t.vigencia_fin is None or t.vigencia_fin >= fecha:
+                return t
+            i -= 1
+        return None
+
+    def tarifa_vigente(self, db, id_ruta, id_clase, fecha):
+        """Tarifa aplicable a (ruta, clase, fecha) o None."""
+        self._asegurar(db)
+        if isinstance(fecha, datetime):
+            fecha = fecha.date()
+        elif not isinstance(fecha, date):
+            fecha = datetime.fromisoformat(str(fecha)).date()
+
+        estado = self._estado
+        t = None
+        if id_clase is not None:
+            t = self._buscar(estado, (id_ruta, id_clase), fecha)
+        if t is None:
+            t = self._buscar(estado, (id_ruta, None), fecha)
+        return t
+
+    def recargos_clase(self, db, id_clase):
+        """(recargo_fijo, recargo_pct) de la clase; ceros si no tiene clase."""
+        self._asegurar(db)
+        return self._estado[2].get(id_clase, (Decimal('0'), Decimal('0')))
+
+    def stats(self):
+        tarifas, _, clases = self._estado
+        return {
+            'rutas_clase': len(tarifas),
+            'tarifas': sum(len(v) for v in tarifas.values()),
+            'clases': len(clases),
+            'ttl': self.ttl,
+            'recargas': self.recargas,
+        }
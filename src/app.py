@@ -1,26 +1,146 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify
-from flask_mysqldb import MySQL
+from flask import Flask, Response, render_template, request, redirect, url_for, flash, jsonify
 from flask_wtf import CSRFProtect
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user
 from functools import wraps
+import json
+import os
+import re
+import threading
+import time
+import uuid
+import zlib
+import click
+from concurrent.futures import ThreadPoolExecutor
 from config import config
 from Models.ModelUser import ModelUser
+from Models.ModelViaje import ModelViaje
+from Models.ModelVenta import ModelVenta, VentaError, VentaRepetida
+from Models.ModelRetencion import ModelRetencion
+from Models.ModelVentaDetalle import ModelVentaDetalle
+from Models.ModelChofer import ModelChofer
+from Models.entities.ModelTarifa import ModelTarifa
 from Models.entities.User import User
+from Services.ConnectionPool import PooledMySQL
+from Services.SeatInventory import SeatInventory
+from Services.SeatEvents import SeatEvents
+from Services.PassengerIndex import PassengerIndex
+from Services.Migrations import MigrationRunner
+from Services.Metrics import LatencyStats
+from Services.GroupCommit import GroupCommitQueue, EnvioVencido
+from Services.PeriodicWorker import PeriodicWorker
+from Services.TTLCache import TTLCache
 from datetime import datetime
+from decimal import Decimal
 import MySQLdb.cursors
 
 app = Flask(__name__)
 csrf = CSRFProtect(app)
 app.config.from_object(config['development'])
 app.secret_key = app.config.get('SECRET_KEY', 'dev_secret')
-db = MySQL(app)
+
+# Venta_Detalle diferido: en las sesiones con esta variable tr_venta_snapshot
+# solo encola la venta (ver migrations/0011_venta_detalle_diferido.sql)
+if app.config['VENTA_DETALLE_DIFERIDO']:
+    opciones = dict(app.config.get('MYSQL_CUSTOM_OPTIONS') or {})
+    opciones['init_command'] = 'SET @venta_detalle_diferido = 1'
+    app.config['MYSQL_CUSTOM_OPTIONS'] = opciones
+
+db = PooledMySQL(app)
 
 login_manager = LoginManager(app)
 login_manager.login_view = 'login'
 
+ModelUser.init_cache(app.config['USER_CACHE_SIZE'], app.config['USER_CACHE_TTL'])
+ModelTarifa.init_indice(app.config['TARIFF_INDEX_TTL'])
+ModelViaje.init_cache(app.config['VIAJE_DATOS_CACHE_SIZE'], app.config['VIAJE_DATOS_CACHE_TTL'])
+eventos_asientos = SeatEvents(historial=app.config['SEAT_EVENTS_HISTORIAL'],
+                              max_suscriptores=app.config['SEAT_EVENTS_MAX_SUSCRIPTORES'])
+seat_inventory = SeatInventory(ttl=app.config['SEAT_INVENTORY_TTL'], eventos=eventos_asientos)
+indice_pasajeros = PassengerIndex(intervalo=app.config['PASSENGER_INDEX_INTERVALO'],
+                                  recarga=app.config['PASSENGER_INDEX_RECARGA'])
+ModelRetencion.init_config(app.config['RETENCION_MINUTOS'], app.config['RETENCION_PURGA_INTERVALO'])
+ModelVenta.init_config(app.config['IDEMPOTENCIA_HORAS'])
+ModelVentaDetalle.init_config(app.config['VENTA_DETALLE_LOTE'])
+latencia_venta = LatencyStats()
+
+# Panel del chofer: datos por id_chofer y los hilos de sus consultas en paralelo
+tableros_chofer = TTLCache(app.config['CHOFER_TABLERO_CACHE_SIZE'], app.config['CHOFER_TABLERO_CACHE_TTL'])
+consultas_chofer = ThreadPoolExecutor(max_workers=app.config['CHOFER_TABLERO_HILOS'],
+                                      thread_name_prefix='tablero-chofer')
+
+# HTML de boletos imprimibles por id_boleto (imprimir_boleto)
+boletos_impresos = TTLCache(app.config['BOLETO_IMPRESO_CACHE_SIZE'], app.config['BOLETO_IMPRESO_CACHE_TTL'])
+
+
+def _procesar_lote_ventas(ventas):
+    # Corre en el hilo escritor de la cola: su propio contexto = su propia conexión del pool
+    with app.app_context():
+        return ModelVenta.registrar_lote(db, ventas)
+
+
+# Group commit opcional para picos de venta (VENTA_GROUP_COMMIT=1)
+cola_ventas = None
+if app.config['VENTA_GROUP_COMMIT']:
+    cola_ventas = GroupCommitQueue(
+        _procesar_lote_ventas,
+        ventana=app.config['VENTA_GROUP_COMMIT_VENTANA_MS'] / 1000.0,
+        max_lote=app.config['VENTA_GROUP_COMMIT_MAX_LOTE'],
+        nombre='ventas-group-commit'
+    )
+
+
+def _procesar_venta_detalle():
+    with app.app_context():
+        return ModelVentaDetalle.procesar_pendientes(db)
+
+
+# Escritor de Venta_Detalle en modo diferido; arranca con el primer request
+# (no en los comandos de flask, p. ej. migrate)
+escritor_detalle = None
+if app.config['VENTA_DETALLE_DIFERIDO']:
+    escritor_detalle = PeriodicWorker(
+        _procesar_venta_detalle,
+        intervalo=app.config['VENTA_DETALLE_INTERVALO'],
+        nombre='venta-detalle'
+    )
+
+    @app.before_request
+    def _iniciar_escritor_detalle():
+        escritor_detalle.iniciar()
+
+
+def _publicar_liberados(liberados):
+    for id_viaje, numero_asiento in liberados:
+        eventos_asientos.publicar(id_viaje, 'liberado', asiento=numero_asiento)
+
+
+def _purgar_apartados():
+    with app.app_context():
+        liberados = ModelRetencion.purgar_si_toca(db)
+    _publicar_liberados(liberados)
+    return len(liberados)
+
+
+# Purga de apartados vencidos: los asientos vuelven a la lista de las
+# taquillas (evento 'liberado') aunque nadie esté apartando otros
+purga_apartados = PeriodicWorker(
+    _purgar_apartados,
+    intervalo=app.config['RETENCION_PURGA_INTERVALO'],
+    nombre='apartados-purga'
+)
+
+
+@app.before_request
+def _iniciar_purga_apartados():
+    purga_apartados.iniciar()
+
 @login_manager.user_loader
 def load_user(user_id):
-    return ModelUser.get_by_id(db, user_id)
+    user = ModelUser.get_by_id(db, user_id)
+    # Un usuario desactivado pierde la sesión en su siguiente request
+    if user is None or not user.activo:
+        return None
+    return user
 
 # Decorador para verificar que el usuario sea admin
 def admin_required(f):
@@ -69,13 +189,13 @@ def login():
 def home():
     try:
         cursor = db.connection.cursor(MySQLdb.cursors.DictCursor)
-        # 1) KPIs del día (boletos y monto)
+        # 1) KPIs del día (boletos y monto) desde el resumen diario
         cursor.execute("""
             SELECT 
-                COUNT(*) AS boletos_hoy,
-                COALESCE(SUM(monto), 0) AS monto_hoy
-            FROM Venta
-            WHERE DATE(fecha_venta) = CURDATE();
+                COALESCE(SUM(num_ventas), 0) AS boletos_hoy,
+                COALESCE(SUM(total), 0)      AS monto_hoy
+            FROM Venta_Resumen_Dia
+            WHERE fecha = CURDATE();
         """)
         kpi = cursor.fetchone() or {'boletos_hoy': 0, 'monto_hoy': 0}
 
@@ -113,32 +233,19 @@ def home():
             JOIN ClaseServicio cs ON cs.id_clase = a.id_clase
             JOIN Chofer ch  ON ch.id_chofer = v.id_chofer
 
-            -- Origen: menor orden_parada
-            JOIN Viaje_Escala ve_o
-              ON ve_o.id_viaje = v.id_viaje
-             AND ve_o.orden_parada = (
-                 SELECT MIN(orden_parada)
-                 FROM Viaje_Escala
-                 WHERE id_viaje = v.id_viaje
-             )
-            JOIN Terminal ot   ON ot.id_terminal = ve_o.id_terminal
-            JOIN Ciudad  oc    ON oc.id_ciudad   = ot.id_ciudad
-
-            -- Destino: mayor orden_parada
-            JOIN Viaje_Escala ve_d
-              ON ve_d.id_viaje = v.id_viaje
-             AND ve_d.orden_parada = (
-                 SELECT MAX(orden_parada)
-                 FROM Viaje_Escala
-                 WHERE id_viaje = v.id_viaje
-             )
-            JOIN Terminal dt   ON dt.id_terminal = ve_d.id_terminal
-            JOIN Ciudad  dc    ON dc.id_ciudad   = dt.id_ciudad
-
-            LEFT JOIN vw_asientos_disponibilidad ad
+            -- Origen/destino desnormalizados (Viaje_Resumen, mantenido por triggers)
+            JOIN Viaje_Resumen vr ON vr.id_viaje = v.id_viaje
+            JOIN Terminal ot ON ot.id_terminal = vr.id_terminal_origen
+            JOIN Ciudad  oc  ON oc.id_ciudad   = vr.id_ciudad_origen
+            JOIN Terminal dt ON dt.id_terminal = vr.id_terminal_destino
+            JOIN Ciudad  dc  ON dc.id_ciudad   = vr.id_ciudad_destino
+
+            -- Contadores incrementales (Viaje_Ocupacion, mantenido por triggers)
+            LEFT JOIN Viaje_Ocupacion ad
                    ON ad.id_viaje = v.id_viaje
 
-            WHERE DATE(v.fecha_salida) = CURDATE()
+            WHERE v.fecha_salida >= CURDATE()
+              AND v.fecha_salida <  CURDATE() + INTERVAL 1 DAY
               AND v.estado <> 'Cancelado'
             ORDER BY v.fecha_salida;
         """)
@@ -196,7 +303,8 @@ def logout():
 @login_required
 @admin_required
 def admin():
-    users = ModelUser.get_all_users(db)
+    # La tabla de usuarios se llena desde /api/admin/usuarios (paginada)
+    resumen_usuarios = ModelUser.resumen(db)
 
     # --- NUEVO BLOQUE: viajes cancelables ---
     try:
@@ -226,27 +334,12 @@ def admin():
             JOIN Ruta r ON r.id_ruta = v.id_ruta
             JOIN Autobus a ON a.id_autobus = v.id_autobus
 
-            -- ORIGEN: menor orden_parada
-            JOIN Viaje_Escala ve_o
-                   ON ve_o.id_viaje = v.id_viaje
-                  AND ve_o.orden_parada = (
-                      SELECT MIN(orden_parada)
-                      FROM Viaje_Escala
-                      WHERE id_viaje = v.id_viaje
-                  )
-            JOIN Terminal ot ON ot.id_terminal = ve_o.id_terminal
-            JOIN Ciudad  oc  ON oc.id_ciudad   = ot.id_ciudad
-
-            -- DESTINO: mayor orden_parada
-            JOIN Viaje_Escala ve_d
-                   ON ve_d.id_viaje = v.id_viaje
-                  AND ve_d.orden_parada = (
-                      SELECT MAX(orden_parada)
-                      FROM Viaje_Escala
-                      WHERE id_viaje = v.id_viaje
-                  )
-            JOIN Terminal dt ON dt.id_terminal = ve_d.id_terminal
-            JOIN Ciudad  dc  ON dc.id_ciudad   = dt.id_ciudad
+            -- Origen/destino desnormalizados (Viaje_Resumen, mantenido por triggers)
+            JOIN Viaje_Resumen vr ON vr.id_viaje = v.id_viaje
+            JOIN Terminal ot ON ot.id_terminal = vr.id_terminal_origen
+            JOIN Ciudad  oc  ON oc.id_ciudad   = vr.id_ciudad_origen
+            JOIN Terminal dt ON dt.id_terminal = vr.id_terminal_destino
+            JOIN Ciudad  dc  ON dc.id_ciudad   = vr.id_ciudad_destino
 
             WHERE v.estado <> 'Cancelado'
               AND v.fecha_salida >= NOW()
@@ -262,7 +355,8 @@ def admin():
 
     return render_template(
         'admin/admin.html',
-        users=users,
+        resumen_usuarios=resumen_usuarios,
+        por_pagina=app.config['ADMIN_USUARIOS_POR_PAGINA'],
         user=current_user,
         viajes_cancelables=viajes_cancelables
     )
@@ -401,173 +495,141 @@ def change_password(id_usuario):
         flash('Contraseña actualizada exitosamente.', 'success')
     else:
         flash('Error al cambiar la contraseña.', 'danger')
-    
-    return redirect(url_for('admin'))
-
-
-# ========== RUTAS DEL CHOFER ==========
-@app.route('/chofer')
-@login_required
-def chofer():
-    if current_user.rol != 'Chofer':
-        flash('Acceso denegado. Esta sección es solo para choferes.', 'danger')
-        return redirect(url_for('home'))
 
-    try:
-        cursor = db.connection.cursor(MySQLdb.cursors.DictCursor)
+    return redirect(url_for('admin'))
 
-        # 1) Obtener el id_chofer real a partir del usuario logueado
-        cursor.execute("""
-            SELECT ch.id_chofer
-            FROM Usuario u
-            JOIN Empleado e ON e.id_empleado = u.id_empleado
-            JOIN Chofer  ch ON ch.id_empleado = e.id_empleado
-            WHERE u.id_usuario = %s
-        """, (current_user.id_usuario,))
-        row = cursor.fetchone()
-
-        if not row:
-            flash('No se encontró un chofer asociado a este usuario.', 'danger')
-            cursor.close()
-            return redirect(url_for('home'))
 
-        id_chofer = row['id_chofer']
+ROLES_USUARIO = ('Admin', 'Empleado', 'Cliente', 'Mecanico', 'Chofer')
 
-        # 2) Viajes "activos" para este chofer (programados o en ruta, en función del tiempo)
-        cursor.execute("""
-            SELECT 
-                v.id_viaje,
-                DATE_FORMAT(v.fecha_salida, '%%d/%%m/%%Y') AS fecha,
-                DATE_FORMAT(v.fecha_salida, '%%H:%%i')       AS hora,
-                t_origen.nombre  AS origen,
-                t_destino.nombre AS destino,
-                CONCAT_WS(' ', a.numero_placa, a.numero_fisico) AS bus,
 
-                (
-                  SELECT COUNT(*)
-                  FROM Boleto b
-                  WHERE b.id_viaje = v.id_viaje
-                    AND b.estado IN ('Pagado','Reservado','Abordado')
-                ) AS pasajeros,
+@app.route('/api/admin/usuarios', methods=['GET'])
+@login_required
+@admin_required
+def api_admin_usuarios():
+    """
+    Directorio de usuarios paginado:
+      GET /api/admin/usuarios?buscar=ana&rol=Chofer&activo=1&pagina=2
+    `buscar` busca en nombre y email; `por_pagina` es opcional.
+    """
+    buscar = request.args.get('buscar', '').strip()[:120] or None
+    rol = request.args.get('rol', '').strip() or None
+    activo = request.args.get('activo', '').strip()
 
-                a.capacidad,
+    if rol is not None and rol not in ROLES_USUARIO:
+        return jsonify({'error': 'Rol no válido'}), 400
+    if activo not in ('', '0', '1'):
+        return jsonify({'error': 'activo debe ser 0 o 1'}), 400
 
-                CASE
-                  WHEN v.estado = 'Cancelado' THEN 'Cancelado'
-                  WHEN NOW() < v.fecha_salida THEN 'Pendiente'
-                  WHEN NOW() BETWEEN v.fecha_salida AND v.fecha_llegada THEN 'En Curso'
-                  ELSE 'Completado'
-                END AS estado_mostrar
-
-            FROM Viaje v
-            JOIN Ruta r ON v.id_ruta = r.id_ruta
-
-            -- ORIGEN (primer terminal de la ruta)
-            JOIN Ruta_Terminal rt_o
-              ON rt_o.id_ruta = r.id_ruta
-             AND rt_o.orden_parada = 1
-            JOIN Terminal t_origen ON t_origen.id_terminal = rt_o.id_terminal
-
-            -- DESTINO (último terminal de la ruta)
-            JOIN Ruta_Terminal rt_d
-              ON rt_d.id_ruta = r.id_ruta
-             AND rt_d.orden_parada = (
-                 SELECT MAX(orden_parada)
-                 FROM Ruta_Terminal
-                 WHERE id_ruta = r.id_ruta
-              )
-            JOIN Terminal t_destino ON t_destino.id_terminal = rt_d.id_terminal
+    try:
+        pagina = int(request.args.get('pagina', 1))
+        por_pagina = int(request.args.get('por_pagina', app.config['ADMIN_USUARIOS_POR_PAGINA']))
+    except ValueError:
+        return jsonify({'error': 'pagina y por_pagina deben ser enteros'}), 400
+    if pagina < 1 or not 1 <= por_pagina <= app.config['ADMIN_USUARIOS_MAX']:
+        return jsonify({'error': f"Página o tamaño de página fuera de rango (máx. {app.config['ADMIN_USUARIOS_MAX']})"}), 400
 
-            JOIN Autobus a ON a.id_autobus = v.id_autobus
+    usuarios, total = ModelUser.listar(
+        db,
+        buscar=buscar,
+        rol=rol,
+        activo=int(activo) if activo else None,
+        pagina=pagina,
+        por_pagina=por_pagina
+    )
+    return jsonify({
+        'usuarios': usuarios,
+        'total': total,
+        'pagina': pagina,
+        'por_pagina': por_pagina,
+        'paginas': (total + por_pagina - 1) // por_pagina
+    })
 
-            WHERE v.id_chofer = %s
-              AND v.estado <> 'Cancelado'
-            ORDER BY v.fecha_salida ASC;
-        """, (id_chofer,))
-
-        rows_viajes = cursor.fetchall()
-
-        viajes_programados = []
-        for row in rows_viajes:
-            viajes_programados.append({
-                'id_viaje':  row['id_viaje'],
-                'fecha':     row['fecha'],
-                'hora':      row['hora'],
-                'origen':    row['origen'],
-                'destino':   row['destino'],
-                'bus':       row['bus'],
-                'pasajeros': row['pasajeros'] or 0,
-                'capacidad': row['capacidad'] or 0,
-                'estado':    row['estado_mostrar']
-            })
 
-        # 3) Historial de viajes ya finalizados (por tiempo)
-        cursor.execute("""
-            SELECT 
-                DATE_FORMAT(v.fecha_salida, '%%d/%%m/%%Y') AS fecha,
-                t_origen.nombre  AS origen,
-                t_destino.nombre AS destino
-            FROM Viaje v
-            JOIN Ruta r ON v.id_ruta = r.id_ruta
-
-            JOIN Ruta_Terminal rt_o
-              ON rt_o.id_ruta = r.id_ruta
-             AND rt_o.orden_parada = 1
-            JOIN Terminal t_origen ON t_origen.id_terminal = rt_o.id_terminal
-
-            JOIN Ruta_Terminal rt_d
-              ON rt_d.id_ruta = r.id_ruta
-             AND rt_d.orden_parada = (
-                 SELECT MAX(orden_parada)
-                 FROM Ruta_Terminal
-                 WHERE id_ruta = r.id_ruta
-              )
-            JOIN Terminal t_destino ON t_destino.id_terminal = rt_d.id_terminal
-
-            WHERE v.id_chofer = %s
-              AND v.fecha_llegada < NOW()
-              AND v.estado <> 'Cancelado'
-            ORDER BY v.fecha_salida DESC
-            LIMIT 10;
-        """, (id_chofer,))
+@app.route('/api/admin/usuarios/<int:id_usuario>', methods=['GET'])
+@login_required
+@admin_required
+def api_admin_usuario(id_usuario):
+    """Datos completos de un usuario (Empleado/Chofer) para el modal de edición."""
+    usuario = ModelUser.get_user_detail(db, id_usuario)
+    if usuario is None:
+        return jsonify({'error': 'Usuario no encontrado'}), 404
 
-        rows_hist = cursor.fetchall()
+    for campo in ('fecha_ingreso', 'licencia_expira'):
+        if usuario[campo] is not None:
+            usuario[campo] = usuario[campo].isoformat()
+    return jsonify(usuario)
 
-        historial_viajes = [
-            {
-                'fecha':   r['fecha'],
-                'origen':  r['origen'],
-                'destino': r['destino']
-            }
-            for r in rows_hist
-        ]
 
-        # 4) Viajes completados hoy
-        cursor.execute("""
-            SELECT COUNT(*) AS total
-            FROM Viaje
-            WHERE id_chofer = %s
-              AND DATE(fecha_llegada) = CURDATE()
-              AND fecha_llegada < NOW()
-              AND estado <> 'Cancelado';
-        """, (id_chofer,))
+@app.route('/api/admin/metricas', methods=['GET'])
+@login_required
+@admin_required
+def api_metricas():
+    """
+    Métricas internas en JSON (pool de conexiones, etc.).
+    Solo visible para Admin.
+    """
+    return jsonify({
+        'pool': db.pool.stats(),
+        'user_cache': ModelUser.user_cache.stats(),
+        'seat_inventory': seat_inventory.stats(),
+        'eventos_asientos': eventos_asientos.stats(),
+        'pasajeros': indice_pasajeros.stats(),
+        'tarifas': ModelTarifa.indice.stats(),
+        'viaje_datos': ModelViaje.datos_cache.stats(),
+        'boletos_impresos': boletos_impresos.stats(),
+        'tableros_chofer': tableros_chofer.stats(),
+        'venta_latencia': latencia_venta.stats(),
+        'venta_group_commit': cola_ventas.stats() if cola_ventas else None,
+        'venta_detalle': escritor_detalle.stats() if escritor_detalle else None,
+        'purga_apartados': purga_apartados.stats()
+    })
+
+
+@app.route('/api/admin/tarifas/recargar', methods=['POST'])
+@login_required
+@admin_required
+def api_recargar_tarifas():
+    """
+    Recarga el índice de tarifas en memoria (usar después de modificar
+    Tarifa o ClaseServicio directamente en la base).
+    """
+    try:
+        ModelTarifa.indice.recargar(db)
+        return jsonify({'ok': True, 'tarifas': ModelTarifa.indice.stats()})
+    except Exception as e:
+        app.logger.error(f"Error recargando tarifas: {e}")
+        return jsonify({'error': 'No se pudo recargar el índice de tarifas'}), 500
 
-        row_cnt = cursor.fetchone()
-        viajes_completados_hoy = row_cnt['total'] if row_cnt else 0
 
-        cursor.close()
+# ========== RUTAS DEL CHOFER ==========
+@app.route('/chofer')
+@login_required
+def chofer():
+    if current_user.rol != 'Chofer':
+        flash('Acceso denegado. Esta sección es solo para choferes.', 'danger')
+        return redirect(url_for('home'))
 
-        # 5) Próximo viaje y pendientes (para las cards del template)
-        proximo = viajes_programados[0] if viajes_programados else None
-        viajes_pendientes_count = len([v for v in viajes_programados if v['estado'] == 'Pendiente'])
+    # 1) id_chofer del usuario logueado (viene en el principal de sesión)
+    id_chofer = current_user.id_chofer
+    if id_chofer is None:
+        flash('No se encontró un chofer asociado a este usuario.', 'danger')
+        return redirect(url_for('home'))
 
+    try:
+        tablero = _tablero_chofer(id_chofer)
     except Exception as ex:
         app.logger.error(f"Error en ruta /chofer: {ex}")
-        viajes_programados = []
-        historial_viajes = []
-        viajes_completados_hoy = 0
-        viajes_pendientes_count = 0
-        proximo = None
+        tablero = {
+            'viajes': [],
+            'historial': [],
+            'viajes_hoy': 0,
+        }
+
+    viajes_programados = tablero['viajes']
+
+    # 5) Próximo viaje y pendientes (para las cards del template)
+    proximo = viajes_programados[0] if viajes_programados else None
+    viajes_pendientes_count = len([v for v in viajes_programados if v['estado'] == 'Pendiente'])
 
     fecha_actual = datetime.now().strftime('%d/%m/%Y')
 
@@ -575,144 +637,353 @@ def chofer():
         'chofer/chofer.html',
         user=current_user,
         viajes=viajes_programados,
-        viajes_hoy=viajes_completados_hoy,
+        viajes_hoy=tablero['viajes_hoy'],
         viajes_pendientes=viajes_pendientes_count,
         proximo_viaje=proximo,
-        historial=historial_viajes,
+        historial=tablero['historial'],
         fecha_hoy=fecha_actual
     )
 
 
+def _consulta_en_contexto(consulta, *args):
+    # Corre en un hilo de `consultas_chofer`: su propio contexto = su propia conexión del pool
+    with app.app_context():
+        return consulta(db, *args)
+
+
+def _tablero_chofer(id_chofer):
+    """
+    Datos del panel del chofer, cacheados por chofer unos segundos
+    (CHOFER_TABLERO_CACHE_TTL). Las tres consultas son independientes y
+    corren a la vez, cada una con su conexión del pool.
+    """
+    tablero = tableros_chofer.get(id_chofer)
+    if tablero is not None:
+        return tablero
+
+    # 2) Viajes activos, 3) historial y 4) completados hoy
+    f_viajes = consultas_chofer.submit(_consulta_en_contexto, ModelChofer.viajes_activos, id_chofer)
+    f_historial = consultas_chofer.submit(_consulta_en_contexto, ModelChofer.historial, id_chofer)
+    f_hoy = consultas_chofer.submit(_consulta_en_contexto, ModelChofer.completados_hoy, id_chofer)
+
+    tablero = {
+        'viajes': f_viajes.result(),
+        'historial': f_historial.result(),
+        'viajes_hoy': f_hoy.result(),
+    }
+    tableros_chofer.set(id_chofer, tablero)
+    return tablero
+
+
 @app.route('/api/viajes/<int:id_viaje>/asientos', methods=['GET'])
 @login_required
 def api_asientos_viaje(id_viaje):
     """
     Devuelve en JSON los asientos disponibles para un viaje dado.
     Solo accesible para Admin y Empleado (taquilla).
+
+    ?formato=bits: respuesta compacta (capacidad + máscaras en base64 de
+    vendidos y de apartados por otras taquillas, ver SeatInventory.bitset)
+    con ETag; un sondeo con If-None-Match recibe 304 mientras no cambien
+    ni la ocupación ni los apartados, sin consultar Boleto.
     """
     if current_user.rol not in ('Admin', 'Empleado'):
         # 403 semántico, pero devolvemos JSON sencillo
         return jsonify({'error': 'No autorizado'}), 403
 
-    try:
-        cursor = db.connection.cursor(MySQLdb.cursors.DictCursor)
+    if request.args.get('formato') == 'bits':
+        return _asientos_compacto(id_viaje)
 
-        # 1) Obtener capacidad del autobús para ese viaje
-        sql_cap = """
-            SELECT a.capacidad
-            FROM Viaje v
-            JOIN Autobus a ON a.id_autobus = v.id_autobus
-            WHERE v.id_viaje = %s
-            LIMIT 1;
-        """
-        cursor.execute(sql_cap, (id_viaje,))
-        row_cap = cursor.fetchone()
+    try:
+        # Inventario en memoria (bitmap por viaje); consulta MySQL solo
+        # la primera vez o cuando el estado del viaje está en duda.
+        disp = seat_inventory.disponibilidad(db, id_viaje)
 
-        if not row_cap:
-            cursor.close()
+        if disp is None:
             return jsonify({'error': 'Viaje no encontrado'}), 404
 
-        capacidad = row_cap['capacidad']
+        # Apartados vigentes: los de otras taquillas no se ofrecen como libres
+        apartados = ModelRetencion.apartados(db, id_viaje)
+        de_otros = sorted(n for n, u in apartados.items() if u != current_user.id_usuario)
+        mios = sorted(n for n, u in apartados.items() if u == current_user.id_usuario)
+        bloqueados = set(de_otros)
 
-        # 2) Obtener asientos ya ocupados (Reservado, Pagado, Abordado)
-        sql_ocupados = """
-            SELECT numero_asiento
-            FROM Boleto
-            WHERE id_viaje = %s
-              AND estado IN ('Reservado','Pagado','Abordado');
-        """
-        cursor.execute(sql_ocupados, (id_viaje,))
-        rows_oc = cursor.fetchall()
-        cursor.close()
+        return jsonify({
+            'id_viaje': id_viaje,
+            'capacidad': disp['capacidad'],
+            'ocupados': disp['ocupados'],
+            'asientos_libres': [n for n in disp['asientos_libres'] if n not in bloqueados],
+            'apartados': de_otros,
+            'mis_apartados': mios
+        })
 
-        ocupados = {r['numero_asiento'] for r in rows_oc}
+    except Exception as e:
+        app.logger.error(f"Error en /api/viajes/{id_viaje}/asientos: {e}")
+        return jsonify({'error': 'Error interno al calcular asientos'}), 500
 
-        # 3) Construir lista de asientos libres
-        asientos_libres = [n for n in range(1, capacidad + 1) if n not in ocupados]
 
-        return jsonify({
+def _asientos_compacto(id_viaje):
+    try:
+        compacto = seat_inventory.compacto(db, id_viaje)
+        if compacto is None:
+            return jsonify({'error': 'Viaje no encontrado'}), 404
+        capacidad, ocupados, version = compacto
+
+        # Apartados vigentes de otras taquillas (Asiento_Retencion, por
+        # llave primaria): cuentan como no disponibles, igual que en el
+        # formato de listas, y entran al ETag porque cambian sin venta
+        # (apartar, soltar, vencer)
+        apartados = 0
+        for n, u in ModelRetencion.apartados(db, id_viaje).items():
+            if u != current_user.id_usuario and 1 <= n <= capacidad:
+                apartados |= 1 << n
+        apartados &= ~ocupados
+    except Exception as e:
+        app.logger.error(f"Error en /api/viajes/{id_viaje}/asientos?formato=bits: {e}")
+        return jsonify({'error': 'Error interno al calcular asientos'}), 500
+
+    apartados_bits = SeatInventory.bitset(apartados, capacidad)
+    etag = f"{version}-{zlib.crc32(apartados_bits.encode('ascii')):08x}"
+
+    if request.if_none_match.contains(etag):
+        resp = app.response_class(status=304)
+    else:
+        resp = jsonify({
             'id_viaje': id_viaje,
             'capacidad': capacidad,
-            'ocupados': sorted(list(ocupados)),
-            'asientos_libres': asientos_libres
+            'ocupados_bits': SeatInventory.bitset(ocupados, capacidad),
+            'apartados_bits': apartados_bits
+        })
+    resp.set_etag(etag)
+    # El navegador guarda la respuesta pero revalida en cada sondeo; los
+    # apartados "de otros" dependen de la sesión
+    resp.headers['Cache-Control'] = 'private, no-cache'
+    resp.vary.add('Cookie')
+    return resp
+
+
+MAX_VIAJES_EVENTOS = 20
+
+
+@app.route('/api/viajes/eventos', methods=['GET'])
+@login_required
+def api_eventos_asientos():
+    """
+    Server-Sent Events con los cambios de asientos de los viajes pedidos:
+      GET /api/viajes/eventos?viajes=1,2
+    Eventos 'vendido', 'liberado' y 'apartado' ({id_viaje, asiento, ...})
+    y 'resync' (volver a pedir /api/viajes/<id>/asientos). El stream no
+    usa conexión a MySQL; ver Services/SeatEvents.py.
+    """
+    if current_user.rol not in ('Admin', 'Empleado'):
+        return jsonify({'error': 'No autorizado'}), 403
+
+    try:
+        viajes = list(dict.fromkeys(
+            int(x) for x in request.args.get('viajes', '').split(',') if x.strip()
+        ))
+    except ValueError:
+        return jsonify({'error': 'Lista de viajes inválida'}), 400
+    if not viajes or len(viajes) > MAX_VIAJES_EVENTOS:
+        return jsonify({'error': f'Indique de 1 a {MAX_VIAJES_EVENTOS} viajes'}), 400
+
+    suscriptor = eventos_asientos.suscribir(viajes, request.headers.get('Last-Event-ID'))
+    if suscriptor is None:
+        # EventSource no reintenta tras un error HTTP: la página lo vuelve a
+        # abrir con espera creciente; mientras, funciona sin vivo
+        return jsonify({'error': 'Demasiadas conexiones en vivo, intente más tarde'}), 503
+
+    latido = app.config['SEAT_EVENTS_LATIDO']
+
+    def stream():
+        try:
+            yield 'retry: 5000\n\n'
+            while True:
+                eventos = eventos_asientos.esperar(suscriptor, latido)
+                if not eventos:
+                    # Latido: mantiene viva la conexión y detecta clientes idos
+                    yield ': ping\n\n'
+                    continue
+                for n, tipo, datos in eventos:
+                    yield (f"id: {eventos_asientos.id_evento(n)}\n"
+                           f"event: {tipo}\n"
+                           f"data: {json.dumps(datos)}\n\n")
+        finally:
+            eventos_asientos.cancelar(suscriptor)
+
+    return Response(stream(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+
+MAX_VIAJES_DISPONIBILIDAD = 200
+
+
+@app.route('/api/viajes/asientos', methods=['GET'])
+@login_required
+def api_asientos_viajes():
+    """
+    Disponibilidad de varios viajes en una sola llamada (conteos por viaje):
+      GET /api/viajes/asientos?viajes=1,2,3
+      GET /api/viajes/asientos            -> los viajes que se venden hoy
+    `libres` ya descuenta los asientos apartados por otras taquillas.
+    """
+    if current_user.rol not in ('Admin', 'Empleado'):
+        return jsonify({'error': 'No autorizado'}), 403
+
+    try:
+        ids = [int(x) for x in request.args.get('viajes', '').split(',') if x.strip()]
+    except ValueError:
+        return jsonify({'error': 'Lista de viajes inválida'}), 400
+    if len(ids) > MAX_VIAJES_DISPONIBILIDAD:
+        return jsonify({'error': f'Máximo {MAX_VIAJES_DISPONIBILIDAD} viajes por consulta'}), 400
+
+    try:
+        if not ids:
+            ids = ModelViaje.vendibles_hoy(db)[:MAX_VIAJES_DISPONIBILIDAD]
+
+        # Bitmaps del inventario en memoria (los que falten, en una sola
+        # consulta) y los apartados de todos los viajes en otra
+        estados = seat_inventory.estados(db, ids)
+        apartados = ModelRetencion.apartados_varios(db, list(estados))
+
+        viajes = {}
+        for id_viaje, (capacidad, bits) in estados.items():
+            ocupados = sum(1 for n in range(1, capacidad + 1) if bits >> n & 1)
+            de_otros = sum(
+                1 for n, u in apartados[id_viaje].items()
+                if u != current_user.id_usuario and 1 <= n <= capacidad and not bits >> n & 1
+            )
+            viajes[id_viaje] = {
+                'capacidad': capacidad,
+                'ocupados': ocupados,
+                'apartados': de_otros,
+                'libres': capacidad - ocupados - de_otros
+            }
+
+        return jsonify({
+            'viajes': viajes,
+            'no_encontrados': [i for i in ids if i not in estados]
         })
 
     except Exception as e:
-        app.logger.error(f"Error en /api/viajes/{id_viaje}/asientos: {e}")
+        app.logger.error(f"Error en /api/viajes/asientos: {e}")
         return jsonify({'error': 'Error interno al calcular asientos'}), 500
 
 
-@app.route('/ventas/confirmacion/<int:id_boleto>')
+@app.route('/api/viajes/<int:id_viaje>/asientos/<int:numero_asiento>/apartar', methods=['POST', 'DELETE'])
 @login_required
-def confirmacion_venta(id_boleto):
+def api_apartar_asiento(id_viaje, numero_asiento):
     """
-    Muestra la información detallada de un boleto recién comprado.
+    POST: aparta el asiento para el usuario actual por RETENCION_MINUTOS
+          (renueva si ya era suyo). 409 si está vendido o lo tiene otro.
+    DELETE: suelta el apartado del usuario actual.
+    Requiere X-CSRFToken.
     """
     if current_user.rol not in ('Admin', 'Empleado'):
-        flash('No tienes permiso para ver esta venta.', 'danger')
-        return redirect(url_for('home'))
+        return jsonify({'error': 'No autorizado'}), 403
 
     try:
-        cursor = db.connection.cursor(MySQLdb.cursors.DictCursor)
+        if request.method == 'DELETE':
+            liberado = ModelRetencion.liberar(db, id_viaje, numero_asiento, current_user.id_usuario)
+            if liberado:
+                eventos_asientos.publicar(id_viaje, 'liberado', asiento=numero_asiento)
+            return jsonify({'id_viaje': id_viaje, 'numero_asiento': numero_asiento, 'liberado': liberado})
 
-        sql = """
-        SELECT
-            b.id_boleto,
-            b.numero_asiento,
-            b.precio_total,
-            DATE_FORMAT(b.creado_en, '%%Y-%%m-%%d %%H:%%i') AS fecha_emision,
+        if not seat_inventory.esta_libre(db, id_viaje, numero_asiento):
+            return jsonify({'error': 'El asiento no existe o ya fue vendido'}), 409
 
-            p.nombre AS pasajero_nombre,
-            p.correo AS pasajero_correo,
-            p.telefono AS pasajero_telefono,
+        try:
+            _publicar_liberados(ModelRetencion.purgar_si_toca(db))
+        except Exception as e:
+            # La purga es mantenimiento; no debe impedir apartar
+            app.logger.warning(f"No se pudieron purgar apartados vencidos: {e}")
 
-            v.id_viaje,
-            DATE_FORMAT(v.fecha_salida, '%%Y-%%m-%%d %%H:%%i') AS salida,
-            DATE_FORMAT(v.fecha_llegada, '%%Y-%%m-%%d %%H:%%i') AS llegada,
+        ok, expira_en = ModelRetencion.apartar(db, id_viaje, numero_asiento, current_user.id_usuario)
+        if not ok:
+            return jsonify({'error': 'El asiento está apartado por otra taquilla',
+                            'expira_en': expira_en.isoformat()}), 409
+        eventos_asientos.publicar(id_viaje, 'apartado', asiento=numero_asiento,
+                                  id_usuario=current_user.id_usuario,
+                                  expira_en=expira_en.isoformat())
 
-            oc.nombre AS origen_ciudad,
-            ot.nombre AS origen_terminal,
+        return jsonify({
+            'id_viaje': id_viaje,
+            'numero_asiento': numero_asiento,
+            'expira_en': expira_en.isoformat(),
+            'minutos': ModelRetencion.minutos
+        })
 
-            dc.nombre AS destino_ciudad,
-            dt.nombre AS destino_terminal,
+    except Exception as e:
+        app.logger.error(f"Error en /api/viajes/{id_viaje}/asientos/{numero_asiento}/apartar: {e}")
+        return jsonify({'error': 'Error interno al apartar el asiento'}), 500
 
-            a.numero_placa,
-            a.numero_fisico,
-            CONCAT_WS(' ', a.numero_placa, a.numero_fisico) AS autobus_identificador,
-            cs.nombre AS clase_nombre
 
-        FROM Boleto b
-        JOIN Pasajero p ON p.id_pasajero = b.id_pasajero
-        JOIN Viaje v ON v.id_viaje = b.id_viaje
-        JOIN Autobus a ON a.id_autobus = v.id_autobus
-        LEFT JOIN ClaseServicio cs ON cs.id_clase = a.id_clase
+MAX_VIAJES_COTIZACION = 200
 
-        JOIN Viaje_Escala ve_o
-               ON ve_o.id_viaje = v.id_viaje
-              AND ve_o.orden_parada = (
-                  SELECT MIN(orden_parada)
-                  FROM Viaje_Escala
-                  WHERE id_viaje = v.id_viaje
-              )
-        JOIN Terminal ot ON ot.id_terminal = ve_o.id_terminal
-        JOIN Ciudad oc ON oc.id_ciudad = ot.id_ciudad
-
-        JOIN Viaje_Escala ve_d
-               ON ve_d.id_viaje = v.id_viaje
-              AND ve_d.orden_parada = (
-                  SELECT MAX(orden_parada)
-                  FROM Viaje_Escala
-                  WHERE id_viaje = v.id_viaje
-              )
-        JOIN Terminal dt ON dt.id_terminal = ve_d.id_terminal
-        JOIN Ciudad dc ON dc.id_ciudad = dt.id_ciudad
-
-        WHERE b.id_boleto = %s;
-        """
 
-        cursor.execute(sql, (id_boleto,))
-        boleto = cursor.fetchone()
-        cursor.close()
+@app.route('/api/tarifas/cotizar', methods=['GET', 'POST'])
+@login_required
+def api_cotizar_tarifas():
+    """
+    Cotiza varios viajes en una sola llamada.
+      GET  /api/tarifas/cotizar?viajes=1,2,3
+      POST /api/tarifas/cotizar  {"viajes": [1, 2, 3]}  (con X-CSRFToken)
+    """
+    if current_user.rol not in ('Admin', 'Empleado'):
+        return jsonify({'error': 'No autorizado'}), 403
+
+    try:
+        if request.method == 'POST':
+            payload = request.get_json(silent=True) or {}
+            ids = payload.get('viajes') or []
+        else:
+            ids = [x for x in request.args.get('viajes', '').split(',') if x.strip()]
+        ids = [int(x) for x in ids]
+    except (TypeError, ValueError):
+        return jsonify({'error': 'Lista de viajes inválida'}), 400
+
+    if not ids:
+        return jsonify({'error': 'Debe indicar al menos un viaje'}), 400
+    if len(ids) > MAX_VIAJES_COTIZACION:
+        return jsonify({'error': f'Máximo {MAX_VIAJES_COTIZACION} viajes por cotización'}), 400
+
+    try:
+        cotizaciones = ModelTarifa.cotizar_viajes(db, ids)
+
+        precios = {}
+        sin_tarifa = []
+        for id_viaje, (id_tarifa, precio) in cotizaciones.items():
+            if id_tarifa is None:
+                sin_tarifa.append(id_viaje)
+            else:
+                precios[str(id_viaje)] = {'id_tarifa': id_tarifa, 'precio': float(precio)}
+
+        return jsonify({
+            'precios': precios,
+            'sin_tarifa': sorted(sin_tarifa),
+            'no_encontrados': sorted(set(ids) - set(cotizaciones))
+        })
+
+    except Exception as e:
+        app.logger.error(f"Error en /api/tarifas/cotizar: {e}")
+        return jsonify({'error': 'Error interno al cotizar'}), 500
+
+
+@app.route('/ventas/confirmacion/<int:id_boleto>')
+@login_required
+def confirmacion_venta(id_boleto):
+    """
+    Muestra la información detallada de un boleto recién comprado
+    (desde su Venta_Detalle; ver ModelVentaDetalle.boleto).
+    """
+    if current_user.rol not in ('Admin', 'Empleado'):
+        flash('No tienes permiso para ver esta venta.', 'danger')
+        return redirect(url_for('home'))
+
+    try:
+        boleto = ModelVentaDetalle.boleto(db, id_boleto)
 
         if not boleto:
             flash("El boleto solicitado no existe.", "danger")
@@ -731,6 +1002,161 @@ def confirmacion_venta(id_boleto):
         return redirect(url_for('home'))
 
 
+@app.route('/ventas/boleto/<int:id_boleto>/imprimir')
+@login_required
+def imprimir_boleto(id_boleto):
+    """
+    Boleto imprimible (reimpresión). El HTML no depende del usuario, así que
+    se guarda ya renderizado por id_boleto mientras salga del snapshot.
+    """
+    if current_user.rol not in ('Admin', 'Empleado'):
+        flash('No tienes permiso para ver esta venta.', 'danger')
+        return redirect(url_for('home'))
+
+    html = boletos_impresos.get(id_boleto)
+    if html is not None:
+        return html
+
+    try:
+        boleto = ModelVentaDetalle.boleto(db, id_boleto)
+    except Exception as e:
+        print("ERROR imprimir_boleto:", e)
+        flash("No se pudo cargar la información del boleto.", "danger")
+        return redirect(url_for('home'))
+
+    if not boleto:
+        flash("El boleto solicitado no existe.", "danger")
+        return redirect(url_for('home'))
+
+    html = render_template("boleto_impresion.html", boleto=boleto)
+    # El join en vivo no se guarda: en cuanto exista el snapshot se usa ese
+    if boleto['snapshot']:
+        boletos_impresos.set(id_boleto, html)
+    return html
+
+
+def _viajes_para_venta():
+    """
+    Viajes programados que salen hoy (desde ahora), con etiqueta y precio
+    cotizado, para los selects de taquilla.
+    """
+    cursor = db.connection.cursor(MySQLdb.cursors.DictCursor)
+
+    sql = """
+        SELECT 
+            v.id_viaje,
+            DATE_FORMAT(v.fecha_salida, '%d/%m/%Y %H:%i') AS salida_label,
+
+            -- ORIGEN (primera parada)
+            oc.nombre AS origen,
+
+            -- DESTINO (última parada)
+            dc.nombre AS destino,
+
+            -- Autobús y clase
+            CONCAT_WS(' ', a.numero_placa, a.numero_fisico) AS autobus,
+            cs.nombre AS clase_nombre,
+
+            -- Para cotizar con el índice de tarifas
+            v.id_ruta,
+            a.id_clase,
+            v.fecha_salida
+
+        FROM Viaje v
+        JOIN Ruta   r  ON r.id_ruta    = v.id_ruta
+        JOIN Autobus a ON a.id_autobus = v.id_autobus
+        LEFT JOIN ClaseServicio cs ON cs.id_clase = a.id_clase
+
+        -- Origen/destino desnormalizados (Viaje_Resumen, mantenido por triggers)
+        JOIN Viaje_Resumen vr ON vr.id_viaje = v.id_viaje
+        JOIN Terminal ot ON ot.id_terminal = vr.id_terminal_origen
+        JOIN Ciudad  oc  ON oc.id_ciudad   = vr.id_ciudad_origen
+        JOIN Terminal dt ON dt.id_terminal = vr.id_terminal_destino
+        JOIN Ciudad  dc  ON dc.id_ciudad   = vr.id_ciudad_destino
+
+        WHERE v.fecha_salida >= NOW()
+          AND v.fecha_salida <  CURDATE() + INTERVAL 1 DAY
+          AND v.estado = 'Programado'
+        ORDER BY v.fecha_salida ASC;
+    """
+
+    cursor.execute(sql)
+    rows = cursor.fetchall()
+    cursor.close()
+
+    # Precios de todos los viajes en una pasada (sin consultas extra)
+    precios = ModelTarifa.cotizar_filas(db, rows)
+
+    viajes = []
+    for row, (_, precio) in zip(rows, precios):
+        viajes.append({
+            'id_viaje': row['id_viaje'],
+            'salida_label': row['salida_label'],
+            'origen': row['origen'],
+            'destino': row['destino'],
+            'autobus': row['autobus'],
+            'clase_nombre': row.get('clase_nombre'),
+            'precio': precio
+        })
+    return viajes
+
+
+def _precio_viaje(id_viaje):
+    """
+    (id_tarifa, precio: Decimal) de un boleto del viaje, o None si el viaje
+    no existe. Ruta/clase/fecha salen de caché y la tarifa del índice en
+    memoria; sin tarifa capturada se usa el precio provisional.
+    """
+    datos_viaje = ModelViaje.datos_tarifa(db, id_viaje)
+    if not datos_viaje:
+        return None
+
+    id_tarifa, precio_total = ModelTarifa.cotizar(
+        db, datos_viaje['id_ruta'], datos_viaje['id_clase'], datos_viaje['fecha_salida']
+    )
+    if id_tarifa is None:
+        # Ruta sin tarifa capturada: se conserva el precio provisional
+        precio_total = (Decimal('600.00') * Decimal('1.05')).quantize(Decimal('0.01'))
+    return id_tarifa, precio_total
+
+
+ASIENTO_AUTOMATICO = 'auto'
+
+_CLAVE_RE = re.compile(r'^[A-Za-z0-9_-]{16,64}$')
+
+
+def _clave_idempotencia():
+    """
+    Llave de idempotencia de la petición: campo oculto del formulario o
+    cabecera Idempotency-Key (clientes JSON). None si no viene o no es válida.
+    """
+    clave = (request.form.get('clave_idempotencia')
+             or request.headers.get('Idempotency-Key', '')).strip()
+    return clave if _CLAVE_RE.match(clave) else None
+
+
+def _despues_de_venta(id_viaje, vendidos, inicio):
+    """
+    Efectos en memoria de una venta ya confirmada (COMMIT hecho): latencia,
+    inventario de asientos (y sus eventos) e índice de pasajeros.
+    `vendidos`: [(numero_asiento, id_pasajero, nombre, correo, telefono)].
+
+    Un error aquí solo se registra: la venta existe y el usuario debe ver
+    su confirmación, no un formulario nuevo con otra llave de idempotencia.
+    """
+    try:
+        latencia_venta.registrar(time.perf_counter() - inicio)
+        for numero_asiento, id_pasajero, nombre, correo, telefono in vendidos:
+            seat_inventory.marcar_ocupado(id_viaje, numero_asiento)
+            indice_pasajeros.agregar(id_pasajero, nombre, correo, telefono)
+    except Exception as e:
+        app.logger.error(f"Error actualizando cachés tras la venta del viaje {id_viaje}: {e}")
+        try:
+            seat_inventory.invalidar(id_viaje)
+        except Exception:
+            pass
+
+
 @app.route('/ventas/nueva', methods=['GET', 'POST'])
 @login_required
 def nueva_venta():
@@ -742,71 +1168,7 @@ def nueva_venta():
     # ================== GET: mostrar formulario ==================
     if request.method == 'GET':
         try:
-            cursor = db.connection.cursor(MySQLdb.cursors.DictCursor)
-
-            sql = """
-                SELECT 
-                    v.id_viaje,
-                    DATE_FORMAT(v.fecha_salida, '%d/%m/%Y %H:%i') AS salida_label,
-
-                    -- ORIGEN (primera parada)
-                    oc.nombre AS origen,
-
-                    -- DESTINO (última parada)
-                    dc.nombre AS destino,
-
-                    -- Autobús y clase
-                    CONCAT_WS(' ', a.numero_placa, a.numero_fisico) AS autobus,
-                    cs.nombre AS clase_nombre
-
-                FROM Viaje v
-                JOIN Ruta   r  ON r.id_ruta    = v.id_ruta
-                JOIN Autobus a ON a.id_autobus = v.id_autobus
-                LEFT JOIN ClaseServicio cs ON cs.id_clase = a.id_clase
-
-                -- ORIGEN: menor orden_parada
-                JOIN Viaje_Escala ve_o
-                       ON ve_o.id_viaje = v.id_viaje
-                      AND ve_o.orden_parada = (
-                          SELECT MIN(orden_parada)
-                          FROM Viaje_Escala
-                          WHERE id_viaje = v.id_viaje
-                      )
-                JOIN Terminal ot ON ot.id_terminal = ve_o.id_terminal
-                JOIN Ciudad  oc  ON oc.id_ciudad   = ot.id_ciudad
-
-                -- DESTINO: mayor orden_parada
-                JOIN Viaje_Escala ve_d
-                       ON ve_d.id_viaje = v.id_viaje
-                      AND ve_d.orden_parada = (
-                          SELECT MAX(orden_parada)
-                          FROM Viaje_Escala
-                          WHERE id_viaje = v.id_viaje
-                      )
-                JOIN Terminal dt ON dt.id_terminal = ve_d.id_terminal
-                JOIN Ciudad  dc  ON dc.id_ciudad   = dt.id_ciudad
-
-                WHERE DATE(v.fecha_salida) = CURDATE()
-                  AND v.fecha_salida >= NOW()   
-                  AND v.estado = 'Programado' 
-                ORDER BY v.fecha_salida ASC;
-            """
-
-            cursor.execute(sql)
-            rows = cursor.fetchall()
-            cursor.close()
-
-            viajes = []
-            for row in rows:
-                viajes.append({
-                    'id_viaje': row['id_viaje'],
-                    'salida_label': row['salida_label'],
-                    'origen': row['origen'],
-                    'destino': row['destino'],
-                    'autobus': row['autobus'],
-                    'clase_nombre': row.get('clase_nombre')
-                })
-
+            viajes = _viajes_para_venta()
         except Exception as e:
             app.logger.error(f"Error cargando /ventas/nueva (GET): {e}")
             flash('Ocurrió un error al cargar los viajes disponibles.', 'danger')
@@ -817,10 +1179,12 @@ def nueva_venta():
             'nueva_venta.html',
             user=current_user,
             fecha_hoy=fecha_hoy,
-            viajes=viajes
+            viajes=viajes,
+            clave_idempotencia=uuid.uuid4().hex
         )
 
     # ================== POST: registrar venta ==================
+    id_viaje = None
     try:
         # 1) Datos del formulario
         nombre_pasajero = request.form.get('nombre_pasajero', '').strip()
@@ -835,32 +1199,23 @@ def nueva_venta():
             return redirect(url_for('nueva_venta'))
 
         id_viaje = int(id_viaje)
-        numero_asiento = int(numero_asiento)
-
-        # 2) Validar viaje
-        cursor = db.connection.cursor(MySQLdb.cursors.DictCursor)
-        cursor.execute("""
-            SELECT fecha_salida, estado
-            FROM Viaje
-            WHERE id_viaje = %s
-        """, (id_viaje,))
-        v_row = cursor.fetchone()
+        # 'auto' = cualquier asiento libre (opcionalmente ventana/pasillo)
+        posicion = None
+        if numero_asiento == ASIENTO_AUTOMATICO:
+            numero_asiento = None
+            posicion = request.form.get('posicion') or None
+            if posicion not in (None, 'Ventana', 'Pasillo'):
+                posicion = None
+        else:
+            numero_asiento = int(numero_asiento)
 
-        if not v_row:
-            cursor.close()
+        # 2) Precio según la tarifa vigente. Estado y hora de salida los valida
+        #    sp_registrar_venta contra NOW() del servidor.
+        cotizacion = _precio_viaje(id_viaje)
+        if cotizacion is None:
             flash('El viaje seleccionado ya no existe.', 'danger')
             return redirect(url_for('nueva_venta'))
-
-        fecha_salida = v_row['fecha_salida']
-        estado_viaje = v_row['estado']
-
-        cursor.execute("SELECT NOW() AS ahora")
-        ahora = cursor.fetchone()['ahora']
-
-        if estado_viaje == 'Cancelado' or fecha_salida <= ahora:
-            cursor.close()
-            flash('No es posible registrar la venta: el viaje ya salió o fue cancelado.', 'danger')
-            return redirect(url_for('nueva_venta'))
+        id_tarifa, precio_total = cotizacion
 
         # 3) Simulación de pago (solo log)
         if metodo_pago == 'Tarjeta':
@@ -869,7 +1224,7 @@ def nueva_venta():
             tarjeta_expira = request.form.get('tarjeta_expira', '')
 
             pago_payload = {
-                "monto": 0,
+                "monto": float(precio_total),
                 "pasajero": nombre_pasajero,
                 "asiento": numero_asiento,
                 "id_viaje": id_viaje,
@@ -882,66 +1237,224 @@ def nueva_venta():
             print("=== PAGO TARJETA (SIMULACIÓN) ===")
             print(pago_payload)
 
-        # 4) Pasajero
-        id_pasajero = None
-        if correo_pasajero:
-            cursor.execute("""
-                SELECT id_pasajero FROM Pasajero WHERE correo = %s LIMIT 1
-            """, (correo_pasajero,))
-            row = cursor.fetchone()
-            if row:
-                id_pasajero = row['id_pasajero']
-
-        if not id_pasajero:
-            cursor.execute("""
-                INSERT INTO Pasajero (nombre, correo, telefono)
-                VALUES (%s, %s, %s)
-            """, (nombre_pasajero, correo_pasajero, telefono_pasajero))
-            id_pasajero = cursor.lastrowid
-
-        # 5) Precio (temporal)
-        precio_base = 600.00
-        impuesto = round(precio_base * 0.05, 2)
-        precio_total = precio_base + impuesto
-
-        if metodo_pago == 'Tarjeta':
-            pago_payload["monto"] = float(precio_total)
-            print(pago_payload)
+        # 4) Pasajero + boleto + venta + COMMIT en un solo CALL, o encolada
+        #    al group commit si está activo (mismo resultado/excepciones)
+        datos_venta = {
+            'id_viaje': id_viaje,
+            'numero_asiento': numero_asiento,
+            'nombre': nombre_pasajero,
+            'correo': correo_pasajero,
+            'telefono': telefono_pasajero,
+            'metodo_pago': metodo_pago,
+            'id_usuario': current_user.id_usuario,
+            'id_empleado': current_user.id_empleado,
+            'id_tarifa': id_tarifa,
+            'precio_total': precio_total,
+            'nota': 'Venta registrada desde módulo de taquilla',
+            'posicion': posicion,
+            'clave': _clave_idempotencia(),
+        }
+        inicio = time.perf_counter()
+        if cola_ventas is not None:
+            venta = cola_ventas.enviar(datos_venta, timeout=app.config['VENTA_GROUP_COMMIT_TIMEOUT'])
+        else:
+            venta = ModelVenta.registrar(db, **datos_venta)
 
-        # 6) Insertar boleto
-        cursor.execute("""
-            INSERT INTO Boleto (id_viaje, id_pasajero, numero_asiento, estado, precio_total)
-            VALUES (%s, %s, %s, 'Pagado', %s)
-        """, (id_viaje, id_pasajero, numero_asiento, precio_total))
-        id_boleto = cursor.lastrowid
+        _despues_de_venta(id_viaje, [(venta['numero_asiento'], venta['id_pasajero'],
+                                      nombre_pasajero, correo_pasajero, telefono_pasajero)], inicio)
 
-        # 7) Empleado
-        cursor.execute("""
-            SELECT id_empleado FROM Usuario WHERE id_usuario = %s
-        """, (current_user.id_usuario,))
-        row_emp = cursor.fetchone()
-        id_empleado = row_emp['id_empleado'] if row_emp else None
+        flash('Venta registrada correctamente.', 'success')
+        return redirect(url_for('confirmacion_venta', id_boleto=venta['id_boleto']))
 
-        # 8) Venta
-        cursor.execute("""
-            INSERT INTO Venta (id_boleto, id_empleado, id_cliente, metodo_pago, monto, nota)
-            VALUES (%s, %s, NULL, %s, %s, %s)
-        """, (id_boleto, id_empleado, metodo_pago, precio_total,
-              'Venta registrada desde módulo de taquilla'))
+    except VentaRepetida as e:
+        # Reenvío del mismo formulario: se muestra la venta original
+        flash('Esta venta ya estaba registrada.', 'info')
+        return redirect(url_for('confirmacion_venta', id_boleto=e.id_boleto))
 
-        db.connection.commit()
-        cursor.close()
+    except EnvioVencido:
+        # La cola no tomó la venta a tiempo y se retiró: no se registró
+        flash('La taquilla está saturada y la venta no se registró. Intente de nuevo.', 'warning')
+        return redirect(url_for('nueva_venta'))
 
-        flash('Venta registrada correctamente.', 'success')
-        return redirect(url_for('confirmacion_venta', id_boleto=id_boleto))
+    except VentaError as e:
+        # Rechazo de negocio (viaje salió/cancelado, asiento inválido u ocupado)
+        if isinstance(id_viaje, int):
+            seat_inventory.invalidar(id_viaje)
+            ModelViaje.invalidar_datos(id_viaje)
+        flash(str(e), 'danger')
+        return redirect(url_for('nueva_venta'))
 
     except Exception as e:
         db.connection.rollback()
+        if isinstance(id_viaje, int):
+            seat_inventory.invalidar(id_viaje)
         app.logger.error(f"Error registrando venta /ventas/nueva (POST): {e}")
         flash('Ocurrió un error al registrar la venta. Intente de nuevo.', 'danger')
         return redirect(url_for('nueva_venta'))
 
 
+@app.route('/api/pasajeros/buscar', methods=['GET'])
+@login_required
+def api_buscar_pasajeros():
+    """
+    Autocompletado de pasajeros para taquilla (índice en memoria):
+      GET /api/pasajeros/buscar?q=ana lo      -> nombre por prefijo de palabras
+      GET /api/pasajeros/buscar?q=ana@        -> correo por prefijo
+      GET /api/pasajeros/buscar?q=4567        -> teléfono por terminación
+    """
+    if current_user.rol not in ('Admin', 'Empleado'):
+        return jsonify({'error': 'No autorizado'}), 403
+
+    q = request.args.get('q', '').strip()[:120]
+    if len(q) < 2:
+        return jsonify({'pasajeros': []})
+    try:
+        limite = min(max(int(request.args.get('limite', 10)), 1), 25)
+    except ValueError:
+        return jsonify({'error': 'limite debe ser un entero'}), 400
+
+    try:
+        pasajeros = indice_pasajeros.buscar(db, q, limite)
+    except Exception as e:
+        app.logger.error(f"Error en /api/pasajeros/buscar: {e}")
+        return jsonify({'error': 'Error interno al buscar pasajeros'}), 500
+
+    return jsonify({'pasajeros': pasajeros})
+
+
+MAX_PASAJEROS_GRUPO = 40
+
+
+@app.route('/ventas/grupo', methods=['GET', 'POST'])
+@login_required
+def venta_grupo():
+    """
+    Venta de grupo: varios pasajeros/asientos de un mismo viaje en una
+    sola transacción (todos los asientos o ninguno).
+    """
+    if current_user.rol not in ('Admin', 'Empleado'):
+        flash('Esta sección es solo para personal de taquilla o administradores.', 'danger')
+        return redirect(url_for('home'))
+
+    # ================== GET: mostrar formulario ==================
+    if request.method == 'GET':
+        try:
+            viajes = _viajes_para_venta()
+        except Exception as e:
+            app.logger.error(f"Error cargando /ventas/grupo (GET): {e}")
+            flash('Ocurrió un error al cargar los viajes disponibles.', 'danger')
+            viajes = []
+
+        return render_template(
+            'venta_grupo.html',
+            fecha_hoy=datetime.now().strftime("%d/%m/%Y"),
+            viajes=viajes,
+            max_pasajeros=MAX_PASAJEROS_GRUPO,
+            clave_idempotencia=uuid.uuid4().hex
+        )
+
+    # ================== POST: registrar venta de grupo ==================
+    id_viaje = None
+    try:
+        # 1) Datos del formulario (listas paralelas, una entrada por pasajero)
+        metodo_pago = request.form.get('metodo_pago', '')
+        id_viaje = request.form.get('id_viaje', '')
+        nombres = request.form.getlist('nombre_pasajero[]')
+        correos = request.form.getlist('correo_pasajero[]')
+        telefonos = request.form.getlist('telefono_pasajero[]')
+        asientos = request.form.getlist('numero_asiento[]')
+
+        if not id_viaje or not metodo_pago or not nombres:
+            flash('Faltan datos obligatorios para registrar la venta.', 'danger')
+            return redirect(url_for('venta_grupo'))
+
+        if not (len(nombres) == len(correos) == len(telefonos) == len(asientos)):
+            flash('Los datos de los pasajeros están incompletos.', 'danger')
+            return redirect(url_for('venta_grupo'))
+
+        if len(nombres) > MAX_PASAJEROS_GRUPO:
+            flash(f'Una venta de grupo admite a lo más {MAX_PASAJEROS_GRUPO} pasajeros.', 'danger')
+            return redirect(url_for('venta_grupo'))
+
+        id_viaje = int(id_viaje)
+        pasajeros = []
+        for nombre, correo, telefono, asiento in zip(nombres, correos, telefonos, asientos):
+            nombre = nombre.strip()
+            if not nombre or not asiento:
+                flash('Cada pasajero necesita nombre y asiento.', 'danger')
+                return redirect(url_for('venta_grupo'))
+            pasajeros.append({
+                'nombre': nombre,
+                'correo': correo.strip() or None,
+                'telefono': telefono.strip() or None,
+                'numero_asiento': int(asiento),
+            })
+
+        # 2) Capacidad y asientos contra el inventario en memoria (una vez)
+        estado_asientos = seat_inventory.estado(db, id_viaje)
+        if estado_asientos is None:
+            flash('El viaje seleccionado ya no existe.', 'danger')
+            return redirect(url_for('venta_grupo'))
+        capacidad, ocupados = estado_asientos
+
+        numeros = [p['numero_asiento'] for p in pasajeros]
+        if len(set(numeros)) != len(numeros):
+            flash('Hay asientos repetidos en el grupo.', 'danger')
+            return redirect(url_for('venta_grupo'))
+        fuera = [n for n in numeros if not 1 <= n <= capacidad]
+        if fuera:
+            flash(f'Asientos fuera de la capacidad del autobús ({capacidad}): '
+                  + ', '.join(map(str, fuera)) + '.', 'danger')
+            return redirect(url_for('venta_grupo'))
+        vendidos = [n for n in numeros if ocupados >> n & 1]
+        if vendidos:
+            flash('Asientos ya vendidos: ' + ', '.join(map(str, vendidos)) + '.', 'danger')
+            return redirect(url_for('venta_grupo'))
+
+        # 3) Precio (el mismo para todos los asientos del viaje)
+        cotizacion = _precio_viaje(id_viaje)
+        if cotizacion is None:
+            flash('El viaje seleccionado ya no existe.', 'danger')
+            return redirect(url_for('venta_grupo'))
+        id_tarifa, precio_total = cotizacion
+
+        # 4) Todo en una transacción
+        inicio = time.perf_counter()
+        boletos = ModelVenta.registrar_grupo(
+            db, id_viaje, pasajeros, metodo_pago, current_user.id_usuario,
+            id_tarifa, precio_total, 'Venta de grupo desde módulo de taquilla',
+            clave=_clave_idempotencia(), id_empleado=current_user.id_empleado
+        )
+
+        _despues_de_venta(id_viaje, [(b['numero_asiento'], b['id_pasajero'],
+                                      p['nombre'], p['correo'], p['telefono'])
+                                     for p, b in zip(pasajeros, boletos)], inicio)
+
+        folios = ', '.join(f"#{b['id_boleto']}" for b in boletos)
+        total = (precio_total * len(boletos)).quantize(Decimal('0.01'))
+        flash(f'Venta de grupo registrada: {len(boletos)} boletos ({folios}) por ${total} MXN.', 'success')
+        return redirect(url_for('confirmacion_venta', id_boleto=boletos[0]['id_boleto']))
+
+    except VentaRepetida as e:
+        flash('Esta venta de grupo ya estaba registrada.', 'info')
+        return redirect(url_for('confirmacion_venta', id_boleto=e.id_boleto))
+
+    except VentaError as e:
+        if isinstance(id_viaje, int):
+            seat_inventory.invalidar(id_viaje)
+            ModelViaje.invalidar_datos(id_viaje)
+        flash(str(e), 'danger')
+        return redirect(url_for('venta_grupo'))
+
+    except Exception as e:
+        db.connection.rollback()
+        if isinstance(id_viaje, int):
+            seat_inventory.invalidar(id_viaje)
+        app.logger.error(f"Error registrando venta /ventas/grupo (POST): {e}")
+        flash('Ocurrió un error al registrar la venta de grupo. No se vendió ningún asiento.', 'danger')
+        return redirect(url_for('venta_grupo'))
+
+
 @app.route('/admin/ventas_hoy')
 @login_required
 @admin_required
@@ -974,23 +1487,25 @@ def ventas_hoy():
         cursor = db.connection.cursor(MySQLdb.cursors.DictCursor)
 
         # 2) Ventas de la fecha seleccionada agrupadas por empleado
+        #    (Venta_Resumen_Dia: a lo más empleados x 3 métodos de pago por día)
         sql = """
             SELECT 
                 e.id_empleado,
                 e.nombre AS empleado_nombre,
 
-                COUNT(v.id_venta)                  AS num_ventas,
-                COALESCE(SUM(v.monto), 0)          AS total_ventas,
+                CAST(SUM(r.num_ventas) AS SIGNED)  AS num_ventas,
+                COALESCE(SUM(r.total), 0)          AS total_ventas,
 
                 -- Desglose por método de pago
-                COALESCE(SUM(CASE WHEN v.metodo_pago = 'Efectivo'      THEN v.monto ELSE 0 END), 0) AS total_efectivo,
-                COALESCE(SUM(CASE WHEN v.metodo_pago = 'Tarjeta'       THEN v.monto ELSE 0 END), 0) AS total_tarjeta,
-                COALESCE(SUM(CASE WHEN v.metodo_pago = 'Transferencia' THEN v.monto ELSE 0 END), 0) AS total_transferencia
+                COALESCE(SUM(CASE WHEN r.metodo_pago = 'Efectivo'      THEN r.total ELSE 0 END), 0) AS total_efectivo,
+                COALESCE(SUM(CASE WHEN r.metodo_pago = 'Tarjeta'       THEN r.total ELSE 0 END), 0) AS total_tarjeta,
+                COALESCE(SUM(CASE WHEN r.metodo_pago = 'Transferencia' THEN r.total ELSE 0 END), 0) AS total_transferencia
 
-            FROM Venta v
-            LEFT JOIN Empleado e ON e.id_empleado = v.id_empleado
+            FROM Venta_Resumen_Dia r
+            LEFT JOIN Empleado e ON e.id_empleado = r.id_empleado
 
-            WHERE DATE(v.fecha_venta) = %s
+            WHERE r.fecha = %s
+              AND r.num_ventas > 0
             GROUP BY e.id_empleado, e.nombre
             ORDER BY total_ventas DESC, empleado_nombre;
         """
@@ -1023,101 +1538,139 @@ def ventas_hoy():
 
 
 
+_CURSOR_VIAJES_RE = re.compile(r'^(\d{14})-(\d+)$')
+
+
+def _cursor_viajes(siguiente):
+    """(fecha_salida, id_viaje) -> token opaco para el parámetro `despues`."""
+    if siguiente is None:
+        return None
+    salida, id_viaje = siguiente
+    return f"{salida:%Y%m%d%H%M%S}-{id_viaje}"
+
+
+def _filtros_viajes_proximos():
+    """
+    Lee de request.args los filtros y la página de viajes próximos:
+    desde/hasta (AAAA-MM-DD), origen/destino (id_ciudad), clase (id_clase),
+    despues (token de la página anterior) y limite.
+    Lanza ValueError con un mensaje para el usuario si algo no es válido.
+    """
+    args = request.args
+
+    def entero(nombre):
+        valor = args.get(nombre, '').strip()
+        if not valor:
+            return None
+        try:
+            return int(valor)
+        except ValueError:
+            raise ValueError(f'El filtro "{nombre}" no es válido.')
+
+    def fecha(nombre):
+        valor = args.get(nombre, '').strip()
+        if not valor:
+            return None
+        try:
+            return datetime.strptime(valor, '%Y-%m-%d').date()
+        except ValueError:
+            raise ValueError(f'La fecha "{nombre}" debe tener formato AAAA-MM-DD.')
+
+    despues = None
+    token = args.get('despues', '').strip()
+    if token:
+        m = _CURSOR_VIAJES_RE.match(token)
+        if not m:
+            raise ValueError('La página solicitada no es válida.')
+        despues = (datetime.strptime(m.group(1), '%Y%m%d%H%M%S'), int(m.group(2)))
+
+    limite = entero('limite') or app.config['VIAJES_PROXIMOS_POR_PAGINA']
+    maximo = app.config['VIAJES_PROXIMOS_MAX']
+    if not 1 <= limite <= maximo:
+        raise ValueError(f'El límite debe estar entre 1 y {maximo}.')
+
+    return {
+        'desde': fecha('desde'),
+        'hasta': fecha('hasta'),
+        'id_ciudad_origen': entero('origen'),
+        'id_ciudad_destino': entero('destino'),
+        'id_clase': entero('clase'),
+        'despues': despues,
+        'limite': limite,
+    }
+
+
 @app.route('/viajes/proximos')
 @login_required
 def viajes_proximos():
     """
-    Vista rápida con todos los viajes próximos (de todos los choferes),
-    ordenados por fecha de salida.
+    Vista rápida con los viajes próximos (de todos los choferes), ordenados
+    por fecha de salida, con filtros y paginación (ver ModelViaje.proximos).
     Solo para Admin y Empleado (taquilla).
     """
     if current_user.rol not in ('Admin', 'Empleado'):
         flash('Acceso denegado. Solo el personal de taquilla o administradores pueden ver esta sección.', 'danger')
         return redirect(url_for('home'))
 
+    viajes, siguiente = [], None
+    catalogos = {'ciudades': [], 'clases': []}
     try:
-        cursor = db.connection.cursor(MySQLdb.cursors.DictCursor)
-
-        sql = """
-            SELECT
-                v.id_viaje,
-                DATE_FORMAT(v.fecha_salida, '%d/%m/%Y %H:%i') AS fecha_salida,
-                DATE_FORMAT(v.fecha_llegada, '%d/%m/%Y %H:%i') AS fecha_llegada,
-
-                r.nombre AS ruta_nombre,
-
-                oc.nombre AS origen_ciudad,
-                ot.nombre AS origen_terminal,
-
-                dc.nombre AS destino_ciudad,
-                dt.nombre AS destino_terminal,
-
-                CONCAT_WS(' ', a.numero_placa, a.numero_fisico) AS autobus_identificador,
-                cs.nombre AS clase_nombre,
-
-                ch.nombre AS chofer_nombre,
-
-                COALESCE(ad.asientos_disponibles, a.capacidad) AS asientos_disponibles,
-
-                CASE
-                  WHEN v.estado = 'Cancelado' THEN 'Cancelado'
-                  WHEN NOW() < v.fecha_salida THEN 'Programado'
-                  WHEN NOW() BETWEEN v.fecha_salida AND v.fecha_llegada THEN 'EnRuta'
-                  ELSE 'Finalizado'
-                END AS estado_actual
-
-            FROM Viaje v
-            JOIN Ruta   r  ON r.id_ruta    = v.id_ruta
-            JOIN Autobus a ON a.id_autobus = v.id_autobus
-            LEFT JOIN ClaseServicio cs ON cs.id_clase = a.id_clase
-            JOIN Chofer ch  ON ch.id_chofer = v.id_chofer
-
-            JOIN Viaje_Escala ve_o
-                   ON ve_o.id_viaje = v.id_viaje
-                  AND ve_o.orden_parada = (
-                      SELECT MIN(orden_parada)
-                      FROM Viaje_Escala
-                      WHERE id_viaje = v.id_viaje
-                  )
-            JOIN Terminal ot ON ot.id_terminal = ve_o.id_terminal
-            JOIN Ciudad  oc  ON oc.id_ciudad   = ot.id_ciudad
-
-            JOIN Viaje_Escala ve_d
-                   ON ve_d.id_viaje = v.id_viaje
-                  AND ve_d.orden_parada = (
-                      SELECT MAX(orden_parada)
-                      FROM Viaje_Escala
-                      WHERE id_viaje = v.id_viaje
-                  )
-            JOIN Terminal dt ON dt.id_terminal = ve_d.id_terminal
-            JOIN Ciudad  dc  ON dc.id_ciudad   = dt.id_ciudad
-
-            LEFT JOIN vw_asientos_disponibilidad ad
-                   ON ad.id_viaje = v.id_viaje
-
-            WHERE v.fecha_salida >= NOW()
-              AND v.estado <> 'Cancelado'
-            ORDER BY v.fecha_salida ASC;
-        """
-
-        cursor.execute(sql)
-        viajes = cursor.fetchall()
-        cursor.close()
+        catalogos = ModelViaje.catalogos(db)
+        viajes, siguiente = ModelViaje.proximos(db, **_filtros_viajes_proximos())
 
+    except ValueError as e:
+        flash(str(e), 'warning')
     except Exception as e:
         app.logger.error(f"Error cargando /viajes/proximos: {e}")
         flash('Ocurrió un error al cargar los viajes próximos.', 'danger')
-        viajes = []
 
+    # Filtros actuales sin la página, para los enlaces de paginación
+    filtros = {k: v for k, v in request.args.items() if k != 'despues' and v}
     fecha_hoy = datetime.now().strftime("%d/%m/%Y")
 
     return render_template(
         'viajes_proximos.html',
         user=current_user,
         fecha_hoy=fecha_hoy,
-        viajes=viajes
+        viajes=viajes,
+        filtros=filtros,
+        catalogos=catalogos,
+        es_primera=not request.args.get('despues'),
+        siguiente=_cursor_viajes(siguiente)
     )
 
+
+@app.route('/api/viajes/proximos', methods=['GET'])
+@login_required
+def api_viajes_proximos():
+    """
+    Viajes próximos en JSON, mismos filtros que /viajes/proximos:
+      GET /api/viajes/proximos?desde=2025-01-01&origen=3&limite=50
+    La respuesta trae `siguiente`; se pasa como ?despues= para la página
+    que sigue (null = ya no hay más).
+    """
+    if current_user.rol not in ('Admin', 'Empleado'):
+        return jsonify({'error': 'No autorizado'}), 403
+
+    try:
+        filtros = _filtros_viajes_proximos()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    try:
+        viajes, siguiente = ModelViaje.proximos(db, **filtros)
+    except Exception as e:
+        app.logger.error(f"Error en /api/viajes/proximos: {e}")
+        return jsonify({'error': 'Error interno al consultar viajes'}), 500
+
+    for v in viajes:
+        v['salida'] = v['salida'].isoformat()
+    return jsonify({
+        'viajes': viajes,
+        'siguiente': _cursor_viajes(siguiente)
+    })
+
+
 @app.route('/admin/cancelar_viaje', methods=['POST'])
 @login_required
 @admin_required
@@ -1173,6 +1726,8 @@ def admin_cancelar_viaje():
         db.connection.commit()
         cursor.close()
 
+        seat_inventory.invalidar(int(id_viaje))
+
         flash(f"El viaje #{id_viaje} ha sido cancelado correctamente.", "success")
 
     except Exception as ex:
@@ -1184,6 +1739,240 @@ def admin_cancelar_viaje():
     return redirect(request.referrer or url_for('home'))
 
 
+@app.route('/admin/cancelar_boleto/<int:id_boleto>', methods=['POST'])
+@login_required
+@admin_required
+def admin_cancelar_boleto(id_boleto):
+    """
+    Cancela un boleto (sp_cancelar_boleto) y libera su asiento: el boleto
+    cancelado ya no cuenta en uq_boleto_asiento ni en Viaje_Asiento
+    (migración 0016), así que el asiento se puede volver a vender.
+    """
+    motivo = request.form.get('motivo', '').strip() or 'Cancelado desde taquilla'
+
+    try:
+        cursor = db.connection.cursor(MySQLdb.cursors.DictCursor)
+
+        cursor.execute("""
+            SELECT id_viaje, numero_asiento, estado
+            FROM Boleto
+            WHERE id_boleto = %s
+        """, (id_boleto,))
+        boleto = cursor.fetchone()
+
+        if not boleto:
+            cursor.close()
+            flash("El boleto seleccionado no existe.", "danger")
+            return redirect(request.referrer or url_for('home'))
+
+        if boleto['estado'] == 'Cancelado':
+            cursor.close()
+            flash("El boleto ya se encuentra cancelado.", "info")
+            return redirect(request.referrer or url_for('home'))
+
+        cursor.execute("CALL sp_cancelar_boleto(%s, %s)", (id_boleto, motivo))
+        cursor.close()
+        db.connection.commit()
+
+        seat_inventory.liberar(boleto['id_viaje'], boleto['numero_asiento'])
+        boletos_impresos.invalidate(id_boleto)
+
+        flash(f"El boleto #{id_boleto} fue cancelado y su asiento liberado.", "success")
+
+    except Exception as ex:
+        app.logger.error(f"Error al cancelar boleto {id_boleto}: {ex}")
+        db.connection.rollback()
+        flash("Ocurrió un error al intentar cancelar el boleto.", "danger")
+
+    return redirect(request.referrer or url_for('home'))
+
+
+# ========== COMANDOS CLI (flask --app app <comando>) ==========
+MIGRATIONS_DIR = os.path.join(os.path.dirname(app.root_path), 'migrations')
+
+
+@app.cli.command('migrate')
+@click.option('--estado', is_flag=True, help='Solo muestra qué migraciones están aplicadas o pendientes.')
+@click.option('--hasta', default=None, help='Aplica hasta esta versión (ej. 0003).')
+def migrate_command(estado, hasta):
+    """Aplica las migraciones pendientes de /migrations sobre la base actual."""
+    runner = MigrationRunner(db, MIGRATIONS_DIR)
+
+    if estado:
+        for version, nombre, edo in runner.estado():
+            print(f"{version}  {edo:<10}  {nombre}")
+        return
+
+    aplicadas = runner.migrar(hasta=hasta)
+    if not aplicadas:
+        print("La base ya está al día.")
+    for version, nombre in aplicadas:
+        print(f"Aplicada {version}_{nombre}")
+
+@app.cli.command('backfill-viajes')
+def backfill_viajes_command():
+    """Reconstruye Viaje_Resumen (origen/destino) desde Viaje_Escala."""
+    afectadas, huerfanos = ModelViaje.backfill_resumen(db)
+    print(f"Viaje_Resumen: {afectadas} filas insertadas/actualizadas, {huerfanos} huérfanas borradas.")
+
+
+@app.cli.command('reconciliar-ocupacion')
+def reconciliar_ocupacion_command():
+    """Reconstruye Viaje_Ocupacion contando los boletos vigentes de cada viaje."""
+    desfasados, afectadas = ModelViaje.reconciliar_ocupacion(db)
+    print(f"Viaje_Ocupacion: {desfasados} viajes con contadores desfasados, {afectadas} filas reescritas.")
+
+
+@app.cli.command('purgar-apartados')
+def purgar_apartados_command():
+    """Borra los apartados de asiento vencidos (para cron)."""
+    borrados = len(ModelRetencion.purgar_vencidas(db))
+    print(f"Asiento_Retencion: {borrados} apartados vencidos borrados.")
+
+
+@app.cli.command('purgar-idempotencia')
+def purgar_idempotencia_command():
+    """Borra las llaves de idempotencia de ventas ya vencidas (para cron)."""
+    borradas = ModelVenta.purgar_claves_vencidas(db)
+    print(f"Venta_Idempotencia: {borradas} llaves vencidas borradas.")
+
+
+@app.cli.command('procesar-venta-detalle')
+@click.option('--reconciliar', is_flag=True, help='Antes encola toda Venta que no tenga Venta_Detalle.')
+@click.option('--lote', default=None, type=int, help='Ventas por INSERT ... SELECT.')
+def procesar_venta_detalle_command(reconciliar, lote):
+    """Arma los Venta_Detalle pendientes del modo diferido (para cron)."""
+    if reconciliar:
+        encoladas = ModelVentaDetalle.reconciliar(db)
+        print(f"Venta_Detalle: {encoladas} ventas sin snapshot encoladas.")
+    procesadas = ModelVentaDetalle.procesar_pendientes(db, lote)
+    pendientes, mas_antigua = ModelVentaDetalle.pendientes(db)
+    print(f"Venta_Detalle: {procesadas} snapshots armados, {pendientes} pendientes"
+          + (f" (la más antigua de {mas_antigua})." if mas_antigua else "."))
+
+
+NOTA_BENCH = 'bench-ventas'
+
+
+def _bench_ventas(modo, viajes, total, hilos, id_usuario):
+    """Corre `total` ventas "cualquier asiento" repartidas en `viajes` con `hilos` concurrentes."""
+    cola = None
+    if modo == 'lote':
+        cola = GroupCommitQueue(
+            _procesar_lote_ventas,
+            ventana=app.config['VENTA_GROUP_COMMIT_VENTANA_MS'] / 1000.0,
+            max_lote=app.config['VENTA_GROUP_COMMIT_MAX_LOTE'],
+            nombre='bench-group-commit'
+        )
+
+    with app.app_context():
+        precios = {v: _precio_viaje(v) for v in viajes}
+
+    siguiente = iter(range(total))
+    lock = threading.Lock()
+    latencias = LatencyStats(ventana=total)
+    conteo = {'ok': 0, 'rechazadas': 0, 'errores': 0}
+
+    def trabajador():
+        while True:
+            with lock:
+                i = next(siguiente, None)
+            if i is None:
+                return
+            id_viaje = viajes[i % len(viajes)]
+            id_tarifa, precio = precios[id_viaje]
+            datos = {
+                'id_viaje': id_viaje, 'numero_asiento': None, 'posicion': None,
+                'nombre': f'Bench {i}', 'correo': None, 'telefono': None,
+                'metodo_pago': 'Efectivo', 'id_usuario': id_usuario,
+                'id_tarifa': id_tarifa, 'precio_total': precio,
+                'nota': NOTA_BENCH, 'clave': None,
+            }
+            inicio = time.perf_counter()
+            try:
+                if cola is not None:
+                    cola.enviar(datos)
+                else:
+                    with app.app_context():
+                        ModelVenta.registrar(db, **datos)
+                resultado = 'ok'
+            except VentaError:
+                resultado = 'rechazadas'
+            except Exception:
+                resultado = 'errores'
+            latencias.registrar(time.perf_counter() - inicio)
+            with lock:
+                conteo[resultado] += 1
+
+    inicio = time.perf_counter()
+    workers = [threading.Thread(target=trabajador) for _ in range(hilos)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    transcurrido = time.perf_counter() - inicio
+
+    if cola is not None:
+        cola.cerrar()
+
+    lat = latencias.stats()
+    print(f"[{modo}] {conteo['ok']} ventas, {conteo['rechazadas']} rechazadas, "
+          f"{conteo['errores']} errores en {transcurrido:.2f} s "
+          f"-> {conteo['ok'] / transcurrido:.1f} ventas/s; "
+          f"latencia p50 {lat['p50_ms']} ms, p95 {lat['p95_ms']} ms, max {lat['max_ms']} ms")
+    if cola is not None:
+        st = cola.stats()
+        print(f"[{modo}] {st['lotes']} lotes, promedio {st['promedio_lote']} ventas/lote, "
+              f"máximo {st['max_lote_visto']}")
+
+
+@app.cli.command('bench-ventas')
+@click.option('--viajes', required=True, help='Ids de viaje separados por coma (se venden sus asientos).')
+@click.option('--ventas', 'total', default=200, show_default=True, help='Ventas por modo.')
+@click.option('--hilos', default=16, show_default=True, help='Taquillas concurrentes simuladas.')
+@click.option('--modo', type=click.Choice(['directo', 'lote', 'ambos']), default='ambos', show_default=True)
+@click.option('--usuario', 'id_usuario', default=1, show_default=True, help='id_usuario que vende.')
+@click.option('--limpiar', is_flag=True, help='Al terminar borra las ventas del benchmark.')
+def bench_ventas_command(viajes, total, hilos, modo, id_usuario, limpiar):
+    """
+    Compara una transacción por venta (nueva_venta) contra el group commit.
+    ESCRIBE VENTAS REALES: usar solo en una base de pruebas.
+    """
+    ids = [int(v) for v in viajes.split(',') if v.strip()]
+    modos = ['directo', 'lote'] if modo == 'ambos' else [modo]
+    for m in modos:
+        _bench_ventas(m, ids, total, hilos, id_usuario)
+
+    if limpiar:
+        with app.app_context():
+            conn = db.connection
+            cursor = conn.cursor()
+            # Venta primero (sus triggers mantienen Venta_Resumen_Dia; el
+            # CASCADE desde Boleto no dispara triggers)
+            cursor.execute("""
+                DELETE vd FROM Venta_Detalle vd
+                JOIN Venta v ON v.id_venta = vd.id_venta
+                WHERE v.nota = %s
+            """, (NOTA_BENCH,))
+            cursor.execute("SELECT id_boleto FROM Venta WHERE nota = %s", (NOTA_BENCH,))
+            boletos = [r[0] for r in cursor.fetchall()]
+            cursor.execute("DELETE FROM Venta WHERE nota = %s", (NOTA_BENCH,))
+            if boletos:
+                cursor.execute(
+                    f"DELETE FROM Boleto WHERE id_boleto IN ({', '.join(['%s'] * len(boletos))})",
+                    boletos
+                )
+            cursor.execute("""
+                DELETE p FROM Pasajero p
+                LEFT JOIN Boleto b ON b.id_pasajero = p.id_pasajero
+                WHERE p.nombre LIKE 'Bench %%' AND p.correo IS NULL AND b.id_boleto IS NULL
+            """)
+            conn.commit()
+            cursor.close()
+        for v in ids:
+            seat_inventory.invalidar(v)
+        print(f"Limpieza: {len(boletos)} boletos del benchmark borrados.")
+
 
 if __name__ == '__main__':
     app.register_error_handler(401, status_401)
@@ -3,6 +3,68 @@ import os
 class Config:
     SECRET_KEY = os.getenv('SECRET_KEY', 'default-secret-key')
 
+    # Caché de usuarios para load_user (Models/ModelUser.py). Cada acierto
+    # se confirma contra Usuario.version (migración 0018), así que un
+    # cambio hecho en otro worker vale desde el siguiente request
+    USER_CACHE_SIZE = int(os.getenv('USER_CACHE_SIZE', 1024))
+    USER_CACHE_TTL = float(os.getenv('USER_CACHE_TTL', 60))   # segundos
+
+    # Inventario de asientos en memoria (Services/SeatInventory.py)
+    SEAT_INVENTORY_TTL = float(os.getenv('SEAT_INVENTORY_TTL', 30))   # segundos
+
+    # Eventos de asientos en vivo (Services/SeatEvents.py, /api/viajes/eventos):
+    # cada conexión abierta ocupa un hilo, de ahí el tope de suscriptores
+    SEAT_EVENTS_MAX_SUSCRIPTORES = int(os.getenv('SEAT_EVENTS_MAX_SUSCRIPTORES', 200))
+    SEAT_EVENTS_HISTORIAL = int(os.getenv('SEAT_EVENTS_HISTORIAL', 256))   # eventos por viaje
+    SEAT_EVENTS_LATIDO = float(os.getenv('SEAT_EVENTS_LATIDO', 15))   # segundos
+
+    # Índice de tarifas en memoria (Services/TariffIndex.py)
+    TARIFF_INDEX_TTL = float(os.getenv('TARIFF_INDEX_TTL', 300))   # segundos
+
+    # Índice de pasajeros para el autocompletado (Services/PassengerIndex.py):
+    # cada cuánto se leen los nuevos y cada cuánto se recarga completo
+    PASSENGER_INDEX_INTERVALO = float(os.getenv('PASSENGER_INDEX_INTERVALO', 5))   # segundos
+    PASSENGER_INDEX_RECARGA = float(os.getenv('PASSENGER_INDEX_RECARGA', 3600))   # segundos
+
+    # Ruta/clase/fecha por viaje para cotizar la venta (Models/ModelViaje.py)
+    VIAJE_DATOS_CACHE_SIZE = int(os.getenv('VIAJE_DATOS_CACHE_SIZE', 4096))
+    VIAJE_DATOS_CACHE_TTL = float(os.getenv('VIAJE_DATOS_CACHE_TTL', 60))   # segundos
+
+    # HTML de boletos para reimpresión, por id_boleto (app.imprimir_boleto)
+    BOLETO_IMPRESO_CACHE_SIZE = int(os.getenv('BOLETO_IMPRESO_CACHE_SIZE', 2048))
+    BOLETO_IMPRESO_CACHE_TTL = float(os.getenv('BOLETO_IMPRESO_CACHE_TTL', 600))   # segundos
+
+    # Panel del chofer (app.chofer): caché por chofer e hilos para sus consultas
+    CHOFER_TABLERO_CACHE_SIZE = int(os.getenv('CHOFER_TABLERO_CACHE_SIZE', 512))
+    CHOFER_TABLERO_CACHE_TTL = float(os.getenv('CHOFER_TABLERO_CACHE_TTL', 15))   # segundos
+    CHOFER_TABLERO_HILOS = int(os.getenv('CHOFER_TABLERO_HILOS', 6))
+
+    # Directorio de usuarios del panel de admin (/api/admin/usuarios)
+    ADMIN_USUARIOS_POR_PAGINA = int(os.getenv('ADMIN_USUARIOS_POR_PAGINA', 25))
+    ADMIN_USUARIOS_MAX = int(os.getenv('ADMIN_USUARIOS_MAX', 100))
+
+    # Viajes próximos (página y API): viajes por página y máximo por ?limite=
+    VIAJES_PROXIMOS_POR_PAGINA = int(os.getenv('VIAJES_PROXIMOS_POR_PAGINA', 50))
+    VIAJES_PROXIMOS_MAX = int(os.getenv('VIAJES_PROXIMOS_MAX', 200))
+
+    # Apartado de asientos en taquilla (Models/ModelRetencion.py)
+    RETENCION_MINUTOS = int(os.getenv('RETENCION_MINUTOS', 5))
+    RETENCION_PURGA_INTERVALO = float(os.getenv('RETENCION_PURGA_INTERVALO', 60))   # segundos
+
+    # Vigencia de las llaves de idempotencia de ventas (Models/ModelVenta.py)
+    IDEMPOTENCIA_HORAS = int(os.getenv('IDEMPOTENCIA_HORAS', 24))
+
+    # Group commit de ventas (Services/GroupCommit.py); apagado por defecto
+    VENTA_GROUP_COMMIT = os.getenv('VENTA_GROUP_COMMIT', '0') == '1'
+    VENTA_GROUP_COMMIT_VENTANA_MS = float(os.getenv('VENTA_GROUP_COMMIT_VENTANA_MS', 20))
+    VENTA_GROUP_COMMIT_MAX_LOTE = int(os.getenv('VENTA_GROUP_COMMIT_MAX_LOTE', 32))
+    VENTA_GROUP_COMMIT_TIMEOUT = float(os.getenv('VENTA_GROUP_COMMIT_TIMEOUT', 30))   # segundos
+
+    # Venta_Detalle armado fuera de la venta, por lotes (Models/ModelVentaDetalle.py); apagado por defecto
+    VENTA_DETALLE_DIFERIDO = os.getenv('VENTA_DETALLE_DIFERIDO', '0') == '1'
+    VENTA_DETALLE_LOTE = int(os.getenv('VENTA_DETALLE_LOTE', 500))
+    VENTA_DETALLE_INTERVALO = float(os.getenv('VENTA_DETALLE_INTERVALO', 2))   # segundos
+
 class DevelopmentConfig(Config):
     DEBUG = True
     MYSQL_HOST = os.getenv('MYSQL_HOST', '127.0.0.1')
@@ -10,6 +72,14 @@ class DevelopmentConfig(Config):
     MYSQL_PASSWORD = os.getenv('MYSQL_PASSWORD')
     MYSQL_DB = os.getenv('MYSQL_DB')
 
+    # Pool de conexiones (Services/ConnectionPool.py)
+    MYSQL_POOL_MIN = int(os.getenv('MYSQL_POOL_MIN', 2))
+    MYSQL_POOL_MAX = int(os.getenv('MYSQL_POOL_MAX', 10))
+    MYSQL_POOL_TIMEOUT = float(os.getenv('MYSQL_POOL_TIMEOUT', 5))               # seg. esperando conexión libre
+    MYSQL_POOL_IDLE_TIMEOUT = float(os.getenv('MYSQL_POOL_IDLE_TIMEOUT', 300))   # seg. ociosa antes de cerrarla
+    MYSQL_POOL_MAX_LIFETIME = float(os.getenv('MYSQL_POOL_MAX_LIFETIME', 3600))  # seg. de vida máxima
+    MYSQL_POOL_PING_INTERVAL = float(os.getenv('MYSQL_POOL_PING_INTERVAL', 30))  # ping si lleva más de N seg. sin uso
+
 config = {
     'development': DevelopmentConfig
 }
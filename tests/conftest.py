@@ -0,0 +1,42 @@
+import os
+import sys
+
+# Los módulos de la app se importan como en src/app.py (Services.X, Models.X)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+
+class FakeCursor:
+    """Cursor que responde con filas fijas según un texto de la consulta."""
+
+    def __init__(self, respuestas):
+        self.respuestas = respuestas
+        self.consultas = []
+        self._filas = []
+
+    def execute(self, sql, params=()):
+        self.consultas.append((sql, params))
+        self._filas = []
+        for clave, filas in self.respuestas.items():
+            if clave in sql:
+                self._filas = filas(params) if callable(filas) else list(filas)
+                break
+
+    def fetchall(self):
+        return self._filas
+
+    def fetchone(self):
+        return self._filas[0] if self._filas else None
+
+    def close(self):
+        pass
+
+
+class FakeDB:
+    """Sustituto de PooledMySQL: db.connection.cursor() -> FakeCursor."""
+
+    def __init__(self, respuestas):
+        self.cursor_obj = FakeCursor(respuestas)
+        self.connection = self
+
+    def cursor(self, *args):
+        return self.cursor_obj
@@ -0,0 +1,84 @@
+import threading
+
+import pytest
+
+from Services.GroupCommit import EnvioVencido, GroupCommitQueue
+
+
+def test_agrupa_y_regresa_cada_resultado():
+    lotes = []
+
+    def procesar(elementos):
+        lotes.append(list(elementos))
+        return [e * 2 for e in elementos]
+
+    cola = GroupCommitQueue(procesar, ventana=0.05)
+    resultados = {}
+    hilos = [threading.Thread(target=lambda n=n: resultados.__setitem__(n, cola.enviar(n)))
+             for n in range(5)]
+    for h in hilos:
+        h.start()
+    for h in hilos:
+        h.join()
+    cola.cerrar()
+
+    assert resultados == {n: n * 2 for n in range(5)}
+    assert sum(len(l) for l in lotes) == 5
+
+
+def test_excepcion_por_elemento_y_por_lote():
+    def procesar(elementos):
+        if 'todo' in elementos:
+            raise RuntimeError('falló el lote')
+        return [ValueError(e) if e == 'malo' else e for e in elementos]
+
+    cola = GroupCommitQueue(procesar, ventana=0)
+    assert cola.enviar('bueno') == 'bueno'
+    with pytest.raises(ValueError):
+        cola.enviar('malo')
+    with pytest.raises(RuntimeError):
+        cola.enviar('todo')
+    cola.cerrar()
+    assert cola.stats()['errores_lote'] == 1
+
+
+def test_vencido_en_cola_no_se_procesa():
+    liberar = threading.Event()
+    vistos = []
+
+    def procesar(elementos):
+        vistos.extend(elementos)
+        liberar.wait(5)
+        return elementos
+
+    cola = GroupCommitQueue(procesar, ventana=0)
+    primero = threading.Thread(target=cola.enviar, args=('lento',))
+    primero.start()
+    while not vistos:
+        pass
+
+    # El escritor está ocupado: el segundo sigue en la cola al vencer
+    with pytest.raises(EnvioVencido):
+        cola.enviar('encolado', timeout=0.05)
+    liberar.set()
+    primero.join()
+    cola.cerrar()
+
+    assert vistos == ['lento']
+    assert cola.stats()['vencidos'] == 1
+
+
+def test_tomado_por_el_escritor_espera_su_resultado():
+    tomado = threading.Event()
+
+    def procesar(elementos):
+        tomado.set()
+        threading.Event().wait(0.2)
+        return elementos
+
+    cola = GroupCommitQueue(procesar, ventana=0)
+    # El timeout vence con el elemento ya en un lote: no se reporta falla
+    assert cola.enviar('x', timeout=0.05) == 'x'
+    assert tomado.is_set()
+    cola.cerrar()
+    assert cola.stats()['vencidos'] == 0
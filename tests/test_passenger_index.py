@@ -0,0 +1,58 @@
+from Services.PassengerIndex import PassengerIndex
+from conftest import FakeDB
+
+PASAJEROS = [
+    {'id_pasajero': 1, 'nombre': 'María Peña López', 'correo': 'maria@correo.com', 'telefono': '55 1234 5678'},
+    {'id_pasajero': 2, 'nombre': 'Mario Pérez', 'correo': 'mperez@correo.com', 'telefono': '55-8765-0000'},
+    {'id_pasajero': 3, 'nombre': 'Ana López', 'correo': None, 'telefono': None},
+]
+
+
+def _db(filas):
+    def nuevos(params):
+        return [f for f in filas if f['id_pasajero'] > params[0]]
+    # La consulta incremental también dice "FROM Pasajero": va primero
+    return FakeDB({'id_pasajero > %s': nuevos, 'FROM Pasajero': filas})
+
+
+def _ids(resultado):
+    return [p['id_pasajero'] for p in resultado]
+
+
+def test_nombre_sin_acentos_y_en_cualquier_orden():
+    idx = PassengerIndex()
+    db = _db(PASAJEROS)
+    assert _ids(idx.buscar(db, 'pena')) == [1]
+    assert sorted(_ids(idx.buscar(db, 'lop'))) == [1, 3]
+    assert _ids(idx.buscar(db, 'lopez mar')) == [1]
+    assert sorted(_ids(idx.buscar(db, 'mar'))) == [1, 2]
+
+
+def test_correo_y_telefono():
+    idx = PassengerIndex()
+    db = _db(PASAJEROS)
+    assert _ids(idx.buscar(db, 'mperez@')) == [2]
+    assert _ids(idx.buscar(db, '5678')) == [1]
+    assert _ids(idx.buscar(db, '87')) == []     # menos de 3 dígitos
+    assert idx.buscar(db, '   ') == []
+
+
+def test_limite():
+    idx = PassengerIndex()
+    db = _db(PASAJEROS)
+    assert len(idx.buscar(db, 'ma', limite=1)) == 1
+
+
+def test_agregar_y_nuevos_de_otros_workers():
+    filas = list(PASAJEROS)
+    idx = PassengerIndex(intervalo=0)
+    db = _db(filas)
+    idx.buscar(db, 'x')
+
+    idx.agregar(4, 'Luis Gómez', None, None)
+    assert _ids(idx.buscar(db, 'gomez')) == [4]
+
+    # Insertado por otro proceso: se lee en la siguiente revisión
+    filas.append({'id_pasajero': 5, 'nombre': 'Rosa Díaz', 'correo': None, 'telefono': None})
+    assert _ids(idx.buscar(db, 'diaz')) == [5]
+    assert idx.recargas == 1
@@ -0,0 +1,71 @@
+from Services.SeatEvents import SeatEvents
+
+
+def test_publicar_llega_a_suscriptores_del_viaje():
+    e = SeatEvents()
+    s1 = e.suscribir([1])
+    s2 = e.suscribir([2])
+    e.publicar(1, 'vendido', asiento=5)
+
+    eventos = e.esperar(s1, 0)
+    assert [(tipo, datos) for _, tipo, datos in eventos] == [('vendido', {'asiento': 5, 'id_viaje': 1})]
+    assert e.esperar(s2, 0) == []
+
+
+def test_reconexion_repite_lo_que_falta():
+    e = SeatEvents()
+    e.publicar(1, 'vendido', asiento=1)
+    ultimo = e.id_evento(1)
+    e.publicar(1, 'vendido', asiento=2)
+
+    s = e.suscribir([1], ultimo_id=ultimo)
+    assert [d['asiento'] for _, _, d in e.esperar(s, 0)] == [2]
+
+
+def test_id_de_otra_instancia_pide_resync():
+    e = SeatEvents()
+    s = e.suscribir([1], ultimo_id='otra-5')
+    assert [tipo for _, tipo, _ in e.esperar(s, 0)] == ['resync']
+
+
+def test_historial_desbordado_pide_resync():
+    e = SeatEvents(historial=2)
+    e.publicar(1, 'vendido', asiento=1)
+    ultimo = e.id_evento(1)
+    for n in range(2, 6):
+        e.publicar(1, 'vendido', asiento=n)
+
+    s = e.suscribir([1], ultimo_id=ultimo)
+    assert [tipo for _, tipo, _ in e.esperar(s, 0)] == ['resync']
+
+
+def test_canal_nuevo_con_todos_los_canales_ocupados():
+    e = SeatEvents(max_canales=3)
+    e.suscribir([1, 2, 3])
+
+    # Nada que descartar: se pasa del tope en lugar de fallar
+    e.publicar(4, 'vendido', asiento=1)
+    s = e.suscribir([4])
+    assert s is not None
+    assert e.stats()['canales'] == 4
+
+
+def test_descarta_el_canal_mas_viejo_sin_suscriptores():
+    e = SeatEvents(max_canales=2)
+    e.publicar(1, 'vendido', asiento=1)
+    e.suscribir([2])
+    e.publicar(3, 'vendido', asiento=1)
+    assert e.stats()['canales'] == 2
+
+    # El historial del viaje 1 ya no está: quien reconecta pide resync
+    s = e.suscribir([1], ultimo_id=e.id_evento(0))
+    assert [tipo for _, tipo, _ in e.esperar(s, 0)] == ['resync']
+
+
+def test_tope_de_suscriptores():
+    e = SeatEvents(max_suscriptores=1)
+    s = e.suscribir([1])
+    assert e.suscribir([1]) is None
+    e.cancelar(s)
+    assert e.suscribir([1]) is not None
+    assert e.stats()['rechazados'] == 1
@@ -0,0 +1,49 @@
+import os
+
+from Services.Migrations import split_sql
+
+
+def test_sentencias_simples_y_comentarios():
+    texto = """
+    -- comentario
+    CREATE TABLE a (id INT);
+    INSERT INTO a VALUES (1);
+    -- solo comentario al final
+    """
+    sentencias = split_sql(texto)
+    # Los comentarios viajan con la sentencia siguiente; el resto sin
+    # código no es sentencia
+    assert len(sentencias) == 2
+    assert sentencias[0].endswith('CREATE TABLE a (id INT)')
+    assert sentencias[1] == 'INSERT INTO a VALUES (1)'
+
+
+def test_delimiter_para_triggers():
+    texto = """DELIMITER //
+CREATE TRIGGER t AFTER INSERT ON a
+FOR EACH ROW
+BEGIN
+  UPDATE b SET n = n + 1;
+END//
+DELIMITER ;
+SELECT 1;"""
+    sentencias = split_sql(texto)
+    assert len(sentencias) == 2
+    assert sentencias[0].startswith('CREATE TRIGGER t')
+    assert sentencias[0].endswith('END')
+    assert 'UPDATE b SET n = n + 1;' in sentencias[0]
+    assert sentencias[1] == 'SELECT 1'
+
+
+def test_sentencia_final_sin_delimitador():
+    assert split_sql("SELECT 1;\nSELECT 2") == ['SELECT 1', 'SELECT 2']
+
+
+def test_migraciones_del_repo():
+    directorio = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'migrations')
+    for nombre in sorted(os.listdir(directorio)):
+        with open(os.path.join(directorio, nombre), encoding='utf-8') as f:
+            sentencias = split_sql(f.read())
+        assert sentencias, nombre
+        for s in sentencias:
+            assert not s.upper().startswith('DELIMITER'), nombre
@@ -0,0 +1,50 @@
+from datetime import date, datetime
+from decimal import Decimal
+
+from Services.TariffIndex import TariffIndex
+from conftest import FakeDB
+
+
+def _tarifa(id_tarifa, id_ruta, id_clase, precio, inicio, fin=None):
+    return {'id_tarifa': id_tarifa, 'id_ruta': id_ruta, 'id_clase': id_clase,
+            'precio_base': precio, 'impuesto': 0, 'vigencia_inicio': inicio, 'vigencia_fin': fin}
+
+
+def _db():
+    return FakeDB({
+        'FROM Tarifa': [
+            _tarifa(1, 10, None, 100, date(2024, 1, 1)),
+            _tarifa(2, 10, None, 120, date(2024, 6, 1)),
+            _tarifa(3, 10, 2, 200, date(2024, 1, 1), date(2024, 3, 31)),
+        ],
+        'FROM ClaseServicio': [{'id_clase': 2, 'recargo_fijo': 15, 'recargo_pct': '0.10'}],
+    })
+
+
+def test_vigente_mas_reciente():
+    idx = TariffIndex()
+    db = _db()
+    assert idx.tarifa_vigente(db, 10, None, date(2024, 5, 31)).id_tarifa == 1
+    assert idx.tarifa_vigente(db, 10, None, datetime(2024, 7, 1, 8, 0)).id_tarifa == 2
+    assert idx.tarifa_vigente(db, 10, None, '2023-12-31') is None
+
+
+def test_clase_y_regreso_a_generica():
+    idx = TariffIndex()
+    db = _db()
+    assert idx.tarifa_vigente(db, 10, 2, date(2024, 2, 1)).id_tarifa == 3
+    # Vencida la de la clase, aplica la genérica
+    assert idx.tarifa_vigente(db, 10, 2, date(2024, 4, 1)).id_tarifa == 1
+    assert idx.tarifa_vigente(db, 99, None, date(2024, 4, 1)) is None
+
+
+def test_recargos_y_recarga():
+    idx = TariffIndex()
+    db = _db()
+    assert idx.recargos_clase(db, 2) == (Decimal('15'), Decimal('0.10'))
+    assert idx.recargos_clase(db, None) == (Decimal('0'), Decimal('0'))
+    assert idx.recargas == 1
+
+    idx.invalidar()
+    idx.recargos_clase(db, 2)
+    assert idx.recargas == 2